@@ -0,0 +1,222 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+from app import crud, models
+from app.backend.http_client import make_async_client
+from app.backend.rate_limit import ConcurrencyLimits
+from app.events import AlertBroadcaster
+from app.scheduler import TriageScheduler, priority_class
+
+logger = logging.getLogger(__name__)
+
+def build_prompt(alert: models.Alert) -> str:
+    """Describe an alert and its labels as the text handed to the log analyzer."""
+    lines = [
+        f"Alert: {alert.title}",
+        f"Severity: {alert.severity}",
+        f"Status: {alert.status}",
+        f"Source: {alert.source}",
+        f"Started: {alert.timestamp.isoformat() if alert.timestamp else 'unknown'}",
+    ]
+    if (alert.occurrence_count or 1) > 1:
+        lines.append(f"Occurrences: {alert.occurrence_count} (last seen {alert.last_seen.isoformat()})")
+    for key, value in sorted((alert.labels or {}).items()):
+        lines.append(f"Label {key}={value}")
+    if alert.message:
+        lines.append(f"Message: {alert.message}")
+    return "\n".join(lines)
+
+def format_notes(result: Dict[str, Any], model: str) -> str:
+    """Render an analysis result as triage notes."""
+    lines = [f"AI triage ({model}): {result.get('summary', '')}"]
+    for issue in result.get("issues", []):
+        line = f"- [{issue.get('severity', 'Medium')}] {issue.get('description', '')}"
+        if issue.get("recommendation"):
+            line += f" Recommendation: {issue['recommendation']}"
+        if issue.get("command"):
+            line += f" Command: {issue['command']}"
+        lines.append(line)
+    return "\n".join(lines)
+
+class AutoTriageWorker:
+    """Pool of background workers that triage pending alerts with the LLM analyzer.
+
+    A claimer task claims up to `batch_size` pending alerts at a time, most
+    urgent first, and queues them in a TriageScheduler for `concurrency`
+    worker tasks, which call the analyzer and write the summary and issues
+    back to triage_notes. Each alert's class comes from its severity and the
+    most important triage rule it matches. Queued jobs are re-read on every
+    poll: alerts that resolved meanwhile are dropped and changed ones are
+    re-prioritized. In-flight requests are additionally capped per provider
+    (`provider_limits`), counted against the provider each call actually
+    goes to, fallbacks and "auto" routing included. Ingest never waits on any of this:
+    alerts are stored as "pending" and picked up here, and claims can be
+    shared by workers in several processes.
+    """
+
+    def __init__(self, session_factory, analyzer=None, model: Optional[str] = None, concurrency: int = 4,
+                 batch_size: int = 20, poll_interval: float = 2.0, lease_seconds: float = 300,
+                 provider_limits: Optional[Dict[str, int]] = None, aging_seconds: float = 60,
+                 rule_cache=None, broadcaster: Optional[AlertBroadcaster] = None):
+        self.session_factory = session_factory
+        self.analyzer = analyzer
+        self.model = model
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.provider_limits = provider_limits or {}
+        self.aging_seconds = aging_seconds
+        self.rule_cache = rule_cache
+        self.broadcaster = broadcaster
+        self.stats = {"claimed": 0, "triaged": 0, "failed": 0, "dropped": 0, "deferred": 0}
+        self._limits = ConcurrencyLimits()
+        self._scheduler = TriageScheduler(aging_seconds)
+        self._claimer: Optional[asyncio.Task] = None
+        self._workers: List[asyncio.Task] = []
+        # Alerts being analyzed, and saves that must not be interrupted by stop()
+        self._active: Dict[int, models.Alert] = {}
+        self._saving: Set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+        self._client = None
+
+    async def start(self) -> None:
+        if self.analyzer is None:
+            from app.backend.log_analyzer import LogAnalyzer
+            self.analyzer = LogAnalyzer()
+        self.model = self.model or self.analyzer.openrouter_model
+        self._limits = ConcurrencyLimits(self.provider_limits)
+        self._client = make_async_client(max_connections=self.concurrency)
+        self._stopping.clear()
+        self._claimer = asyncio.create_task(self._claim_loop())
+        self._workers = [asyncio.create_task(self._work_loop()) for _ in range(self.concurrency)]
+        logger.info(f"Auto-triage started with {self.concurrency} workers using {self.model}")
+
+    async def stop(self) -> None:
+        """Stop claiming, abandon unfinished analyses and hand their alerts back as pending."""
+        if self._claimer is None:
+            return
+        # The claimer finishes its current claim so no claimed alert goes untracked
+        self._stopping.set()
+        await self._claimer
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        await asyncio.gather(*self._saving, return_exceptions=True)
+        self._claimer, self._workers = None, []
+
+        unfinished = list(self._active) + [alert.id for alert in self._scheduler.clear()]
+        self._active.clear()
+        if unfinished:
+            async with self.session_factory() as db:
+                await crud.release_claims_async(db, unfinished)
+        await self._client.aclose()
+        self._client = None
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._workers),
+            "in_flight": dict(self._limits.in_flight),
+            "scheduler": self._scheduler.stats(),
+            "providers": self.analyzer.provider_status(),
+            **self.stats
+        }
+
+    def classify(self, alert: models.Alert) -> int:
+        rule_class = self.rule_cache.engine.priority(alert) if self.rule_cache is not None else None
+        return priority_class(alert.severity, rule_class)
+
+    async def _claim_loop(self) -> None:
+        while not self._stopping.is_set():
+            # Stay at most one batch ahead of the workers
+            room = self.batch_size - len(self._scheduler)
+            alerts = []
+            try:
+                async with self.session_factory() as db:
+                    if len(self._scheduler):
+                        await self._refresh(db)
+                    if room > 0:
+                        alerts = await crud.claim_pending_alerts_async(db, room, self.lease_seconds,
+                                                                       self.aging_seconds)
+            except Exception as e:
+                logger.error(f"Error claiming alerts for triage: {str(e)}")
+            self.stats["claimed"] += len(alerts)
+            for alert in alerts:
+                self._scheduler.put(alert, self.classify(alert), alert.pending_since or alert.created_at)
+            if room == 0 or len(alerts) < room:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _refresh(self, db) -> None:
+        """Drop queued jobs whose alert resolved and merge changes into the rest."""
+        resolved = []
+        for alert in await crud.get_alerts_by_ids_async(db, self._scheduler.ids()):
+            if alert.id not in self._scheduler:
+                continue
+            if alert.status == "resolved":
+                self._scheduler.discard(alert.id)
+                resolved.append(alert.id)
+            else:
+                self._scheduler.put(alert, self.classify(alert))
+        if resolved:
+            # Back to pending: skipped while resolved, claimed again if the alert re-fires
+            await crud.release_claims_async(db, resolved)
+            self.stats["dropped"] += len(resolved)
+
+    async def _work_loop(self) -> None:
+        while True:
+            alert = await self._scheduler.get()
+            self._active[alert.id] = alert
+            try:
+                await self.triage(alert)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # The claim expires after lease_seconds and the alert is retried
+                self._active.pop(alert.id, None)
+                logger.error(f"Error triaging alert {alert.id}: {str(e)}")
+
+    async def triage(self, alert: models.Alert) -> Dict[str, Any]:
+        """Analyze one claimed alert and store the outcome.
+
+        A result from the local classifier means no model answered; it is
+        not stored, and the alert stays claimed until its lease expires.
+        """
+        result = await self._analyze(alert)
+        if result.get("model") == "local":
+            # Every provider failed and the local classifier answered: not worth storing as a triage.
+            # The claim is left to expire after lease_seconds, so the alert is retried then.
+            self.stats["deferred"] += 1
+            self._active.pop(alert.id, None)
+            logger.warning(f"No model available to triage alert {alert.id}; retrying after the claim lease")
+            return {"triage_status": "triaging"}
+        if "error" in result:
+            self.stats["failed"] += 1
+            outcome = {"triage_status": "triage_failed", "triage_notes": f"AI triage failed: {result['error']}"}
+        else:
+            self.stats["triaged"] += 1
+            outcome = {"triage_status": "triaged", "triage_notes": format_notes(result, result.get("model", self.model))}
+
+        # A finished analysis is always saved, even if stop() cancels this worker meanwhile
+        self._active.pop(alert.id, None)
+        save = asyncio.create_task(self._save(alert, outcome))
+        self._saving.add(save)
+        save.add_done_callback(self._saving.discard)
+        await asyncio.shield(save)
+        return outcome
+
+    async def _save(self, alert: models.Alert, outcome: Dict[str, str]) -> None:
+        async with self.session_factory() as db:
+            saved = await crud.save_triage_results_async(db, [{"id": alert.id, "status": alert.status, **outcome}])
+        if saved and self.broadcaster is not None:
+            self.broadcaster.publish("triaged", [{
+                "id": alert.id, "title": alert.title, "severity": alert.severity, "status": alert.status,
+                "source": alert.source, "labels": alert.labels, **outcome
+            }])
+
+    async def _analyze(self, alert: models.Alert) -> Dict[str, Any]:
+        return await self.analyzer.analyze_logs_async(
+            build_prompt(alert), self.model, self._client, compress=False, prefiltered=True, limits=self._limits
+        )
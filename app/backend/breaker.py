@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop calling a provider that keeps failing, and probe it again later.
+
+    Closed: calls pass; `failure_threshold` consecutive failures open the
+    breaker. Open: calls are refused without touching the network until
+    `recovery_timeout` seconds have passed, or longer if the provider sent
+    a Retry-After (which opens the breaker at once). Half-open: up to
+    `half_open_max_calls` trial calls pass; a success closes the breaker
+    and a failure opens it again. Thread-safe.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._open_until = 0.0
+        self._probes = 0
+        self.stats = {"opened": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() >= self._open_until:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def available(self) -> bool:
+        """Whether a call would currently be let through (does not reserve it)."""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and self._probes < self.half_open_max_calls)
+
+    def allow(self) -> bool:
+        """Reserve a call; callers must report it with record_success/record_failure or release."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def release(self) -> None:
+        """Give back a half-open trial slot whose call ended without an outcome."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if retry_after is not None:
+                self._open(retry_after)
+            elif state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open(self.recovery_timeout)
+
+    def _open(self, seconds: float) -> None:
+        if self._state != OPEN:
+            self.stats["opened"] += 1
+        self._state = OPEN
+        # Never shorten a longer wait already requested by the provider
+        self._open_until = max(self._open_until, self._clock() + seconds)
+        self._probes = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "retry_in": round(max(self._open_until - self._clock(), 0.0), 1) if state == OPEN else 0.0,
+                **self.stats
+            }
+
+
+class BreakerRegistry:
+    """One circuit breaker per provider, created on first use."""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name, **self.kwargs)
+            return self._breakers[name]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+_shared_registry: Optional[BreakerRegistry] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_breakers(**kwargs) -> BreakerRegistry:
+    """Return the process-wide breakers, so every analyzer sees the same provider state."""
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = BreakerRegistry(**kwargs)
+        return _shared_registry
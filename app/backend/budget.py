@@ -0,0 +1,109 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from .classifier import SeverityClassifier, SEVERITY_RANK
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken not installed or encoding unavailable offline
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, otherwise approximate (~4 chars per token)."""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+class PromptBudgeter:
+    """Fit log lines into a token budget, keeping the highest-signal lines.
+
+    Lines are admitted in priority order: lines the classifier rates above
+    "low" (most severe first), then `context_lines` lines around each of
+    them, then everything else in log order. The kept lines are emitted in
+    their original order with a marker where lines were dropped.
+    """
+
+    def __init__(self, classifier: Optional[SeverityClassifier] = None, context_lines: int = 2):
+        self.classifier = classifier or SeverityClassifier()
+        self.context_lines = context_lines
+
+    def fit(self, text: str, budget: int) -> Tuple[str, Dict[str, Any]]:
+        """Return (text within budget, report of what was kept and dropped)."""
+        # Omission markers are not known up front, so shrink and retry on overshoot
+        target = budget
+        for _ in range(3):
+            kept_text, report = self._fit(text, target)
+            overshoot = report["prompt_tokens"] - budget
+            if overshoot <= 0:
+                break
+            target = max(target - overshoot, 1)
+        report["budget_tokens"] = budget
+        return kept_text, report
+
+    def _fit(self, text: str, budget: int) -> Tuple[str, Dict[str, Any]]:
+        total_tokens = count_tokens(text)
+        lines = text.split("\n")
+        report = {
+            "budget_tokens": budget,
+            "original_tokens": total_tokens,
+            "prompt_tokens": total_tokens,
+            "kept_lines": len(lines),
+            "dropped_lines": 0
+        }
+        if total_tokens <= budget:
+            return text, report
+
+        line_tokens = [count_tokens(line) + 1 for line in lines]
+        kept = set()
+        used = 0
+        for index in self._priority_order(lines):
+            cost = line_tokens[index]
+            if used + cost > budget:
+                continue
+            kept.add(index)
+            used += cost
+
+        if not kept and lines:
+            # Even the most important line is too long: keep a truncated prefix
+            index = self._priority_order(lines)[0]
+            kept_text = lines[index][:budget * 4]
+            report.update(prompt_tokens=count_tokens(kept_text), kept_lines=1, dropped_lines=len(lines) - 1)
+            return kept_text, report
+
+        output: List[str] = []
+        gap = 0
+        for index, line in enumerate(lines):
+            if index in kept:
+                if gap:
+                    output.append(f"[... {gap} lines omitted ...]")
+                    gap = 0
+                output.append(line)
+            else:
+                gap += 1
+        if gap:
+            output.append(f"[... {gap} lines omitted ...]")
+
+        kept_text = "\n".join(output)
+        report.update(
+            prompt_tokens=count_tokens(kept_text),
+            kept_lines=len(kept),
+            dropped_lines=len(lines) - len(kept)
+        )
+        return kept_text, report
+
+    def _priority_order(self, lines: List[str]) -> List[int]:
+        ranks = [SEVERITY_RANK[self.classifier.classify(line)[0]] for line in lines]
+        signal = sorted((i for i, rank in enumerate(ranks) if rank > 0), key=lambda i: (-ranks[i], i))
+
+        order: List[int] = list(signal)
+        seen = set(order)
+        for index in signal:
+            for offset in range(1, self.context_lines + 1):
+                for neighbour in (index - offset, index + offset):
+                    if 0 <= neighbour < len(lines) and neighbour not in seen:
+                        seen.add(neighbour)
+                        order.append(neighbour)
+        order.extend(i for i in range(len(lines)) if i not in seen)
+        return order
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class AnalysisCache:
+    """Two-tier cache for analysis results: an in-memory LRU in front of SQLite.
+
+    Entries expire after `ttl` seconds. The memory tier holds at most
+    `max_memory_entries` results and the disk tier at most `max_disk_entries`;
+    the least recently used entries are evicted first. Pass `path=None` to
+    keep the cache in memory only; a "~" in `path` is expanded and missing
+    directories are created.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 256,
+                 max_disk_entries: int = 10000, ttl: float = 24 * 3600):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.stats = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "evictions": 0}
+
+        if path:
+            path = os.path.expanduser(path)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_analysis_cache_accessed_at ON analysis_cache (accessed_at)"
+            )
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(normalized_text: str, model: str, prompt_version: str) -> str:
+        """Build a content-addressed key from the normalized log text, model and prompt version."""
+        digest = hashlib.sha256()
+        for part in (prompt_version, model, normalized_text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    self.stats["memory_hits"] += 1
+                    return json.loads(value)
+                del self._memory[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if now - created_at <= self.ttl:
+                        self._conn.execute(
+                            "UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._conn.commit()
+                        self._remember(key, created_at, value)
+                        self.stats["hits"] += 1
+                        self.stats["disk_hits"] += 1
+                        return json.loads(value)
+                    self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result under key in both tiers."""
+        now = time.time()
+        value = json.dumps(result)
+        with self._lock:
+            self._remember(key, now, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._evict_disk(now)
+                self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM analysis_cache")
+                self._conn.commit()
+
+    def _remember(self, key: str, created_at: float, value: str) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now: float) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl,)
+        ).rowcount
+        overflow = self._conn.execute(
+            "DELETE FROM analysis_cache WHERE key IN ("
+            "SELECT key FROM analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,)
+        ).rowcount
+        self.stats["evictions"] += max(expired, 0) + max(overflow, 0)
+
+
+_shared_caches: Dict[Optional[str], AnalysisCache] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_cache(path: Optional[str], **kwargs) -> AnalysisCache:
+    """Return the process-wide cache for path, so short-lived analyzers share hits."""
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = AnalysisCache(path, **kwargs)
+        return _shared_caches[path]
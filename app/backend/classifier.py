@@ -0,0 +1,92 @@
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Ordered from least to most severe
+SEVERITY_LEVELS = ["low", "medium", "high", "critical"]
+SEVERITY_RANK = {level: rank for rank, level in enumerate(SEVERITY_LEVELS)}
+
+DEFAULT_CATEGORY = "general"
+
+# Default pattern table. Patterns are matched case-insensitively as plain
+# substrings unless "regex" is true.
+DEFAULT_PATTERNS: List[Dict[str, Any]] = [
+    {"pattern": "kernel panic", "severity": "critical", "category": "kernel"},
+    {"pattern": "filesystem read-only", "severity": "critical", "category": "storage"},
+    {"pattern": "remounting filesystem read-only", "severity": "critical", "category": "storage"},
+    {"pattern": "failed password for", "severity": "high", "category": "security"},
+    {"pattern": "authentication failure", "severity": "high", "category": "security"},
+    {"pattern": "invalid user", "severity": "high", "category": "security"},
+    {"pattern": "possible syn flooding", "severity": "high", "category": "network"},
+    {"pattern": "segfault", "severity": "high", "category": "application"},
+    {"pattern": "i/o error", "severity": "high", "category": "storage"},
+    {"pattern": "no space left on device", "severity": "high", "category": "storage"},
+    {"pattern": "cpu temperature above threshold", "severity": "medium", "category": "hardware"},
+    {"pattern": "out of memory", "severity": "medium", "category": "resource"},
+    {"pattern": "killed process", "severity": "medium", "category": "resource"},
+    {"pattern": "failed to start", "severity": "medium", "category": "service"},
+    {"pattern": "address already in use", "severity": "medium", "category": "network"},
+    {"pattern": "connection refused", "severity": "medium", "category": "network"},
+    {"pattern": "timed out", "severity": "medium", "category": "network"},
+    {"pattern": r"\b(?:error|err|fatal)\b", "severity": "medium", "category": DEFAULT_CATEGORY, "regex": True},
+    {"pattern": r"\bwarn(?:ing)?\b", "severity": "medium", "category": DEFAULT_CATEGORY, "regex": True},
+]
+
+
+class SeverityClassifier:
+    """Tag log lines with a severity and category using one compiled regex.
+
+    All patterns are combined into a single alternation of named groups, so
+    each line is scanned once no matter how many patterns there are. When
+    several patterns match a line, the most severe one wins. Lines matching
+    nothing are "low".
+    """
+
+    def __init__(self, patterns: Optional[List[Dict[str, Any]]] = None):
+        self.patterns = patterns if patterns is not None else DEFAULT_PATTERNS
+        self._rules: Dict[str, Tuple[str, str]] = {}
+        alternatives = []
+        for index, entry in enumerate(self.patterns):
+            severity = entry["severity"].lower()
+            if severity not in SEVERITY_RANK:
+                raise ValueError(f"Unknown severity {entry['severity']!r} for pattern {entry['pattern']!r}")
+            name = f"p{index}"
+            source = entry["pattern"] if entry.get("regex") else re.escape(entry["pattern"])
+            alternatives.append(f"(?P<{name}>{source})")
+            self._rules[name] = (severity, entry.get("category", DEFAULT_CATEGORY))
+        self._regex = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "SeverityClassifier":
+        """Load the pattern table from a JSON file (a list of pattern entries)."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def classify(self, line: str) -> Tuple[str, str]:
+        """Return (severity, category) for a single log line."""
+        best = ("low", DEFAULT_CATEGORY)
+        if self._regex is None:
+            return best
+        best_rank = -1
+        for match in self._regex.finditer(line):
+            severity, category = self._rules[match.lastgroup]
+            rank = SEVERITY_RANK[severity]
+            if rank > best_rank:
+                best, best_rank = (severity, category), rank
+        return best
+
+    def classify_lines(self, lines: Iterable[str]) -> Iterator[Dict[str, str]]:
+        """Yield {"line", "severity", "category"} for every non-empty line."""
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            severity, category = self.classify(line)
+            yield {"line": line, "severity": severity, "category": category}
+
+    def filter_lines(self, lines: Iterable[str], threshold: str) -> Iterator[str]:
+        """Yield only the lines at or above the threshold severity."""
+        min_rank = SEVERITY_RANK[threshold.lower()]
+        for tagged in self.classify_lines(lines):
+            if SEVERITY_RANK[tagged["severity"]] >= min_rank:
+                yield tagged["line"]
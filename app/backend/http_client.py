@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional, TypeVar
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Pool sizing, timeouts and retry policy shared by every outbound provider call
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "120"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Provider POSTs are billed and not idempotent, so only failures before the
+# request reached the server are retried; a read timeout is not.
+RETRY_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+T = TypeVar("T")
+
+# Event loop thread that runs async code on behalf of synchronous callers, and its client
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_client: Optional[httpx.AsyncClient] = None
+_background_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide requests session with pooled keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def make_async_client(max_connections: Optional[int] = None) -> httpx.AsyncClient:
+    """Create an httpx client with the shared pool and timeout settings.
+
+    httpx clients are bound to the event loop they are used on, so async
+    callers create one per run and reuse it for every request in that run.
+    """
+    limits = httpx.Limits(
+        max_connections=max_connections or POOL_MAXSIZE,
+        max_keepalive_connections=max_connections or POOL_MAXSIZE,
+        keepalive_expiry=KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _background_loop
+    with _background_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="http-client-loop", daemon=True).start()
+            _background_loop = loop
+        return _background_loop
+
+
+def get_background_client() -> httpx.AsyncClient:
+    """Return the pooled httpx client for coroutines run through run_sync or iter_sync.
+
+    It lives on the background loop, so synchronous callers keep their
+    keep-alive connections from one call to the next.
+    """
+    global _background_client
+    with _background_lock:
+        if _background_client is None:
+            _background_client = make_async_client()
+        return _background_client
+
+
+def run_sync(awaitable: Awaitable[T]) -> T:
+    """Run a coroutine on the background event loop and wait for its result.
+
+    Lets synchronous entry points wrap their async implementation. Unlike
+    asyncio.run this also works in a thread that already runs an event loop
+    (an async handler, a notebook); that thread is blocked meanwhile.
+    """
+    loop = _get_background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync called from the background loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(_await(awaitable), loop).result()
+
+
+def iter_sync(agen: AsyncIterator[T]) -> Iterator[T]:
+    """Iterate an async generator from synchronous code, one item at a time on the background loop."""
+    try:
+        while True:
+            try:
+                yield run_sync(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        # Runs the generator's cleanup (closing responses, releasing breakers) if iteration stopped early
+        run_sync(agen.aclose())
+
+
+async def _await(awaitable: Awaitable[Any]) -> Any:
+    return await awaitable
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_FACTOR * (2 ** attempt)))
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """Seconds the server asked us to wait in its Retry-After header, if any."""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _should_retry(status_code: int, attempt: int, max_retries: int) -> bool:
+    return status_code in RETRY_STATUS_CODES and attempt < max_retries
+
+
+def _retry_delay(response, attempt: int) -> Optional[float]:
+    """Delay before retrying a response, or None when it should be returned as is.
+
+    A Retry-After longer than the backoff cap is not waited out in-line;
+    the caller gets the response and its circuit breaker keeps the
+    provider closed for that long instead.
+    """
+    retry_after = retry_after_seconds(response)
+    if retry_after is None:
+        return backoff_delay(attempt)
+    return retry_after if retry_after <= BACKOFF_MAX else None
+
+
+def request_with_retry(method: str, url: str, session: Optional[requests.Session] = None,
+                       max_retries: Optional[int] = None, **kwargs) -> requests.Response:
+    """Send a request on the shared session, retrying transient failures.
+
+    Connection errors and retryable status codes are retried with jittered
+    exponential backoff, or after the server's Retry-After. Read timeouts
+    are raised at once, since the server may already be handling the
+    request. The last response is returned once retries are exhausted so
+    callers keep their own status handling. Responses that are retried are
+    closed, so stream=True requests do not leak pooled connections.
+    """
+    session = session or get_session()
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    attempt = 0
+    while True:
+        try:
+            response = session.request(method, url, **kwargs)
+        except requests.ConnectionError as e:
+            if attempt >= max_retries:
+                raise
+            logger.warning(f"{method} {url} failed ({e}), retrying")
+            delay = backoff_delay(attempt)
+        else:
+            if not _should_retry(response.status_code, attempt, max_retries):
+                return response
+            delay = _retry_delay(response, attempt)
+            if delay is None:
+                return response
+            logger.warning(f"{method} {url} returned {response.status_code}, retrying")
+            # An unread streamed body would hold its pooled connection until garbage-collected
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+async def async_request_with_retry(client: httpx.AsyncClient, method: str, url: str,
+                                   max_retries: Optional[int] = None, stream: bool = False,
+                                   **kwargs) -> httpx.Response:
+    """Async counterpart of request_with_retry for httpx clients.
+
+    Only connect-phase transport errors (RETRY_TRANSPORT_ERRORS) are
+    retried. With stream=True the body is not read: the caller iterates it and must
+    aclose the response. Streamed responses that are retried are closed here.
+    """
+    max_retries = MAX_RETRIES if max_retries is None else max_retries
+    attempt = 0
+    while True:
+        try:
+            if stream:
+                response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+            else:
+                response = await client.request(method, url, **kwargs)
+        except RETRY_TRANSPORT_ERRORS as e:
+            if attempt >= max_retries:
+                raise
+            logger.warning(f"{method} {url} failed ({e}), retrying")
+            delay = backoff_delay(attempt)
+        else:
+            if not _should_retry(response.status_code, attempt, max_retries):
+                return response
+            delay = _retry_delay(response, attempt)
+            if delay is None:
+                return response
+            logger.warning(f"{method} {url} returned {response.status_code}, retrying")
+            if stream:
+                await response.aclose()
+        await asyncio.sleep(delay)
+        attempt += 1
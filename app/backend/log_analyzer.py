@@ -1,19 +1,76 @@
 import os
-from typing import List, Dict, Any, Optional
-import requests
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import List, Dict, Any, AsyncIterator, Optional, Iterable, Iterator, Tuple, Union
+import httpx
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
 import json
 
+from .breaker import BreakerRegistry, get_shared_breakers
+from .budget import PromptBudgeter, count_tokens
+from .cache import AnalysisCache, get_shared_cache
+from .classifier import SeverityClassifier, SEVERITY_RANK
+from .http_client import (RETRY_STATUS_CODES, async_request_with_retry, get_background_client, iter_sync,
+                          make_async_client, retry_after_seconds, run_sync)
+from .rate_limit import AsyncRateLimiter, ConcurrencyLimits
+from .router import AUTO_MODEL, ProviderRouter, get_shared_router
+from .streaming import IssueStreamParser, SSEDecoder, openrouter_delta
+from .templates import TemplateMiner
+
 load_dotenv()
 
+# Bump whenever the prompts change so cached analyses are not reused
+PROMPT_VERSION = "2"
+
 class LogAnalyzer:
     def __init__(self):
         self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY", "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")
         self.huggingface_api_key = os.getenv("HUGGINGFACE_API_KEY")
         self.openrouter_model = os.getenv("OPENROUTER_MODEL", "deepseek/deepseek-r1-0528:free")
         self.huggingface_model = os.getenv("HUGGINGFACE_MODEL", "mistralai/Mistral-7B-Instruct-v0.1")
+        # Approximate token budget for each chunk sent by analyze_stream
+        self.chunk_token_budget = int(os.getenv("LOG_CHUNK_TOKENS", "6000"))
+        # Local severity pre-classifier; only lines at or above the threshold reach the LLM
+        patterns_file = os.getenv("SEVERITY_PATTERNS_FILE")
+        self.classifier = SeverityClassifier.from_file(patterns_file) if patterns_file else SeverityClassifier()
+        self.severity_threshold = os.getenv("LOG_SEVERITY_THRESHOLD", "low").lower()
+        if self.severity_threshold not in SEVERITY_RANK:
+            raise ValueError(f"Invalid LOG_SEVERITY_THRESHOLD: {self.severity_threshold}")
+        # Collapse repeated lines into templates before they reach the LLM
+        self.template_mining = os.getenv("LOG_TEMPLATE_MINING", "true").lower() == "true"
+        # Number of chunks analyzed in parallel and per-provider request rate limits
+        self.llm_concurrency = int(os.getenv("LLM_CONCURRENCY", "4"))
+        self.provider_rate_limits = {
+            "openrouter": float(os.getenv("OPENROUTER_MAX_RPS", "2")),
+            "huggingface": float(os.getenv("HUGGINGFACE_MAX_RPS", "1"))
+        }
+        self._rate_limiters: Dict[str, AsyncRateLimiter] = {}
+        # Per-provider circuit breakers, shared by every analyzer in the process
+        self.breakers: BreakerRegistry = get_shared_breakers(
+            failure_threshold=int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5")),
+            recovery_timeout=float(os.getenv("LLM_BREAKER_RECOVERY_SECONDS", "30"))
+        )
+        # Latency-aware routing for model="auto", shared by every analyzer in the process
+        self.router: ProviderRouter = get_shared_router(
+            hedge=os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true",
+            min_hedge_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "2")),
+            max_hedge_delay=float(os.getenv("LLM_HEDGE_MAX_DELAY", "30")),
+            max_error_rate=float(os.getenv("LLM_ROUTER_MAX_ERROR_RATE", "0.5")),
+            window_seconds=float(os.getenv("LLM_ROUTER_WINDOW_SECONDS", "300"))
+        )
+
+        # Result cache shared by every analyzer in the process; in memory unless given a file to persist to
+        self.cache: Optional[AnalysisCache] = None
+        if os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true":
+            self.cache = get_shared_cache(
+                os.getenv("ANALYSIS_CACHE_PATH") or None,
+                max_memory_entries=int(os.getenv("ANALYSIS_CACHE_MEMORY_ENTRIES", "256")),
+                max_disk_entries=int(os.getenv("ANALYSIS_CACHE_DISK_ENTRIES", "10000")),
+                ttl=float(os.getenv("ANALYSIS_CACHE_TTL", str(24 * 3600)))
+            )
         
         # Model configurations
         self.model_configs = {
@@ -25,14 +82,26 @@ class LogAnalyzer:
                     "HTTP-Referer": "http://localhost:8501",
                     "X-Title": "Linux Log Analyzer AI",
                     "Content-Type": "application/json"
-                }
+                },
+                # Token budget for the whole prompt, leaving room for the completion
+                "max_prompt_tokens": 32000
             },
             "mistralai/Mistral-7B-Instruct-v0.1": {
                 "provider": "huggingface",
-                "endpoint": "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.1"
+                "endpoint": "https://api-inference.huggingface.co/models/mistralai/Mistral-7B-Instruct-v0.1",
+                "max_prompt_tokens": 6000
             }
         }
         
+        # Models tried, in order, when the requested one fails or its provider's breaker is open;
+        # the local classifier answers when all of them fail
+        fallback_models = os.getenv("LLM_FALLBACK_MODELS")
+        self.fallback_models = (
+            list(self.model_configs) if fallback_models is None
+            else [m.strip() for m in fallback_models.split(",") if m.strip()]
+        )
+        self.local_fallback = os.getenv("LLM_LOCAL_FALLBACK", "true").lower() == "true"
+
         # Configure logging
         logging.basicConfig(
             level=logging.INFO,
@@ -40,85 +109,619 @@ class LogAnalyzer:
         )
         self.logger = logging.getLogger(__name__)
 
+        self.budgeter = PromptBudgeter(self.classifier)
+
     def preprocess_logs(self, log_text: str) -> str:
         """Preprocess log text for better analysis."""
         # Remove empty lines and normalize whitespace
         lines = [line.strip() for line in log_text.split('\n') if line.strip()]
         return '\n'.join(lines)
 
-    def analyze_logs(self, log_text: str, model: str = None) -> Dict[str, Any]:
-        """Analyze logs using the specified model."""
+    def classify_logs(self, log_text: str) -> List[Dict[str, str]]:
+        """Tag every log line with a severity and category using the local classifier."""
+        return list(self.classifier.classify_lines(log_text.split('\n')))
+
+    def filter_logs(self, lines: Iterable[str]) -> Iterable[str]:
+        """Drop lines below the configured severity threshold."""
+        if self.severity_threshold == "low":
+            return lines
+        return self.classifier.filter_lines(lines, self.severity_threshold)
+
+    def compress_logs(self, log_text: str) -> str:
+        """Collapse repeated log lines into templates with counts and sample values."""
+        return TemplateMiner().add_lines(log_text.split('\n')).render()
+
+    def _estimate_tokens(self, text: str) -> int:
+        """Roughly estimate the token count of a piece of text (~4 chars per token)."""
+        return len(text) // 4 + 1
+
+    def _iter_log_lines(self, source: Union[str, os.PathLike, Iterable[str]]) -> Iterator[str]:
+        """Lazily yield log lines from a file path or an iterable of lines."""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "r", encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    yield line
+        else:
+            for line in source:
+                if isinstance(line, bytes):
+                    line = line.decode("utf-8", errors="replace")
+                yield line
+
+    def iter_chunks(self, source: Union[str, os.PathLike, Iterable[str]], max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Split a log source into preprocessed chunks on line boundaries.
+
+        Each chunk stays within max_tokens (estimated); only one chunk is held
+        in memory at a time. Lines longer than the budget are truncated.
+        """
+        max_tokens = max_tokens or self.chunk_token_budget
+        max_chars = max_tokens * 4
+        chunk: List[str] = []
+        chunk_tokens = 0
+        for line in self._iter_log_lines(source):
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) > max_chars:
+                line = line[:max_chars]
+            line_tokens = self._estimate_tokens(line)
+            if chunk and chunk_tokens + line_tokens > max_tokens:
+                yield '\n'.join(chunk)
+                chunk = []
+                chunk_tokens = 0
+            chunk.append(line)
+            chunk_tokens += line_tokens
+        if chunk:
+            yield '\n'.join(chunk)
+
+    def analyze_stream(self, source: Union[str, os.PathLike, Iterable[str]], model: str = None, max_tokens: Optional[int] = None, concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Analyze an arbitrarily large log (file path or iterable of lines) chunk by chunk.
+
+        With concurrency > 1 the chunks are fanned out to the provider through
+        analyze_stream_async; otherwise they are analyzed one after another.
+        Called from a running event loop (an async handler, a notebook), where
+        asyncio.run is not allowed, it falls back to sequential analysis;
+        await analyze_stream_async there instead.
+        """
+        concurrency = concurrency or self.llm_concurrency
+        if concurrency > 1:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(self.analyze_stream_async(source, model, max_tokens, concurrency))
+            self.logger.warning("analyze_stream called from a running event loop; analyzing chunks sequentially")
+
+        results = []
+        for index, chunk in enumerate(self._stream_chunks(source, max_tokens)):
+            self.logger.info(f"Analyzing chunk {index + 1}")
+            results.append(self.analyze_logs(chunk, model=model, compress=False, prefiltered=True))
+        return self._merge_results(results)
+
+    def _stream_chunks(self, source: Union[str, os.PathLike, Iterable[str]], max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Chunk a log source, mining templates over the whole source first when enabled.
+
+        The miner only keeps one entry per template, so memory stays bounded
+        by the number of distinct templates rather than the size of the log.
+        """
+        lines = self.filter_logs(self._iter_log_lines(source))
+        if self.template_mining:
+            miner = TemplateMiner().add_lines(lines)
+            lines = miner.render_lines() if miner.total_lines else iter(())
+        return self.iter_chunks(lines, max_tokens)
+
+    def _merge_results(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Merge per-chunk analysis results into a single result.
+
+        Markers of single results are carried over: `model` when every
+        chunk was answered by the same other model, the chunks' `errors`,
+        and `truncation` summed over the chunks that were trimmed. Chunks
+        answered by the local classifier mark the result `degraded` and are
+        summarized once instead of repeating their fallback summary.
+        """
+        if not results:
+            return {"error": "No log lines to analyze"}
+
+        successful = [r for r in results if "error" not in r]
+        errors = [r["error"] for r in results if "error" in r]
+        if not successful:
+            return {"error": errors[0]}
+
+        summaries = []
+        issues = []
+        seen = set()
+        local_chunks = 0
+        truncation = {"chunks": 0, "kept_lines": 0, "dropped_lines": 0}
+        for result in successful:
+            for error in result.get("errors", []):
+                # Every chunk that fell back repeats the same provider errors
+                if error not in errors:
+                    errors.append(error)
+            if result.get("truncation"):
+                truncation["chunks"] += 1
+                truncation["kept_lines"] += result["truncation"]["kept_lines"]
+                truncation["dropped_lines"] += result["truncation"]["dropped_lines"]
+            if result.get("model") == "local":
+                local_chunks += 1
+            elif result.get("summary") and result["summary"] not in summaries:
+                summaries.append(result["summary"])
+            for issue in result.get("issues", []):
+                key = (issue.get("description", "").strip().lower(), str(issue.get("severity", "")).lower())
+                if key in seen:
+                    continue
+                seen.add(key)
+                issues.append(issue)
+
+        if local_chunks:
+            summaries.append(f"LLM analysis unavailable for {local_chunks} of {len(results)} chunks; "
+                             f"their lines were rated by the local classifier.")
+        merged = {
+            "summary": " ".join(summaries),
+            "issues": issues,
+            "timestamp": datetime.now().isoformat()
+        }
+        models = {result.get("model") for result in successful}
+        if len(models) == 1 and None not in models:
+            merged["model"] = models.pop()
+        if local_chunks:
+            merged["degraded"] = True
+            merged["local_chunks"] = local_chunks
+        if errors:
+            merged["errors"] = errors
+        if truncation["chunks"]:
+            merged["truncation"] = truncation
+        return merged
+
+    def analyze_logs(self, log_text: str, model: str = None, compress: Optional[bool] = None, prefiltered: bool = False) -> Dict[str, Any]:
+        """Analyze logs using the specified model.
+
+        Lines below the severity threshold are dropped unless prefiltered is
+        True, and unless compress is False (or template mining is disabled),
+        repeated lines are collapsed into templates before being sent.
+
+        If the model fails, or its provider's circuit breaker is open, the
+        fallback models are tried in turn and, last, the local classifier;
+        the result then names the model that answered and lists the errors.
+        With model="auto" the router picks the model, as in analyze_logs_async.
+
+        Runs analyze_logs_async on the shared background event loop, so it
+        also works from code that already runs an event loop.
+        """
+        return run_sync(self.analyze_logs_async(log_text, model, get_background_client(), compress, prefiltered))
+
+    def _begin_request(self, log_text: str, model: str, compress: Optional[bool], prefiltered: bool):
+        """Common start of a single-model request.
+
+        Returns (early result, cache key, prepared text, truncation); the
+        early result is set when no request is needed (cache hit, nothing
+        above the severity threshold) or possible (unsupported provider).
+        """
+        provider = self.model_configs[model]["provider"]
+        if provider not in ("openrouter", "huggingface"):
+            return {"error": f"Provider {provider} not supported"}, None, None, None
+        if compress is None:
+            compress = self.template_mining
+
+        cache_key = self._cache_key(log_text, model, compress, prefiltered)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached, None, None, None
+
+        log_text = self._prepare_log_text(log_text, compress, prefiltered)
+        if not log_text:
+            return self._below_threshold_result(), None, None, None
+        log_text, truncation = self._fit_to_budget(log_text, model)
+        return None, cache_key, log_text, truncation
+
+    def _finish_request(self, model: str, started: float, result: Dict[str, Any], cache_key: Optional[str],
+                        truncation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Record the request's latency with the router, then annotate and cache its result."""
+        self.router.record(model, time.monotonic() - started, "error" not in result)
+        result = self._attach_truncation(result, truncation)
+        self._cache_store(cache_key, result)
+        return result
+
+    def analyze_logs_iter(self, log_text: str, model: str = None, compress: Optional[bool] = None,
+                          prefiltered: bool = False) -> Iterator[Dict[str, Any]]:
+        """Analyze logs like analyze_logs, yielding findings as the model writes them.
+
+        Yields {"event": "summary", "data": {"summary": ...}} and
+        {"event": "issue", "data": issue} while an OpenRouter response streams
+        in, then always ends with {"event": "result", "data": result}. The
+        final result is authoritative: it holds every issue, and if the
+        stream failed part way it comes from the fallback chain instead, so
+        consumers should replace what they showed so far. Other providers,
+        cache hits and model="auto" yield the final result only.
+
+        A synchronous wrapper over analyze_logs_iter_async.
+        """
+        return iter_sync(self.analyze_logs_iter_async(log_text, model, get_background_client(), compress, prefiltered))
+
+    async def analyze_logs_iter_async(self, log_text: str, model: str = None, client: Optional[httpx.AsyncClient] = None,
+                                      compress: Optional[bool] = None,
+                                      prefiltered: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of analyze_logs_iter."""
+        if client is None:
+            async with make_async_client() as own_client:
+                async for event in self.analyze_logs_iter_async(log_text, model, own_client, compress, prefiltered):
+                    yield event
+            return
+
         if not model:
             model = self.openrouter_model
+        config = self.model_configs.get(model)
+        if config is None or config["provider"] != "openrouter":
+            yield {"event": "result", "data": await self.analyze_logs_async(log_text, model, client, compress, prefiltered)}
+            return
+
+        result: Dict[str, Any] = {"error": "No analysis result"}
+        async for event in self._stream_model_async(client, log_text, model, compress, prefiltered):
+            if event["event"] == "result":
+                result = event["data"]
+            else:
+                yield event
+        if "error" in result:
+            result = await self._run_chain_async(log_text, model, self.fallback_chain(model)[1:], client,
+                                                 compress, prefiltered, [(model, result["error"])])
+        yield {"event": "result", "data": result}
+
+    async def _stream_model_async(self, client: httpx.AsyncClient, log_text: str, model: str,
+                                  compress: Optional[bool], prefiltered: bool) -> AsyncIterator[Dict[str, Any]]:
+        """Streaming counterpart of _analyze_model_async for OpenRouter models; the last event is the result."""
+        early, cache_key, log_text, truncation = self._begin_request(log_text, model, compress, prefiltered)
+        if early is not None:
+            yield {"event": "result", "data": early}
+            return
+
+        breaker = self.breakers.get("openrouter")
+        if not breaker.allow():
+            yield {"event": "result", "data": {"error": "openrouter circuit open"}}
+            return
+        try:
+            await self._get_rate_limiter("openrouter").acquire()
+            started = time.monotonic()
+            async for event in self._stream_openrouter_async(client, log_text):
+                if event["event"] == "result":
+                    event = {"event": "result",
+                             "data": self._finish_request(model, started, event["data"], cache_key, truncation)}
+                yield event
+        finally:
+            breaker.release()
+
+    async def analyze_logs_async(self, log_text: str, model: str = None, client: Optional[httpx.AsyncClient] = None, compress: Optional[bool] = None, prefiltered: bool = False,
+                                 limits: Optional[ConcurrencyLimits] = None) -> Dict[str, Any]:
+        """Async counterpart of analyze_logs, rate limited per provider.
+
+        With model="auto" the router picks among the models whose breaker is
+        not open and may hedge the request to a second one; the result then
+        names the model that answered. With `limits`, every provider call
+        (fallbacks and hedges included) holds a slot of the provider it goes to.
+        """
+        if client is None:
+            async with make_async_client() as own_client:
+                return await self.analyze_logs_async(log_text, model, own_client, compress, prefiltered, limits)
+
+        if not model:
+            model = self.openrouter_model
+
+        errors: List[Tuple[str, str]] = []
+        if model == AUTO_MODEL:
+            candidates = [
+                m for m in self.routable_models()
+                if self.breakers.get(self.model_configs[m]["provider"]).available()
+            ]
+            if candidates:
+                routed, result = await self.router.run(
+                    candidates, lambda m: self._analyze_model_async(log_text, m, client, compress, prefiltered, limits)
+                )
+                if "error" not in result:
+                    return self._answered_by(result, model, routed, errors)
+                errors.append((routed, result["error"]))
+            return self._degraded_result(log_text, errors)
 
         if model not in self.model_configs:
             return {"error": f"Model {model} not supported"}
+        return await self._run_chain_async(log_text, model, self.fallback_chain(model), client, compress, prefiltered,
+                                           errors, limits)
+
+    async def _run_chain_async(self, log_text: str, requested: str, chain: List[str], client: httpx.AsyncClient,
+                               compress: Optional[bool], prefiltered: bool, errors: List[Tuple[str, str]],
+                               limits: Optional[ConcurrencyLimits] = None) -> Dict[str, Any]:
+        """Try each model of the chain in turn, then fall back to the local classifier."""
+        for candidate in chain:
+            result = await self._analyze_model_async(log_text, candidate, client, compress, prefiltered, limits)
+            if "error" not in result:
+                return self._answered_by(result, requested, candidate, errors)
+            errors.append((candidate, result["error"]))
+        return self._degraded_result(log_text, errors)
+
+    async def _analyze_model_async(self, log_text: str, model: str, client: httpx.AsyncClient,
+                                   compress: Optional[bool], prefiltered: bool,
+                                   limits: Optional[ConcurrencyLimits] = None) -> Dict[str, Any]:
+        """Analyze with one model, behind its provider's breaker, rate limiter and concurrency slot."""
+        early, cache_key, log_text, truncation = self._begin_request(log_text, model, compress, prefiltered)
+        if early is not None:
+            return early
+
+        provider = self.model_configs[model]["provider"]
+        async with limits.slot(provider) if limits is not None else nullcontext():
+            breaker = self.breakers.get(provider)
+            if not breaker.allow():
+                return {"error": f"{provider} circuit open"}
+            try:
+                await self._get_rate_limiter(provider).acquire()
+                started = time.monotonic()
+                try:
+                    if provider == "openrouter":
+                        result = await self._analyze_with_openrouter_async(client, log_text)
+                    else:
+                        result = await self._analyze_with_huggingface_async(client, log_text, model)
+                except asyncio.CancelledError:
+                    # A hedged request that lost the race: its latency is only known to exceed the time so far
+                    self.router.record_censored(model, time.monotonic() - started)
+                    raise
+            finally:
+                breaker.release()
+        return self._finish_request(model, started, result, cache_key, truncation)
+
+    def fallback_chain(self, model: str) -> List[str]:
+        """The requested model followed by the configured fallback models that have an API key."""
+        routable = set(self.routable_models())
+        return [model] + [m for m in self.fallback_models if m != model and m in routable]
+
+    def _answered_by(self, result: Dict[str, Any], requested: str, model: str,
+                     errors: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Name the model in results that did not come from the requested one."""
+        if model == requested:
+            return result
+        result = dict(result, model=model)
+        if errors:
+            result["errors"] = [f"{m}: {error}" for m, error in errors]
+        return result
 
+    def _degraded_result(self, log_text: str, errors: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """Result when no model answered: the local classifier's, or the last error."""
+        if not self.local_fallback:
+            return {"error": errors[-1][1] if errors else "No model available"}
+        self.logger.warning(f"No model answered, using the local classifier: {errors}")
+        return dict(self.analyze_locally(log_text), model="local",
+                    errors=[f"{m}: {error}" for m, error in errors] or ["No model available"])
+
+    def analyze_locally(self, log_text: str) -> Dict[str, Any]:
+        """Summarize logs with the local pattern classifier alone, without any LLM."""
+        flagged: Dict[Tuple[str, str], List] = {}
+        total = 0
+        for tagged in self.classifier.classify_lines(log_text.split('\n')):
+            total += 1
+            if tagged["severity"] == "low":
+                continue
+            entry = flagged.setdefault((tagged["severity"], tagged["category"]), [0, tagged["line"]])
+            entry[0] += 1
+
+        issues = []
+        for (severity, category), (count, sample) in sorted(flagged.items(), key=lambda item: -SEVERITY_RANK[item[0][0]]):
+            issues.append({
+                "description": f"{count} {category} line(s) rated {severity}, e.g.: {sample[:200]}",
+                "severity": severity.capitalize(),
+                "recommendation": f"Review the {category} lines flagged by the local classifier",
+                "command": "",
+                "security_implication": "Possible unauthorized access attempts" if category == "security" else ""
+            })
+        return {
+            "summary": f"LLM analysis unavailable; the local classifier flagged "
+                       f"{sum(count for count, _ in flagged.values())} of {total} lines",
+            "issues": issues,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def provider_status(self) -> Dict[str, Any]:
+        """Circuit breaker state per provider and routing statistics per model."""
+        return {"breakers": self.breakers.snapshot(), **self.router.stats()}
+
+    def routable_models(self) -> List[str]:
+        """Models the router may pick: those whose provider has an API key."""
+        keys = {"openrouter": self.openrouter_api_key, "huggingface": self.huggingface_api_key}
+        return [model for model, config in self.model_configs.items() if keys.get(config["provider"])]
+
+    def _prepare_log_text(self, log_text: str, compress: bool, prefiltered: bool) -> str:
+        """Apply the severity filter and template mining to produce the text sent to the model."""
+        if not prefiltered and self.severity_threshold != "low":
+            log_text = '\n'.join(self.filter_logs(log_text.split('\n')))
+        if compress and log_text:
+            log_text = self.compress_logs(log_text)
+        return log_text
+
+    def _fit_to_budget(self, log_text: str, model: str):
+        """Trim the log text to the model's prompt budget, keeping the highest-signal lines."""
         config = self.model_configs[model]
-        
+        budget = config.get("max_prompt_tokens")
+        if not budget:
+            return log_text, None
         if config["provider"] == "openrouter":
-            return self._analyze_with_openrouter(log_text)
-        elif config["provider"] == "huggingface":
-            return self._analyze_with_huggingface(log_text, model)
+            overhead = count_tokens(json.dumps(self._openrouter_request("")[2]))
         else:
-            return {"error": f"Provider {config['provider']} not supported"}
-
-    def _analyze_with_openrouter(self, log_text: str) -> Dict[str, Any]:
-        """Analyze logs using OpenRouter API."""
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.openrouter_api_key}",
-                "HTTP-Referer": "https://github.com/yourusername/alert-triage-agent",
-                "X-Title": "Alert Triage Agent",
-                "Content-Type": "application/json"
-            }
-            
-            data = {
-                "model": "deepseek/deepseek-r1-0528:free",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a log analysis expert. Analyze the provided log and return a JSON response with the following structure: {\"summary\": \"brief summary\", \"issues\": [{\"description\": \"issue description\", \"severity\": \"severity level\", \"recommendation\": \"recommendation text\", \"command\": \"command to fix\", \"security_implication\": \"security impact\"}]}"
-                    },
-                    {
-                        "role": "user",
-                        "content": log_text
-                    }
-                ]
-            }
-            
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                json=data
+            overhead = count_tokens(self._huggingface_request("", model)[2]["inputs"])
+        log_text, report = self.budgeter.fit(log_text, max(budget - overhead, 1))
+        if report["dropped_lines"]:
+            self.logger.warning(
+                f"Prompt for {model} over budget: dropped {report['dropped_lines']} of "
+                f"{report['dropped_lines'] + report['kept_lines']} lines"
             )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    content = result["choices"][0]["message"]["content"]
-                    return self._parse_analysis(content)
-                else:
-                    self.logger.error("Invalid response format from OpenRouter")
-                    return {"error": "Invalid response format"}
+        return log_text, report
+
+    def _attach_truncation(self, result: Dict[str, Any], truncation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Report dropped lines in successful results."""
+        if truncation and truncation["dropped_lines"] and "error" not in result:
+            result = dict(result, truncation=truncation)
+        return result
+
+    def _below_threshold_result(self) -> Dict[str, Any]:
+        """Result returned locally when no line reaches the severity threshold."""
+        return {
+            "summary": f"No log lines at or above {self.severity_threshold} severity",
+            "issues": [],
+            "timestamp": datetime.now().isoformat()
+        }
+
+    def _cache_key(self, log_text: str, model: str, compress: bool, prefiltered: bool = False) -> Optional[str]:
+        """Return the cache key for a log excerpt and model, or None when caching is off."""
+        if self.cache is None:
+            return None
+        threshold = "prefiltered" if prefiltered else self.severity_threshold
+        prompt_version = f"{PROMPT_VERSION}/{threshold}/{'templates' if compress else 'raw'}"
+        return self.cache.make_key(self.preprocess_logs(log_text), model, prompt_version)
+
+    def _cache_store(self, cache_key: Optional[str], result: Dict[str, Any]) -> None:
+        """Cache successful results; errors are always retried."""
+        if cache_key and "error" not in result:
+            self.cache.set(cache_key, result)
+
+    async def analyze_chunks_async(self, chunks: Iterable[str], model: str = None, concurrency: Optional[int] = None, compress: Optional[bool] = None, prefiltered: bool = False) -> List[Dict[str, Any]]:
+        """Analyze chunks with a bounded pool of concurrent workers.
+
+        Chunks are pulled lazily from the iterable, so at most a few chunks
+        per worker are held in memory. Results are returned in chunk order.
+        """
+        concurrency = max(1, concurrency or self.llm_concurrency)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        results: Dict[int, Dict[str, Any]] = {}
+
+        async with make_async_client(concurrency) as client:
+            async def worker():
+                while True:
+                    item = await queue.get()
+                    try:
+                        if item is None:
+                            return
+                        index, chunk = item
+                        self.logger.info(f"Analyzing chunk {index + 1}")
+                        try:
+                            results[index] = await self.analyze_logs_async(chunk, model, client, compress, prefiltered)
+                        except Exception as e:
+                            # Keep the worker alive so the producer never blocks on a full queue
+                            self.logger.error(f"Error analyzing chunk {index + 1}: {str(e)}")
+                            results[index] = {"error": str(e)}
+                    finally:
+                        queue.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+            try:
+                for item in enumerate(chunks):
+                    await queue.put(item)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+
+        return [results[index] for index in sorted(results)]
+
+    async def analyze_stream_async(self, source: Union[str, os.PathLike, Iterable[str]], model: str = None, max_tokens: Optional[int] = None, concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Async counterpart of analyze_stream that fans chunks out concurrently."""
+        results = await self.analyze_chunks_async(self._stream_chunks(source, max_tokens), model, concurrency, compress=False, prefiltered=True)
+        return self._merge_results(results)
+
+    def _get_rate_limiter(self, provider: str) -> AsyncRateLimiter:
+        """Return the shared rate limiter for a provider."""
+        if provider not in self._rate_limiters:
+            self._rate_limiters[provider] = AsyncRateLimiter(self.provider_rate_limits.get(provider))
+        return self._rate_limiters[provider]
+
+    def _openrouter_request(self, log_text: str):
+        """Build the URL, headers and body for an OpenRouter request."""
+        headers = {
+            "Authorization": f"Bearer {self.openrouter_api_key}",
+            "HTTP-Referer": "https://github.com/yourusername/alert-triage-agent",
+            "X-Title": "Alert Triage Agent",
+            "Content-Type": "application/json"
+        }
+        
+        data = {
+            "model": "deepseek/deepseek-r1-0528:free",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a log analysis expert. Analyze the provided log and return a JSON response with the following structure: {\"summary\": \"brief summary\", \"issues\": [{\"description\": \"issue description\", \"severity\": \"severity level\", \"recommendation\": \"recommendation text\", \"command\": \"command to fix\", \"security_implication\": \"security impact\"}]}"
+                },
+                {
+                    "role": "user",
+                    "content": log_text
+                }
+            ]
+        }
+        return "https://openrouter.ai/api/v1/chat/completions", headers, data
+
+    def _handle_openrouter_response(self, response) -> Dict[str, Any]:
+        """Turn an OpenRouter HTTP response (requests or httpx) into an analysis result."""
+        if response.status_code == 200:
+            result = response.json()
+            if "choices" in result and len(result["choices"]) > 0:
+                content = result["choices"][0]["message"]["content"]
+                return self._parse_analysis(content)
             else:
-                self.logger.error(f"OpenRouter API error: {response.text}")
-                return {"error": f"API error: {response.status_code}"}
-                
+                self.logger.error("Invalid response format from OpenRouter")
+                return {"error": "Invalid response format"}
+        else:
+            self.logger.error(f"OpenRouter API error: {response.text}")
+            return {"error": f"API error: {response.status_code}"}
+
+    async def _analyze_with_openrouter_async(self, client: httpx.AsyncClient, log_text: str) -> Dict[str, Any]:
+        """Analyze logs using OpenRouter API without blocking the event loop."""
+        response = None
+        try:
+            url, headers, data = self._openrouter_request(log_text)
+            response = await async_request_with_retry(client, "POST", url, headers=headers, json=data)
+            self._record_outcome("openrouter", response)
+            return self._handle_openrouter_response(response)
         except Exception as e:
+            if response is None:
+                self._record_outcome("openrouter")
             self.logger.error(f"Error in OpenRouter analysis: {str(e)}")
             return {"error": str(e)}
 
-    def _analyze_with_huggingface(self, log_text: str, model: str) -> Dict[str, Any]:
-        """Analyze logs using HuggingFace API."""
+    async def _stream_openrouter_async(self, client: httpx.AsyncClient, log_text: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream an OpenRouter completion as summary and issue events, ending with the result event."""
+        response = None
         try:
-            if not self.huggingface_api_key:
-                return {"error": "HuggingFace API key not configured"}
+            url, headers, data = self._openrouter_request(log_text)
+            response = await async_request_with_retry(client, "POST", url, stream=True, headers=headers,
+                                                      json=dict(data, stream=True))
+            self._record_outcome("openrouter", response)
+            if response.status_code != 200:
+                await response.aread()
+                result = self._handle_openrouter_response(response)
+            else:
+                parser = IssueStreamParser()
+                sse = SSEDecoder()
+                async for line in response.aiter_lines():
+                    payload = sse.feed(line)
+                    if sse.done:
+                        break
+                    if payload is None:
+                        continue
+                    for event, value in parser.feed(openrouter_delta(payload)):
+                        if event == "issue":
+                            yield {"event": "issue", "data": self._normalize_issue(value)}
+                        else:
+                            yield {"event": "summary", "data": {"summary": value}}
+                result = self._parse_analysis(parser.text)
+        except Exception as e:
+            if response is None or response.status_code == 200:
+                # No response, or the stream broke off part way
+                self._record_outcome("openrouter")
+            self.logger.error(f"Error in OpenRouter streaming analysis: {str(e)}")
+            result = {"error": str(e)}
+        finally:
+            if response is not None:
+                await response.aclose()
+        yield {"event": "result", "data": result}
 
-            config = self.model_configs[model]
-            headers = {"Authorization": f"Bearer {self.huggingface_api_key}"}
-            
-            prompt = f"""Analyze the following Linux system logs and provide:
+    def _huggingface_request(self, log_text: str, model: str):
+        """Build the URL, headers and body for a HuggingFace inference request."""
+        config = self.model_configs[model]
+        headers = {"Authorization": f"Bearer {self.huggingface_api_key}"}
+        
+        prompt = f"""Analyze the following Linux system logs and provide:
 1. A brief summary of the log content
 2. Any issues or errors found, including:
    - Description
@@ -143,24 +746,50 @@ Format the response as JSON with the following structure:
         }}
     ]
 }}"""
+        return config["endpoint"], headers, {"inputs": prompt}
+
+    def _handle_huggingface_response(self, response) -> Dict[str, Any]:
+        """Turn a HuggingFace HTTP response (requests or httpx) into an analysis result."""
+        if response.status_code == 200:
+            result = response.json()
+            return self._parse_analysis(result[0]["generated_text"])
+        else:
+            self.logger.error(f"HuggingFace API error: {response.text}")
+            return {"error": f"HuggingFace API error: {response.text}"}
+
+    async def _analyze_with_huggingface_async(self, client: httpx.AsyncClient, log_text: str, model: str) -> Dict[str, Any]:
+        """Analyze logs using HuggingFace API without blocking the event loop."""
+        response = None
+        try:
+            if not self.huggingface_api_key:
+                return {"error": "HuggingFace API key not configured"}
+
+            url, headers, data = self._huggingface_request(log_text, model)
+            response = await async_request_with_retry(client, "POST", url, headers=headers, json=data)
+            self._record_outcome("huggingface", response)
+            return self._handle_huggingface_response(response)
 
-            response = requests.post(
-                config["endpoint"],
-                headers=headers,
-                json={"inputs": prompt}
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return self._parse_analysis(result[0]["generated_text"])
-            else:
-                self.logger.error(f"HuggingFace API error: {response.text}")
-                return {"error": f"HuggingFace API error: {response.text}"}
-                
         except Exception as e:
+            if response is None and self.huggingface_api_key:
+                self._record_outcome("huggingface")
             self.logger.error(f"Error in HuggingFace analysis: {str(e)}")
             return {"error": str(e)}
 
+    def _record_outcome(self, provider: str, response=None) -> None:
+        """Feed a provider call's outcome to its breaker: no response or a retryable status is a failure."""
+        breaker = self.breakers.get(provider)
+        if response is not None and response.status_code not in RETRY_STATUS_CODES:
+            breaker.record_success()
+            return
+        retry_after = retry_after_seconds(response)
+        if retry_after is None and response is not None and provider == "huggingface":
+            # A model that is still loading says how long it expects to take
+            try:
+                retry_after = float(response.json().get("estimated_time"))
+            except Exception:
+                retry_after = None
+        breaker.record_failure(retry_after)
+
     def _parse_analysis(self, response_text: str) -> Dict[str, Any]:
         """Parse the analysis response into a structured format."""
         try:
@@ -172,22 +801,9 @@ Format the response as JSON with the following structure:
             if not isinstance(result, dict) or "summary" not in result or "issues" not in result:
                 return {"error": "Invalid response format"}
             
-            # Validate and normalize issues
-            normalized_issues = []
-            for issue in result["issues"]:
-                # Handle both old and new field names
-                normalized_issue = {
-                    "description": issue.get("description", ""),
-                    "severity": issue.get("severity", "Medium"),
-                    "recommendation": issue.get("recommendation") or issue.get("recommendations", [""])[0],
-                    "command": issue.get("command") or issue.get("commands", [""])[0],
-                    "security_implication": issue.get("security_implication") or issue.get("security_implications", [""])[0]
-                }
-                normalized_issues.append(normalized_issue)
-            
             return {
                 "summary": result["summary"],
-                "issues": normalized_issues,
+                "issues": [self._normalize_issue(issue) for issue in result["issues"]],
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -198,13 +814,16 @@ Format the response as JSON with the following structure:
             self.logger.error(f"Error parsing analysis: {str(e)}")
             return {"error": str(e)}
 
+    def _normalize_issue(self, issue: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate and normalize one issue, handling both old and new field names."""
+        return {
+            "description": issue.get("description", ""),
+            "severity": issue.get("severity", "Medium"),
+            "recommendation": issue.get("recommendation") or issue.get("recommendations", [""])[0],
+            "command": issue.get("command") or issue.get("commands", [""])[0],
+            "security_implication": issue.get("security_implication") or issue.get("security_implications", [""])[0]
+        }
+
     def _determine_severity(self, log_line: str) -> str:
-        """Determine severity based on common log patterns."""
-        log_line = log_line.lower()
-        if "failed password for user" in log_line or "possible syn flooding" in log_line:
-            return "high"
-        if "cpu temperature above threshold" in log_line or "out of memory" in log_line or "warning" in log_line:
-            return "medium"
-        if "failed to start" in log_line or "address already in use" in log_line or "killed process" in log_line:
-            return "medium"
-        return "low" 
\ No newline at end of file
+        """Determine severity based on the local pattern table."""
+        return self.classifier.classify(log_line)[0]
@@ -0,0 +1,53 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+
+class AsyncRateLimiter:
+    """Spaces out request starts so a provider sees at most `rate` requests per second."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        """Wait until the next request slot is available."""
+        if not self.interval:
+            return
+        # No await between reading and reserving the slot, so this is safe
+        # across tasks on the same event loop without a lock.
+        now = time.monotonic()
+        wait = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class ConcurrencyLimits:
+    """Caps how many requests each provider has in flight at once.
+
+    Providers without a (positive) limit are not capped, only counted in
+    `in_flight`. Semaphores bind to the event loop they are first used on,
+    so create one per loop.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        self._semaphores = {
+            provider: asyncio.Semaphore(limit) for provider, limit in (limits or {}).items() if limit > 0
+        }
+        self.in_flight: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, provider: str) -> AsyncIterator[None]:
+        """Hold one of the provider's request slots, waiting for a free one if needed."""
+        semaphore = self._semaphores.get(provider)
+        if semaphore is not None:
+            await semaphore.acquire()
+        self.in_flight[provider] = self.in_flight.get(provider, 0) + 1
+        try:
+            yield
+        finally:
+            self.in_flight[provider] -= 1
+            if semaphore is not None:
+                semaphore.release()
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+# Model name that asks LogAnalyzer to pick the model through the router
+AUTO_MODEL = "auto"
+
+
+class LatencyStats:
+    """Rolling latency and error samples of one model.
+
+    Keeps at most `window_size` samples, none older than `window_seconds`,
+    so a model that stopped being used (e.g. after failing) returns to an
+    unknown state and is tried again.
+    """
+
+    def __init__(self, window_size: int = 200, window_seconds: float = 300.0):
+        self.window_seconds = window_seconds
+        self._samples: Deque[Tuple[float, float, bool]] = deque(maxlen=window_size)
+
+    def record(self, latency: float, ok: bool, now: Optional[float] = None) -> None:
+        self._samples.append((now if now is not None else time.monotonic(), latency, ok))
+
+    def _current(self, now: Optional[float] = None) -> List[Tuple[float, float, bool]]:
+        cutoff = (now if now is not None else time.monotonic()) - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        return list(self._samples)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        samples = self._current(now)
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        errors = sum(1 for _, _, ok in samples if not ok)
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            "samples": len(samples),
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "error_rate": errors / len(samples) if samples else 0.0,
+        }
+
+
+class ProviderRouter:
+    """Send each request to the fastest healthy model, optionally hedged.
+
+    Models are ranked by rolling p50 latency of successful calls. A model
+    whose error rate is above `max_error_rate` (over at least `min_samples`
+    samples) is ranked after every healthy one; models without any samples
+    are tried first so that each gets measured. With hedging on, if the first
+    model has not answered after its p95 latency (clamped to
+    `min_hedge_delay`..`max_hedge_delay`), the same request is sent to the
+    second model and the first successful answer wins; the other request is
+    cancelled. A primary that fails before the hedge delay triggers the
+    backup right away.
+    """
+
+    def __init__(self, hedge: bool = True, min_hedge_delay: float = 2.0, max_hedge_delay: float = 30.0,
+                 max_error_rate: float = 0.5, min_samples: int = 5, window_size: int = 200,
+                 window_seconds: float = 300.0):
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self._stats: Dict[str, LatencyStats] = {}
+        self._lock = threading.Lock()
+        self.hedges = {"sent": 0, "won": 0}
+
+    def record(self, model: str, latency: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                stats = self._stats[model] = LatencyStats(self.window_size, self.window_seconds)
+            stats.record(latency, ok)
+
+    def record_censored(self, model: str, elapsed: float) -> bool:
+        """Record a request abandoned after `elapsed` seconds, whose real latency is unknown.
+
+        All we know is that the answer would have taken longer than that.
+        Counting it as a success of that latency would pull the model's
+        percentiles down, so it is only recorded once `elapsed` is already
+        beyond the model's p95, where it can only push them up; otherwise it
+        is dropped. Returns whether the sample was recorded.
+        """
+        p95 = self.snapshot(model)["p95"]
+        if p95 is None or elapsed < p95:
+            return False
+        self.record(model, elapsed, True)
+        return True
+
+    def snapshot(self, model: str) -> Dict[str, Any]:
+        with self._lock:
+            stats = self._stats.get(model)
+            return stats.snapshot() if stats else LatencyStats().snapshot()
+
+    def healthy(self, snapshot: Dict[str, Any]) -> bool:
+        return snapshot["samples"] < self.min_samples or snapshot["error_rate"] <= self.max_error_rate
+
+    def rank(self, models: List[str]) -> List[str]:
+        """Order candidate models, best first; ties keep the given order."""
+        def key(item):
+            index, model = item
+            snapshot = self.snapshot(model)
+            p50 = snapshot["p50"] if snapshot["p50"] is not None else float("inf")
+            return (not self.healthy(snapshot), snapshot["samples"] > 0, p50, snapshot["error_rate"], index)
+
+        return [model for _, model in sorted(enumerate(models), key=key)]
+
+    def hedge_delay(self, model: str) -> float:
+        p95 = self.snapshot(model)["p95"]
+        if p95 is None:
+            return self.max_hedge_delay
+        return min(max(p95, self.min_hedge_delay), self.max_hedge_delay)
+
+    async def run(self, models: List[str],
+                  call: Callable[[str], Awaitable[Dict[str, Any]]]) -> Tuple[str, Dict[str, Any]]:
+        """Run `call(model)` on the best model (hedged if enabled); returns (model, result).
+
+        `call` returns an analysis result dict, with an "error" key on failure,
+        and is expected to report its own latency through `record`.
+        """
+        ranked = self.rank(models)
+        primary = asyncio.create_task(call(ranked[0]))
+        tasks = {primary: ranked[0]}
+        try:
+            if self.hedge and len(ranked) > 1:
+                done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay(ranked[0]))
+                if not done or "error" in primary.result():
+                    self.hedges["sent"] += 1
+                    tasks[asyncio.create_task(call(ranked[1]))] = ranked[1]
+
+            pending = set(tasks)
+            last = primary
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    last = task
+                    if "error" not in task.result():
+                        if task is not primary:
+                            self.hedges["won"] += 1
+                        return tasks[task], task.result()
+            # Every attempt failed; report the last error
+            return tasks[last], last.result()
+        finally:
+            # The losing request (or all of them, if we were cancelled) is abandoned
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            models = {model: stats.snapshot() for model, stats in self._stats.items()}
+        for snapshot in models.values():
+            snapshot["healthy"] = self.healthy(snapshot)
+        return {"models": models, "hedges": dict(self.hedges)}
+
+
+_shared_router: Optional[ProviderRouter] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_router(**kwargs) -> ProviderRouter:
+    """Return the process-wide router, so latency samples outlive short-lived analyzers."""
+    global _shared_router
+    with _shared_lock:
+        if _shared_router is None:
+            _shared_router = ProviderRouter(**kwargs)
+        return _shared_router
@@ -0,0 +1,151 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+
+class SSEDecoder:
+    """Incrementally decode the data fields of Server-Sent Events, line by line.
+
+    Comment lines (such as OpenRouter's ": OPENROUTER PROCESSING" keepalives)
+    and other fields are skipped; multi-line data is joined with newlines.
+    A "[DONE]" payload sets `done` instead of being returned.
+    """
+
+    def __init__(self):
+        self._data: List[str] = []
+        self.done = False
+
+    def feed(self, line: Union[str, bytes]) -> Optional[str]:
+        """Feed one line (without its terminator); returns an event's data once the event is complete."""
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.rstrip("\r")
+        if not line:
+            payload = "\n".join(self._data) if self._data else None
+            self._data = []
+            if payload == "[DONE]":
+                self.done = True
+                return None
+            return payload
+        if not line.startswith(":"):
+            field, _, value = line.partition(":")
+            if field == "data":
+                self._data.append(value[1:] if value.startswith(" ") else value)
+        return None
+
+
+def iter_sse_data(lines: Iterable[Union[str, bytes]]) -> Iterator[str]:
+    """Yield the data field of each Server-Sent Event, up to a "[DONE]" sentinel."""
+    decoder = SSEDecoder()
+    for line in lines:
+        payload = decoder.feed(line)
+        if decoder.done:
+            return
+        if payload is not None:
+            yield payload
+
+
+class IssueStreamParser:
+    """Incrementally scan an analysis JSON document as it is generated.
+
+    Text is fed in arbitrary pieces; `feed` returns ("summary", str) once the
+    top-level "summary" string is complete and ("issue", dict) for each
+    element of the top-level "issues" array as soon as its closing brace
+    arrives. Anything before the first "{" (prose, a ```json fence) is
+    ignored, as in LogAnalyzer._parse_analysis. The full text is kept in
+    `text` for the final, authoritative parse.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._started = False
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        # Span of the last string completed directly inside the top-level object: a key once ":" follows
+        self._last_string: Optional[Tuple[int, int]] = None
+        self._key: Optional[str] = None
+        self._issues_depth: Optional[int] = None
+        self._issue_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        self.text += chunk
+        events: List[Tuple[str, Any]] = []
+        text = self.text
+        while self._pos < len(text) and not self.done:
+            i = self._pos
+            char = text[i]
+            self._pos += 1
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._stack.append("{")
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._string_end(i, events)
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = i
+            elif char in "{[":
+                if char == "[" and len(self._stack) == 1 and self._key == "issues":
+                    self._issues_depth = 2
+                elif char == "{" and self._issues_depth is not None and len(self._stack) == self._issues_depth:
+                    self._issue_start = i
+                self._stack.append(char)
+                if len(self._stack) == 2:
+                    self._key = None
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                depth = len(self._stack)
+                if char == "}" and self._issue_start is not None and depth == self._issues_depth:
+                    events.extend(self._issue(text[self._issue_start:i + 1]))
+                    self._issue_start = None
+                elif char == "]" and depth == 1 and self._issues_depth is not None:
+                    self._issues_depth = None
+                if depth == 0:
+                    self.done = True
+            elif char == ":" and len(self._stack) == 1 and self._last_string is not None:
+                self._key = json.loads(text[self._last_string[0]:self._last_string[1] + 1])
+                self._last_string = None
+            elif char == "," and len(self._stack) == 1:
+                self._key = None
+        return events
+
+    def _string_end(self, end: int, events: List[Tuple[str, Any]]) -> None:
+        if len(self._stack) != 1:
+            return
+        if self._key is None:
+            self._last_string = (self._string_start, end)
+        elif self._key == "summary":
+            events.append(("summary", json.loads(self.text[self._string_start:end + 1])))
+            self._key = None
+
+    def _issue(self, raw: str) -> List[Tuple[str, Any]]:
+        try:
+            issue = json.loads(raw)
+        except json.JSONDecodeError:
+            return []
+        return [("issue", issue)] if isinstance(issue, dict) else []
+
+
+def openrouter_delta(payload: str) -> str:
+    """Content delta of one OpenRouter chat completion chunk; raises on a mid-stream error."""
+    try:
+        chunk: Dict[str, Any] = json.loads(payload)
+    except json.JSONDecodeError:
+        return ""
+    if "error" in chunk:
+        error = chunk["error"]
+        raise RuntimeError(error.get("message", str(error)) if isinstance(error, dict) else str(error))
+    return "".join((choice.get("delta") or {}).get("content") or "" for choice in chunk.get("choices") or [])
@@ -0,0 +1,153 @@
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+WILDCARD = "<*>"
+
+# Leading timestamps: syslog ("Jan  1 00:00:00") and ISO 8601
+TIMESTAMP_PATTERN = re.compile(
+    r"^(?:[A-Z][a-z]{2}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}"
+    r"|\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?)\s*"
+)
+
+# Tokens that are always variables, whatever the surrounding lines look like
+VARIABLE_PATTERNS = [
+    re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?$"),  # IPv4, optional port
+    re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"),  # UUID
+    re.compile(r"^0x[0-9a-fA-F]+$"),  # hex
+    re.compile(r"^[\[(]?[-+]?\d+(?:\.\d+)?[\])]?[:,;]?$"),  # numbers, [pid], 12:
+]
+
+# process[pid]: keeps the process name and only masks the pid
+PID_PATTERN = re.compile(r"^(\S+?)\[\d+\](:?)$")
+
+
+class LogTemplate:
+    """A group of log lines sharing one template, with occurrence statistics."""
+
+    def __init__(self, tokens: List[str], max_samples: int):
+        self.tokens = tokens
+        self.count = 0
+        self.first_seen: Optional[str] = None
+        self.last_seen: Optional[str] = None
+        self.samples: List[Tuple[str, ...]] = []
+        self.max_samples = max_samples
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def add(self, tokens: List[str], timestamp: Optional[str]) -> None:
+        self.count += 1
+        if timestamp:
+            if self.first_seen is None:
+                self.first_seen = timestamp
+            self.last_seen = timestamp
+        if len(self.samples) < self.max_samples:
+            values = tuple(tok for tok, tmpl in zip(tokens, self.tokens) if tmpl == WILDCARD)
+            if values and values not in self.samples:
+                self.samples.append(values)
+
+    def render(self) -> str:
+        line = f"{self.count}x"
+        if self.first_seen:
+            line += f" [{self.first_seen} .. {self.last_seen}]"
+        line += f" {self.template}"
+        if self.samples:
+            line += " (e.g. " + "; ".join(", ".join(values) for values in self.samples) + ")"
+        return line
+
+
+class TemplateMiner:
+    """Collapse log lines into templates with a fixed-depth parse tree (Drain).
+
+    Lines are routed by token count and then by their first `depth - 2`
+    tokens to a leaf holding candidate templates. A line joins the most
+    similar template at that leaf if at least `similarity_threshold` of its
+    tokens match, otherwise it starts a new template. Positions that differ
+    between lines of one template become wildcards.
+    """
+
+    def __init__(self, depth: int = 4, similarity_threshold: float = 0.5,
+                 max_children: int = 100, max_samples: int = 3):
+        self.depth = max(depth, 3)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.max_samples = max_samples
+        self.templates: List[LogTemplate] = []
+        self.total_lines = 0
+        self._root: Dict[int, dict] = {}
+
+    def add_line(self, line: str) -> Optional[LogTemplate]:
+        """Add a log line and return the template it was assigned to."""
+        line = line.strip()
+        if not line:
+            return None
+        self.total_lines += 1
+
+        match = TIMESTAMP_PATTERN.match(line)
+        timestamp = match.group(0).strip() if match else None
+        content = line[match.end():] if match else line
+
+        tokens = content.split()
+        masked = [self._mask(tok) for tok in tokens]
+
+        leaf = self._leaf(masked)
+        template = self._best_match(leaf, masked)
+        if template is None:
+            template = LogTemplate(masked, self.max_samples)
+            leaf.append(template)
+            self.templates.append(template)
+        else:
+            template.tokens = [
+                tmpl if tmpl == tok else WILDCARD for tmpl, tok in zip(template.tokens, masked)
+            ]
+        template.add(tokens, timestamp)
+        return template
+
+    def add_lines(self, lines: Iterable[str]) -> "TemplateMiner":
+        for line in lines:
+            self.add_line(line)
+        return self
+
+    def render_lines(self) -> Iterator[str]:
+        """Yield the compressed form: a header followed by one line per template."""
+        yield (f"# {self.total_lines} log lines collapsed into {len(self.templates)} templates. "
+               f"Format: <count>x [first seen .. last seen] template, {WILDCARD} marks variable "
+               f"fields, (e.g. ...) lists sample values.")
+        for template in self.templates:
+            yield template.render()
+
+    def render(self) -> str:
+        return "\n".join(self.render_lines())
+
+    def _mask(self, token: str) -> str:
+        if any(pattern.match(token) for pattern in VARIABLE_PATTERNS):
+            return WILDCARD
+        match = PID_PATTERN.match(token)
+        if match:
+            return f"{match.group(1)}[{WILDCARD}]{match.group(2)}"
+        return token
+
+    def _leaf(self, tokens: List[str]) -> list:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            if any(ch.isdigit() for ch in token):
+                token = WILDCARD
+            if token not in node and len(node) >= self.max_children:
+                token = WILDCARD
+            node = node.setdefault(token, {})
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf: List[LogTemplate], tokens: List[str]) -> Optional[LogTemplate]:
+        best, best_score = None, -1.0
+        for template in leaf:
+            if not tokens:
+                return template
+            # Wildcard positions count as matches so variable-heavy lines still group
+            same = sum(1 for tmpl, tok in zip(template.tokens, tokens) if tmpl == tok or tmpl == WILDCARD)
+            score = same / len(tokens)
+            if score > best_score:
+                best, best_score = template, score
+        if best is not None and best_score >= self.similarity_threshold:
+            return best
+        return None
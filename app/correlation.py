@@ -0,0 +1,165 @@
+import asyncio
+import bisect
+import re
+import threading
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+from app import schemas
+
+# Alert severities ordered for picking an incident's overall severity
+SEVERITY_ORDER = {"critical": 4, "high": 3, "error": 3, "warning": 2, "medium": 2, "info": 1, "low": 1}
+
+_DIGITS = re.compile(r"\d+")
+
+
+def title_key(title: str) -> str:
+    """Normalize a title so near-identical titles ("Disk 91% full" / "Disk 95% full") share a key."""
+    return " ".join(_DIGITS.sub("#", (title or "").lower()).split())
+
+
+def max_severity(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    return max((s for s in (a, b) if s), key=lambda s: SEVERITY_ORDER.get(s.lower(), 0), default=None)
+
+
+class IncidentState:
+    """In-memory view of an open incident used for correlation."""
+
+    def __init__(self, incident_id: int, keys: Set[Tuple[str, str]], first_seen: datetime):
+        self.id = incident_id
+        self.keys = keys
+        self.first_seen = first_seen
+        self.last_seen = first_seen
+        self.alert_ids: Set[int] = set()
+
+
+class Correlator:
+    """Group alerts arriving within a sliding window into incidents.
+
+    An alert joins an open incident, active during the last `window`, if it
+    shares one of the correlation labels (e.g. instance, job, service) or
+    its normalized title with the alert that opened the incident. Only
+    those seed keys are matched, so a chain of alerts that each share a key
+    with the previous one cannot merge unrelated incidents. Candidate
+    incidents are looked up in hash indexes keyed by (label, value) and by
+    title key, so assignment is O(1) amortized per alert. Incidents idle
+    for longer than the window, or open for longer than `max_age_seconds`,
+    are expired lazily from time-ordered queues; an incident holding
+    `max_alerts` alerts takes no more (0 disables either cap).
+
+    The index lives in the memory of one process. On startup it is rebuilt
+    from the incidents still open in the database (see `restore`), but
+    several processes do not share their grouping.
+
+    Callers must hold `lock` around `find`/`add` and the matching database
+    writes so concurrent requests see a consistent grouping. Coroutines
+    additionally serialize on `async_lock`, since they share one thread
+    and the reentrant `lock` does not exclude them from each other.
+    """
+
+    def __init__(self, window_seconds: float = 300, label_keys: Iterable[str] = ("instance", "job", "service"),
+                 max_alerts: int = 500, max_age_seconds: float = 4 * 3600):
+        self.window = timedelta(seconds=window_seconds)
+        self.label_keys = tuple(label_keys)
+        self.max_alerts = max_alerts
+        self.max_age = timedelta(seconds=max_age_seconds) if max_age_seconds > 0 else None
+        self.lock = threading.RLock()
+        self.async_lock = asyncio.Lock()
+        self._incidents: Dict[int, IncidentState] = {}
+        self._index: Dict[Tuple[str, str], Set[int]] = defaultdict(set)
+        self._alert_incident: Dict[int, int] = {}
+        self._expiry: Deque[Tuple[datetime, int]] = deque()
+        self._opened: Deque[Tuple[datetime, int]] = deque()
+
+    def correlation_keys(self, alert: schemas.AlertIn) -> Set[Tuple[str, str]]:
+        labels = alert.labels or {}
+        keys = {(key, str(labels[key])) for key in self.label_keys if labels.get(key) not in (None, "")}
+        keys.add(("__title__", title_key(alert.title)))
+        return keys
+
+    def incident_for_alert(self, alert_id: int) -> Optional[int]:
+        """Return the open incident an alert already belongs to, if any."""
+        return self._alert_incident.get(alert_id)
+
+    def find(self, alert: schemas.AlertIn, now: datetime) -> Optional[int]:
+        """Return the most recently active open incident the alert correlates with and can join."""
+        self.expire(now)
+        best: Optional[IncidentState] = None
+        for key in self.correlation_keys(alert):
+            for incident_id in self._index.get(key, ()):
+                state = self._incidents[incident_id]
+                if self.max_alerts and len(state.alert_ids) >= self.max_alerts:
+                    continue
+                if best is None or state.last_seen > best.last_seen:
+                    best = state
+        return best.id if best else None
+
+    def add(self, incident_id: int, alert_id: int, alert: schemas.AlertIn, now: datetime) -> None:
+        """Record that an alert joined (or opened) an incident; the opening alert's keys are its seed keys."""
+        state = self._incidents.get(incident_id)
+        if state is None:
+            state = IncidentState(incident_id, self.correlation_keys(alert), now)
+            self._incidents[incident_id] = state
+            for key in state.keys:
+                self._index[key].add(incident_id)
+            self._opened.append((now, incident_id))
+        state.last_seen = now
+        state.alert_ids.add(alert_id)
+        self._alert_incident[alert_id] = incident_id
+        self._expiry.append((now, incident_id))
+
+    def restore(self, incident_id: int, seed, first_seen: datetime, last_seen: datetime,
+                alert_ids: Iterable[int]) -> None:
+        """Re-register an incident that is open in the database, e.g. after a restart.
+
+        `seed` supplies the seed keys: anything with the title and labels of
+        the alert that opened the incident, such as the incident row itself.
+        """
+        state = IncidentState(incident_id, self.correlation_keys(seed), first_seen)
+        state.last_seen = last_seen
+        state.alert_ids = set(alert_ids)
+        self._incidents[incident_id] = state
+        for key in state.keys:
+            self._index[key].add(incident_id)
+        for alert_id in state.alert_ids:
+            self._alert_incident[alert_id] = incident_id
+        # Both queues must stay time-ordered for expire()
+        bisect.insort(self._opened, (first_seen, incident_id))
+        bisect.insort(self._expiry, (last_seen, incident_id))
+
+    def close(self, incident_id: int) -> None:
+        """Stop correlating new alerts into an incident."""
+        state = self._incidents.pop(incident_id, None)
+        if state is None:
+            return
+        for key in state.keys:
+            members = self._index.get(key)
+            if members is not None:
+                members.discard(incident_id)
+                if not members:
+                    del self._index[key]
+        for alert_id in state.alert_ids:
+            self._alert_incident.pop(alert_id, None)
+
+    def expire(self, now: datetime) -> List[int]:
+        """Close incidents idle for longer than the window or open longer than max_age; returns their IDs."""
+        expired = []
+        if self.max_age is not None:
+            while self._opened and self._opened[0][0] < now - self.max_age:
+                _, incident_id = self._opened.popleft()
+                if incident_id in self._incidents:
+                    self.close(incident_id)
+                    expired.append(incident_id)
+        cutoff = now - self.window
+        while self._expiry and self._expiry[0][0] < cutoff:
+            _, incident_id = self._expiry.popleft()
+            state = self._incidents.get(incident_id)
+            # Only the newest queue entry of an incident can expire it
+            if state is not None and state.last_seen < cutoff:
+                self.close(incident_id)
+                expired.append(incident_id)
+        return expired
+
+    @property
+    def open_incidents(self) -> int:
+        return len(self._incidents)
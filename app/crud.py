@@ -1,22 +1,571 @@
-from sqlalchemy.orm import Session
+import base64
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, bindparam, case, func, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from app import models, schemas
+from app.correlation import Correlator, max_severity
+from app.scheduler import LOWEST_CLASS, SEVERITY_CLASSES
 
-def create_alert(db: Session, alert: schemas.AlertIn):
-    db_alert = models.Alert(**alert.model_dump())
-    db.add(db_alert)
+def alert_fingerprint(alert: schemas.AlertIn) -> str:
+    """Stable identity of an alert: title, source and sorted labels."""
+    identity = json.dumps([alert.title, alert.source, alert.labels or {}], sort_keys=True, default=str)
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+def create_alert(db: Session, alert: schemas.AlertIn, triage: Optional[Dict] = None):
+    """Insert an alert, or bump the existing one with the same fingerprint, and return it."""
+    alert_id = create_alerts(db, [alert], [triage or {}])[0]
+    return db.get(models.Alert, alert_id, populate_existing=True)
+
+def create_alerts(db: Session, alerts: List[schemas.AlertIn], triage: Optional[List[Dict]] = None) -> List[int]:
+    """Upsert many alerts in a single transaction and return their IDs in input order.
+
+    Alerts are deduplicated on their fingerprint: a re-fired alert bumps
+    occurrence_count and last_seen (and takes the latest status and message)
+    on the existing row instead of inserting a new one. Duplicates within
+    the batch are merged before the write. `triage`, if given, holds
+    per-alert column overrides produced by the rule engine; they apply when
+    a row is first inserted and when a resolved alert fires again, which
+    starts its triage over (back to "pending" unless a rule says otherwise).
+    """
+    if not alerts:
+        return []
+    now = datetime.utcnow()
+    rows, fingerprints = _alert_rows(alerts, triage, now)
+    previous = {fp: (status, triage_status) for fp, status, triage_status in db.execute(_states_query(rows))}
+    stmt = _upsert_statement(db.get_bind().dialect.name, now)
+    if stmt is None:
+        ids = _upsert_alerts_generic(db, rows, now)
+    else:
+        ids = {fingerprint: alert_id for alert_id, fingerprint in db.execute(stmt, rows)}
+    history = _history_rows(rows, ids, previous, now)
+    if history:
+        db.execute(insert(models.AlertHistory), history)
     db.commit()
-    db.refresh(db_alert)
-    return db_alert
+    return [ids[fingerprint] for fingerprint in fingerprints]
+
+async def create_alert_async(db: AsyncSession, alert: schemas.AlertIn, triage: Optional[Dict] = None):
+    """Async counterpart of create_alert."""
+    alert_id = (await create_alerts_async(db, [alert], [triage or {}]))[0]
+    return await db.get(models.Alert, alert_id, populate_existing=True)
+
+async def create_alerts_async(db: AsyncSession, alerts: List[schemas.AlertIn],
+                              triage: Optional[List[Dict]] = None) -> List[int]:
+    """Async counterpart of create_alerts."""
+    if not alerts:
+        return []
+    now = datetime.utcnow()
+    rows, fingerprints = _alert_rows(alerts, triage, now)
+    previous = {fp: (status, triage_status) for fp, status, triage_status in await db.execute(_states_query(rows))}
+    stmt = _upsert_statement(db.get_bind().dialect.name, now)
+    if stmt is None:
+        ids = await db.run_sync(_upsert_alerts_generic, rows, now)
+    else:
+        ids = {fingerprint: alert_id for alert_id, fingerprint in await db.execute(stmt, rows)}
+    history = _history_rows(rows, ids, previous, now)
+    if history:
+        await db.execute(insert(models.AlertHistory), history)
+    await db.commit()
+    return [ids[fingerprint] for fingerprint in fingerprints]
+
+def _alert_rows(alerts: List[schemas.AlertIn], triage: Optional[List[Dict]],
+                now: datetime) -> Tuple[List[Dict], List[str]]:
+    """Build one insert row per distinct fingerprint; returns (rows, fingerprint of each input alert)."""
+    rows: Dict[str, Dict] = {}
+    fingerprints = []
+    for index, alert in enumerate(alerts):
+        fingerprint = alert_fingerprint(alert)
+        fingerprints.append(fingerprint)
+        row = rows.get(fingerprint)
+        if row is None:
+            # Every row of a multi-row INSERT must have the same keys
+            row = {**alert.model_dump(), "triage_status": "pending", "triage_notes": None}
+            row.update(triage[index] if triage else {})
+            row.update(fingerprint=fingerprint, occurrence_count=0, last_seen=now, pending_since=now)
+            rows[fingerprint] = row
+        else:
+            row.update(status=alert.status, message=alert.message)
+        row["occurrence_count"] += 1
+    return list(rows.values()), fingerprints
+
+def _states_query(rows: List[Dict]):
+    """Current (fingerprint, status, triage_status) of the rows' alerts that already exist."""
+    return select(models.Alert.fingerprint, models.Alert.status, models.Alert.triage_status).where(
+        models.Alert.fingerprint.in_([row["fingerprint"] for row in rows])
+    )
+
+def _history_rows(rows: List[Dict], ids: Dict[str, int], previous: Dict[str, Tuple[str, str]],
+                  now: datetime) -> List[Dict]:
+    """History entries for new alerts and for alerts whose status changed in this write."""
+    history = []
+    for row in rows:
+        before = previous.get(row["fingerprint"])
+        if before is None:
+            history.append({"alert_id": ids[row["fingerprint"]], "event": "created", "status": row["status"],
+                            "triage_status": row["triage_status"], "notes": row["triage_notes"], "timestamp": now})
+        elif before[0] != row["status"]:
+            # A re-fired alert starts its triage over (see _upsert_statement)
+            triage_status = row["triage_status"] if before[0] == "resolved" else before[1]
+            history.append({"alert_id": ids[row["fingerprint"]], "event": "status_changed", "status": row["status"],
+                            "triage_status": triage_status, "notes": f"{before[0]} -> {row['status']}",
+                            "timestamp": now})
+    return history
+
+def _upsert_statement(dialect: str, now: datetime):
+    """INSERT ... ON CONFLICT (fingerprint) DO UPDATE returning (id, fingerprint); None if unsupported."""
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert_insert
+    else:
+        return None
+
+    stmt = upsert_insert(models.Alert)
+    # SET expressions see the row as it was, so this tests the status before the update
+    refired = and_(models.Alert.status == "resolved", stmt.excluded.status != "resolved")
+    return stmt.on_conflict_do_update(
+        index_elements=[models.Alert.fingerprint],
+        set_={
+            "occurrence_count": models.Alert.occurrence_count + stmt.excluded.occurrence_count,
+            "last_seen": stmt.excluded.last_seen,
+            "status": stmt.excluded.status,
+            "message": stmt.excluded.message,
+            "triage_status": case((refired, stmt.excluded.triage_status), else_=models.Alert.triage_status),
+            "triage_notes": case((refired, stmt.excluded.triage_notes), else_=models.Alert.triage_notes),
+            "pending_since": case((refired, stmt.excluded.pending_since), else_=models.Alert.pending_since),
+            "updated_at": now,
+        }
+    ).returning(models.Alert.id, models.Alert.fingerprint)
+
+def _upsert_alerts_generic(db: Session, rows: List[Dict], now: datetime) -> Dict[str, int]:
+    """Select-then-write fallback for databases without ON CONFLICT."""
+    existing = {
+        alert.fingerprint: alert
+        for alert in db.query(models.Alert).filter(models.Alert.fingerprint.in_([r["fingerprint"] for r in rows]))
+    }
+    ids = {}
+    new_rows = []
+    for row in rows:
+        alert = existing.get(row["fingerprint"])
+        if alert is None:
+            new_rows.append(row)
+            continue
+        if alert.status == "resolved" and row["status"] != "resolved":
+            alert.triage_status = row["triage_status"]
+            alert.triage_notes = row["triage_notes"]
+            alert.pending_since = row["pending_since"]
+        alert.occurrence_count += row["occurrence_count"]
+        alert.last_seen = row["last_seen"]
+        alert.status = row["status"]
+        alert.message = row["message"]
+        alert.updated_at = now
+        ids[alert.fingerprint] = alert.id
+    if new_rows:
+        stmt = insert(models.Alert).returning(models.Alert.id, models.Alert.fingerprint)
+        ids.update({fingerprint: alert_id for alert_id, fingerprint in db.execute(stmt, new_rows)})
+    return ids
+
+def _claimable(now: datetime, lease_seconds: float):
+    # Pending alerts, plus alerts whose claim expired because their worker died;
+    # resolved alerts are not worth an analysis
+    return and_(
+        or_(models.Alert.triage_status == "pending",
+            and_(models.Alert.triage_status == "triaging",
+                 models.Alert.updated_at < now - timedelta(seconds=lease_seconds))),
+        models.Alert.status != "resolved"
+    )
+
+def _pending_since():
+    # Rows written before pending_since existed have it NULL
+    return func.coalesce(models.Alert.pending_since, models.Alert.created_at)
+
+def _claim_order(now: datetime, aging_seconds: float):
+    """Severity class, promoted one class per `aging_seconds` waited (see TriageScheduler).
+
+    The wait counts from when the alert last became pending, so an alert
+    that fires again long after it was created does not jump the queue.
+    Triage rules are not evaluated in SQL, so a rule's set_priority action
+    does not affect which alerts are claimed, only their order once claimed.
+    """
+    rank = case(SEVERITY_CLASSES, value=func.lower(models.Alert.severity), else_=LOWEST_CLASS)
+    for step in range(1, LOWEST_CLASS + 1):
+        rank = rank - case((_pending_since() < now - timedelta(seconds=step * aging_seconds), 1), else_=0)
+    return rank
+
+async def claim_pending_alerts_async(db: AsyncSession, limit: int, lease_seconds: float = 300,
+                                     aging_seconds: float = 60) -> List[models.Alert]:
+    """Atomically mark up to `limit` pending alerts as "triaging" and return them.
+
+    The most urgent alerts are claimed first: by severity, with older
+    alerts promoted so a flood of critical ones cannot starve the rest.
+    Candidates are locked with SKIP LOCKED where supported, and the update
+    re-checks the claim condition, so concurrent workers (in this or other
+    processes) never claim the same alert.
+    """
+    now = datetime.utcnow()
+    candidates = (await db.scalars(
+        select(models.Alert.id).where(_claimable(now, lease_seconds))
+        .order_by(_claim_order(now, aging_seconds), _pending_since(), models.Alert.id)
+        .limit(limit).with_for_update(skip_locked=True)
+    )).all()
+    if not candidates:
+        await db.commit()
+        return []
+    claimed = (await db.scalars(
+        update(models.Alert.__table__)
+        .where(models.Alert.id.in_(candidates), _claimable(now, lease_seconds))
+        .values(triage_status="triaging", updated_at=now)
+        .returning(models.Alert.id)
+    )).all()
+    alerts = (await db.scalars(
+        select(models.Alert).where(models.Alert.id.in_(claimed))
+        .order_by(models.Alert.id).execution_options(populate_existing=True)
+    )).all()
+    await db.commit()
+    return alerts
+
+async def save_triage_results_async(db: AsyncSession, results: List[Dict]) -> int:
+    """Write triage outcomes for claimed alerts and record them in the history.
+
+    Each result has id, status (the alert status, for the history row),
+    triage_status and triage_notes. Alerts whose claim was taken over or
+    released meanwhile are left untouched. Returns the number updated.
+    """
+    if not results:
+        return 0
+    now = datetime.utcnow()
+    still_claimed = set((await db.scalars(
+        select(models.Alert.id).where(models.Alert.id.in_([r["id"] for r in results]),
+                                      models.Alert.triage_status == "triaging")
+    )).all())
+    results = [r for r in results if r["id"] in still_claimed]
+    if not results:
+        return 0
+    stmt = (
+        update(models.Alert.__table__)
+        .where(models.Alert.id == bindparam("b_id"), models.Alert.triage_status == "triaging")
+        .values(triage_status=bindparam("b_triage_status"), triage_notes=bindparam("b_triage_notes"), updated_at=now)
+    )
+    params = [
+        {"b_id": r["id"], "b_triage_status": r["triage_status"], "b_triage_notes": r["triage_notes"]}
+        for r in results
+    ]
+    await db.execute(stmt, params)
+    await db.execute(insert(models.AlertHistory), [
+        {"alert_id": r["id"], "event": "triaged", "status": r["status"], "triage_status": r["triage_status"],
+         "notes": r["triage_notes"], "timestamp": now}
+        for r in results
+    ])
+    await db.commit()
+    return len(results)
+
+async def release_claims_async(db: AsyncSession, alert_ids: List[int]) -> None:
+    """Return claimed but unprocessed alerts to "pending"."""
+    if alert_ids:
+        await db.execute(
+            update(models.Alert.__table__)
+            .where(models.Alert.id.in_(alert_ids), models.Alert.triage_status == "triaging")
+            .values(triage_status="pending")
+        )
+        await db.commit()
+
+async def get_alerts_by_ids_async(db: AsyncSession, alert_ids: List[int]) -> List[models.Alert]:
+    """Current state of the given alerts (missing IDs are skipped)."""
+    if not alert_ids:
+        return []
+    return (await db.scalars(
+        select(models.Alert).where(models.Alert.id.in_(alert_ids)).execution_options(populate_existing=True)
+    )).all()
+
+async def get_triage_states_async(db: AsyncSession, alert_ids: List[int]) -> Dict[int, Tuple[str, Optional[str]]]:
+    """(triage_status, triage_notes) of the given alerts, e.g. to describe a write that updated existing rows."""
+    if not alert_ids:
+        return {}
+    rows = await db.execute(
+        select(models.Alert.id, models.Alert.triage_status, models.Alert.triage_notes)
+        .where(models.Alert.id.in_(alert_ids))
+    )
+    return {alert_id: (triage_status, triage_notes) for alert_id, triage_status, triage_notes in rows}
+
+def _history_query(alert_id: int):
+    return (select(models.AlertHistory).where(models.AlertHistory.alert_id == alert_id)
+            .order_by(models.AlertHistory.timestamp, models.AlertHistory.id))
+
+def get_alert_history(db: Session, alert_id: int):
+    return db.scalars(_history_query(alert_id)).all()
+
+async def get_alert_history_async(db: AsyncSession, alert_id: int):
+    return (await db.scalars(_history_query(alert_id))).all()
+
+def correlate_alerts(db: Session, correlator: Correlator, alert_ids: List[int], alerts: List[schemas.AlertIn]) -> None:
+    """Assign freshly ingested alerts to incidents and persist the grouping in one transaction."""
+    now = datetime.utcnow()
+    with correlator.lock:
+        for incident_id in correlator.expire(now):
+            db.execute(update(models.Incident).where(models.Incident.id == incident_id).values(status="closed"))
+
+        # Alerts in an incident another process opened are not in this correlator
+        grouped = set(db.scalars(
+            select(models.Alert.id).join(models.Incident, models.Alert.incident_id == models.Incident.id)
+            .where(models.Alert.id.in_(alert_ids), models.Incident.status == "open")
+        ))
+        incidents: Dict[int, models.Incident] = {}
+        assignments = {}
+        for alert_id, alert in zip(alert_ids, alerts):
+            if alert_id in assignments or alert_id in grouped or correlator.incident_for_alert(alert_id) is not None:
+                # Re-fired alert already grouped; its occurrence was counted by the upsert
+                continue
+            incident_id = correlator.find(alert, now)
+            if incident_id is None:
+                incident = models.Incident(
+                    title=alert.title, status="open", severity=alert.severity,
+                    labels={k: v for k, v in (alert.labels or {}).items() if k in correlator.label_keys},
+                    alert_count=0, first_seen=now, last_seen=now
+                )
+                db.add(incident)
+                db.flush()
+                incident_id = incident.id
+            else:
+                incident = incidents.get(incident_id) or db.get(models.Incident, incident_id)
+            incidents[incident_id] = incident
+            incident.alert_count += 1
+            incident.last_seen = now
+            incident.severity = max_severity(incident.severity, alert.severity)
+            correlator.add(incident_id, alert_id, alert, now)
+            assignments[alert_id] = incident_id
+
+        if assignments:
+            db.execute(update(models.Alert), [
+                {"id": alert_id, "incident_id": incident_id} for alert_id, incident_id in assignments.items()
+            ])
+        db.commit()
+
+async def correlate_alerts_async(db: AsyncSession, correlator: Correlator, alert_ids: List[int],
+                                 alerts: List[schemas.AlertIn]) -> None:
+    """Async counterpart of correlate_alerts.
+
+    The in-memory index must be updated together with the incident rows, so
+    the sync implementation runs as one unit, serialized between coroutines
+    by the correlator's asyncio lock.
+    """
+    async with correlator.async_lock:
+        await db.run_sync(correlate_alerts, correlator, alert_ids, alerts)
+
+def restore_incidents(db: Session, correlator: Correlator) -> List[int]:
+    """Load the incidents still open in the database into the correlator.
+
+    Incidents that expired while no process tracked them are closed.
+    Returns the IDs of the incidents restored and still open.
+    """
+    now = datetime.utcnow()
+    with correlator.lock:
+        open_incidents = db.scalars(select(models.Incident).where(models.Incident.status == "open")).all()
+        members: Dict[int, List[int]] = {incident.id: [] for incident in open_incidents}
+        if members:
+            rows = db.execute(select(models.Alert.id, models.Alert.incident_id)
+                              .where(models.Alert.incident_id.in_(list(members))))
+            for alert_id, incident_id in rows:
+                members[incident_id].append(alert_id)
+        for incident in open_incidents:
+            first_seen = incident.first_seen or incident.created_at or now
+            correlator.restore(incident.id, incident, first_seen, incident.last_seen or first_seen,
+                               members[incident.id])
+        expired = set(correlator.expire(now))
+        if expired:
+            db.execute(update(models.Incident).where(models.Incident.id.in_(expired)).values(status="closed"))
+        db.commit()
+    return [incident.id for incident in open_incidents if incident.id not in expired]
 
-def get_alerts(db: Session):
-    return db.query(models.Alert).all()
+async def restore_incidents_async(db: AsyncSession, correlator: Correlator) -> List[int]:
+    """Async counterpart of restore_incidents."""
+    async with correlator.async_lock:
+        return await db.run_sync(restore_incidents, correlator)
+
+def _incidents_query(status: Optional[str], limit: int):
+    query = select(models.Incident)
+    if status is not None:
+        query = query.where(models.Incident.status == status)
+    return query.order_by(models.Incident.last_seen.desc()).limit(limit)
+
+def get_incidents(db: Session, status: Optional[str] = None, limit: int = 100):
+    return db.scalars(_incidents_query(status, limit)).all()
+
+async def get_incidents_async(db: AsyncSession, status: Optional[str] = None, limit: int = 100):
+    return (await db.scalars(_incidents_query(status, limit))).all()
+
+def get_incident(db: Session, incident_id: int):
+    return db.get(models.Incident, incident_id)
+
+async def get_incident_async(db: AsyncSession, incident_id: int):
+    """Return an incident with its alerts loaded up front (async sessions cannot lazy-load)."""
+    return await db.get(models.Incident, incident_id, options=[selectinload(models.Incident.alerts)],
+                        populate_existing=True)
+
+def close_incident(db: Session, correlator: Correlator, incident_id: int):
+    incident = db.get(models.Incident, incident_id)
+    if incident is None:
+        return None
+    with correlator.lock:
+        correlator.close(incident_id)
+        incident.status = "closed"
+        db.commit()
+    db.refresh(incident)
+    return incident
+
+async def close_incident_async(db: AsyncSession, correlator: Correlator, incident_id: int):
+    async with correlator.async_lock:
+        return await db.run_sync(close_incident, correlator, incident_id)
+
+def encode_cursor(alert: models.Alert) -> str:
+    """Encode the (timestamp, id) position of an alert as an opaque cursor."""
+    raw = f"{alert.timestamp.isoformat()}|{alert.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if malformed."""
+    try:
+        timestamp, alert_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(alert_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def _alerts_query(limit: int, cursor: Optional[str], severity: Optional[str], status: Optional[str],
+                  source: Optional[str], triage_status: Optional[str], since: Optional[datetime],
+                  until: Optional[datetime], labels: Optional[Dict[str, str]]):
+    query = select(models.Alert)
+    if severity is not None:
+        query = query.where(models.Alert.severity == severity)
+    if status is not None:
+        query = query.where(models.Alert.status == status)
+    if source is not None:
+        query = query.where(models.Alert.source == source)
+    if triage_status is not None:
+        query = query.where(models.Alert.triage_status == triage_status)
+    # Stored timestamps are naive UTC; "...Z" or offset bounds are converted to match
+    if since is not None:
+        query = query.where(models.Alert.timestamp >= schemas.naive_utc(since))
+    if until is not None:
+        query = query.where(models.Alert.timestamp < schemas.naive_utc(until))
+    for key, value in (labels or {}).items():
+        query = query.where(models.Alert.labels[key].as_string() == value)
+    if cursor:
+        timestamp, alert_id = decode_cursor(cursor)
+        query = query.where(tuple_(models.Alert.timestamp, models.Alert.id) < tuple_(timestamp, alert_id))
+
+    # Fetch one extra row to know whether another page exists
+    return query.order_by(models.Alert.timestamp.desc(), models.Alert.id.desc()).limit(limit + 1)
+
+def _page(rows: List[models.Alert], limit: int) -> Tuple[List[models.Alert], Optional[str]]:
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def get_alerts(db: Session, limit: int = 100, cursor: Optional[str] = None,
+               severity: Optional[str] = None, status: Optional[str] = None,
+               source: Optional[str] = None, triage_status: Optional[str] = None,
+               since: Optional[datetime] = None, until: Optional[datetime] = None,
+               labels: Optional[Dict[str, str]] = None) -> Tuple[List[models.Alert], Optional[str]]:
+    """Return one page of alerts, newest first, and the cursor for the next page (None on the last page)."""
+    query = _alerts_query(limit, cursor, severity, status, source, triage_status, since, until, labels)
+    return _page(db.scalars(query).all(), limit)
+
+async def get_alerts_async(db: AsyncSession, limit: int = 100, cursor: Optional[str] = None,
+                           severity: Optional[str] = None, status: Optional[str] = None,
+                           source: Optional[str] = None, triage_status: Optional[str] = None,
+                           since: Optional[datetime] = None, until: Optional[datetime] = None,
+                           labels: Optional[Dict[str, str]] = None) -> Tuple[List[models.Alert], Optional[str]]:
+    """Async counterpart of get_alerts."""
+    query = _alerts_query(limit, cursor, severity, status, source, triage_status, since, until, labels)
+    return _page((await db.scalars(query)).all(), limit)
 
 def create_triage_rule(db: Session, rule: schemas.TriageRuleIn):
     db_rule = models.TriageRule(**rule.model_dump())
     db.add(db_rule)
+    bump_rule_version(db)
+    db.commit()
+    db.refresh(db_rule)
+    return db_rule
+
+def update_triage_rule(db: Session, rule_id: int, rule: schemas.TriageRuleIn):
+    db_rule = db.get(models.TriageRule, rule_id)
+    if db_rule is None:
+        return None
+    for key, value in rule.model_dump().items():
+        setattr(db_rule, key, value)
+    bump_rule_version(db)
     db.commit()
     db.refresh(db_rule)
     return db_rule
 
+def delete_triage_rule(db: Session, rule_id: int) -> bool:
+    db_rule = db.get(models.TriageRule, rule_id)
+    if db_rule is None:
+        return False
+    db.delete(db_rule)
+    bump_rule_version(db)
+    db.commit()
+    return True
+
+def get_rule_version(db: Session) -> int:
+    row = db.get(models.RuleSetVersion, 1)
+    return row.version if row else 0
+
+def bump_rule_version(db: Session) -> None:
+    """Increment the rule set version as part of the caller's transaction."""
+    result = db.execute(
+        update(models.RuleSetVersion)
+        .where(models.RuleSetVersion.id == 1)
+        .values(version=models.RuleSetVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        db.add(models.RuleSetVersion(id=1, version=1))
+
 def get_triage_rules(db: Session):
-    return db.query(models.TriageRule).all() 
\ No newline at end of file
+    return db.query(models.TriageRule).all()
+
+async def create_triage_rule_async(db: AsyncSession, rule: schemas.TriageRuleIn):
+    db_rule = models.TriageRule(**rule.model_dump())
+    db.add(db_rule)
+    await bump_rule_version_async(db)
+    await db.commit()
+    await db.refresh(db_rule)
+    return db_rule
+
+async def update_triage_rule_async(db: AsyncSession, rule_id: int, rule: schemas.TriageRuleIn):
+    db_rule = await db.get(models.TriageRule, rule_id)
+    if db_rule is None:
+        return None
+    for key, value in rule.model_dump().items():
+        setattr(db_rule, key, value)
+    await bump_rule_version_async(db)
+    await db.commit()
+    await db.refresh(db_rule)
+    return db_rule
+
+async def delete_triage_rule_async(db: AsyncSession, rule_id: int) -> bool:
+    db_rule = await db.get(models.TriageRule, rule_id)
+    if db_rule is None:
+        return False
+    await db.delete(db_rule)
+    await bump_rule_version_async(db)
+    await db.commit()
+    return True
+
+async def get_rule_version_async(db: AsyncSession) -> int:
+    row = await db.get(models.RuleSetVersion, 1, populate_existing=True)
+    return row.version if row else 0
+
+async def bump_rule_version_async(db: AsyncSession) -> None:
+    result = await db.execute(
+        update(models.RuleSetVersion)
+        .where(models.RuleSetVersion.id == 1)
+        .values(version=models.RuleSetVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    if result.rowcount == 0:
+        db.add(models.RuleSetVersion(id=1, version=1))
+
+async def get_triage_rules_async(db: AsyncSession):
+    return (await db.scalars(select(models.TriageRule))).all()
+ 
\ No newline at end of file
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Fields a subscriber can filter on, matching the GET /api/v1/alerts filters
+FILTER_FIELDS = ("severity", "status", "source", "triage_status")
+
+class AlertFilter:
+    """Per-subscriber filter on event payloads; unset fields match anything."""
+
+    def __init__(self, labels: Optional[Dict[str, str]] = None, **fields: Optional[str]):
+        self.fields = {k: v for k, v in fields.items() if k in FILTER_FIELDS and v is not None}
+        self.labels = labels or {}
+
+    def matches(self, payload: Dict[str, Any]) -> bool:
+        if any(payload.get(k) != v for k, v in self.fields.items()):
+            return False
+        labels = payload.get("labels") or {}
+        return all(str(labels.get(k)) == v for k, v in self.labels.items())
+
+class Subscription:
+    def __init__(self, alert_filter: AlertFilter, maxsize: int):
+        self.filter = alert_filter
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # Set when the subscriber fell too far behind; it should reconnect and resume
+        self.lagged = False
+
+class AlertBroadcaster:
+    """Fan out alert events to live subscribers, with a replay buffer for resume.
+
+    Every event gets an increasing ID and is kept in a ring buffer of the
+    last `buffer_size` events. A subscriber passing the last ID it saw gets
+    the buffered events after it before live ones; if that ID has already
+    left the buffer it gets a "reset" event and should reload via the list
+    endpoint. A subscriber whose queue overflows is marked as lagged and
+    dropped rather than slowing down ingest. Must be used from the event loop.
+    """
+
+    def __init__(self, buffer_size: int = 1000, subscriber_queue_size: int = 1000):
+        self.subscriber_queue_size = subscriber_queue_size
+        self.last_id = 0
+        self._buffer: Deque[Tuple[int, str, Dict[str, Any]]] = deque(maxlen=buffer_size)
+        self._subscribers: Set[Subscription] = set()
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: str, payloads: List[Dict[str, Any]]) -> None:
+        for payload in payloads:
+            self.last_id += 1
+            item = (self.last_id, event, payload)
+            self._buffer.append(item)
+            for subscription in list(self._subscribers):
+                if not subscription.filter.matches(payload):
+                    continue
+                try:
+                    subscription.queue.put_nowait(item)
+                except asyncio.QueueFull:
+                    subscription.lagged = True
+                    self._subscribers.discard(subscription)
+
+    def subscribe(self, alert_filter: AlertFilter, last_event_id: Optional[int] = None) -> Subscription:
+        subscription = Subscription(alert_filter, self.subscriber_queue_size)
+        if last_event_id is not None and last_event_id < self.last_id:
+            oldest = self._buffer[0][0] if self._buffer else self.last_id + 1
+            if last_event_id + 1 < oldest:
+                subscription.queue.put_nowait((self.last_id, "reset", {}))
+            else:
+                for item in self._buffer:
+                    if item[0] > last_event_id and alert_filter.matches(item[2]):
+                        if subscription.queue.full():
+                            subscription.lagged = True
+                            break
+                        subscription.queue.put_nowait(item)
+        if not subscription.lagged:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+def format_sse(event_id: int, event: str, payload: Dict[str, Any]) -> str:
+    """Encode one event in the text/event-stream wire format."""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def alert_payloads(ids: List[int], alerts: List, triage: Optional[List[Dict]] = None,
+                   states: Optional[Dict[int, Tuple[str, Optional[str]]]] = None) -> List[Dict[str, Any]]:
+    """Build event payloads for freshly written alerts from what was written.
+
+    `states` maps alert IDs to their stored (triage_status, triage_notes)
+    (see crud.get_triage_states_async). A re-fired alert keeps its triage,
+    so without it the payloads would claim it is pending again.
+    """
+    payloads: Dict[int, Dict[str, Any]] = {}
+    for index, (alert_id, alert) in enumerate(zip(ids, alerts)):
+        # A batch can repeat a fingerprint; the last occurrence wins, as in the upsert
+        payload = {"id": alert_id, **alert.model_dump(mode="json"), "triage_status": "pending", "triage_notes": None}
+        payload.update(triage[index] if triage else {})
+        if states and alert_id in states:
+            payload["triage_status"], payload["triage_notes"] = states[alert_id]
+        payloads[alert_id] = payload
+    return list(payloads.values())
@@ -175,11 +175,26 @@ with st.sidebar:
     selected_model = st.session_state.get('selected_model', 'deepseek/deepseek-r1-0528:free')
     model = st.sidebar.selectbox(
         "Select AI Model",
-        ["deepseek/deepseek-r1-0528:free", "mistralai/Mistral-7B-Instruct-v0.1"],
+        ["deepseek/deepseek-r1-0528:free", "mistralai/Mistral-7B-Instruct-v0.1", "auto"],
         index=0,
         key='selected_model'
     )
 
+def render_analysis(result):
+    """Display an analysis summary and its issues."""
+    if result.get("summary") is not None:
+        st.markdown("### Summary")
+        st.write(result["summary"])
+    
+    if result.get("issues"):
+        st.markdown("### Issues Found")
+        for issue in result["issues"]:
+            with st.expander(f"{issue['description']} ({issue['severity']})"):
+                st.markdown(f"**Severity:** {issue['severity']}")
+                st.markdown(f"**Recommendation:** {issue.get('recommendation', issue.get('recommendations', [''])[0])}")
+                st.markdown(f"**Command to fix:** {issue.get('command', issue.get('commands', [''])[0])}")
+                st.markdown(f"**Security implication:** {issue.get('security_implication', issue.get('security_implications', [''])[0])}")
+
 # Main content
 st.markdown("### Log Analysis")
 
@@ -196,32 +211,38 @@ if st.button("Analyze Logs"):
             # Create analyzer instance
             analyzer = LogAnalyzer()
             
-            # Analyze logs with the selected model
-            result = analyzer.analyze_logs(log_text, model=model)
+            # Analyze logs with the selected model, showing findings as the model writes them
+            live = st.empty()
+            streamed = {"summary": None, "issues": []}
+            result = {"error": "No analysis result"}
+            for event in analyzer.analyze_logs_iter(log_text, model=model):
+                if event["event"] == "result":
+                    result = event["data"]
+                    continue
+                if event["event"] == "summary":
+                    streamed["summary"] = event["data"]["summary"]
+                else:
+                    streamed["issues"].append(event["data"])
+                with live.container():
+                    st.info(f"Analyzing... {len(streamed['issues'])} issue(s) so far")
+                    render_analysis(streamed)
+            # The final result supersedes the streamed preview
+            live.empty()
             
             if "error" not in result:
+                if result.get("model") == "local":
+                    st.warning("No model was available; showing the local classifier's findings instead.")
+                elif result.get("model", model) != model:
+                    st.info(f"Answered by {result['model']}.")
                 st.success("Analysis completed successfully!")
-                
-                # Display summary
-                st.markdown("### Summary")
-                st.write(result["summary"])
-                
-                # Display issues
-                if result["issues"]:
-                    st.markdown("### Issues Found")
-                    for issue in result["issues"]:
-                        with st.expander(f"{issue['description']} ({issue['severity']})"):
-                            st.markdown(f"**Severity:** {issue['severity']}")
-                            st.markdown(f"**Recommendation:** {issue.get('recommendation', issue.get('recommendations', [''])[0])}")
-                            st.markdown(f"**Command to fix:** {issue.get('command', issue.get('commands', [''])[0])}")
-                            st.markdown(f"**Security implication:** {issue.get('security_implication', issue.get('security_implications', [''])[0])}")
+                render_analysis(result)
                 
                 # Store analysis in history
                 analysis_entry = {
                     "timestamp": datetime.now().isoformat(),
                     "summary": result["summary"],
                     "issues": result["issues"],
-                    "model": model
+                    "model": result.get("model", model)
                 }
                 st.session_state.analysis_history.append(analysis_entry)
             else:
@@ -1,6 +1,6 @@
 import os
-import requests
 from dotenv import load_dotenv
+from app.backend.http_client import request_with_retry
 
 load_dotenv()
 
@@ -12,12 +12,16 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Creating an annotation is not idempotent: a retried POST whose first attempt
+# reached Grafana would add it twice, so these calls only use the pooled session.
+ANNOTATION_RETRIES = 0
+
 def acknowledge_alert(alert_uid: str, message: str = "Acknowledged by agent"):
     url = f"{GRAFANA_URL}/api/alertmanager/grafana/api/v2/alerts/{alert_uid}/annotations"
     data = {
         "text": message
     }
-    response = requests.post(url, json=data, headers=HEADERS)
+    response = request_with_retry("POST", url, max_retries=ANNOTATION_RETRIES, json=data, headers=HEADERS)
     response.raise_for_status()
     return response.json()
 
@@ -28,6 +32,6 @@ def add_annotation(dashboard_uid: str, text: str, tags=None):
         "text": text,
         "tags": tags or []
     }
-    response = requests.post(url, json=data, headers=HEADERS)
+    response = request_with_retry("POST", url, max_retries=ANNOTATION_RETRIES, json=data, headers=HEADERS)
     response.raise_for_status()
-    return response.json() 
\ No newline at end of file
+    return response.json()
@@ -0,0 +1,90 @@
+import logging
+import re
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import delete, text
+from app import models
+
+logger = logging.getLogger(__name__)
+
+TABLE = models.AlertHistory.__tablename__
+_PARTITION_NAME = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+_warned_unpartitioned = False
+
+def month_start(moment: datetime, offset: int = 0) -> datetime:
+    """First instant of the month `offset` months away from `moment`."""
+    index = moment.year * 12 + moment.month - 1 + offset
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_{month.year:04d}_{month.month:02d}"
+
+def is_partitioned(conn) -> bool:
+    """Whether alert_history is a partitioned table.
+
+    Only Postgres databases whose table was created since partitioning was
+    introduced are; create_all does not convert an existing plain table.
+    """
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"),
+                           {"table": TABLE}).scalar()
+    return relkind == "p"
+
+def ensure_partitions(conn, now: datetime, months_ahead: int = 2) -> List[str]:
+    """Create the monthly partitions from the current month up to `months_ahead` ahead.
+
+    Does nothing unless the table is partitioned; a plain alert_history left
+    by an earlier version keeps working, with retention by range DELETE.
+    """
+    global _warned_unpartitioned
+    if not is_partitioned(conn):
+        if conn.dialect.name == "postgresql" and not _warned_unpartitioned:
+            _warned_unpartitioned = True
+            logger.warning(f"{TABLE} is not partitioned; expired history is deleted row by row. "
+                           f"Recreate the table to use monthly partitions.")
+        return []
+    created = []
+    for offset in range(months_ahead + 1):
+        start, end = month_start(now, offset), month_start(now, offset + 1)
+        name = partition_name(start)
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        created.append(name)
+    return created
+
+def drop_expired(conn, now: datetime, retention_months: int) -> List[str]:
+    """Remove history older than the retention window.
+
+    A partitioned table drops whole monthly partitions; other databases and
+    plain tables fall back to a range DELETE on the indexed timestamp.
+    """
+    cutoff = month_start(now, -retention_months)
+    if not is_partitioned(conn):
+        result = conn.execute(delete(models.AlertHistory).where(models.AlertHistory.timestamp < cutoff))
+        return [f"{result.rowcount} rows"] if result.rowcount else []
+
+    partitions = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": TABLE}).scalars()
+    dropped = []
+    for name in partitions:
+        match = _PARTITION_NAME.match(name)
+        # A partition is expired once the month after it starts at or before the cutoff
+        if match and month_start(datetime(int(match.group(1)), int(match.group(2)), 1), 1) <= cutoff:
+            conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+def maintain(engine, retention_months: int, months_ahead: int = 2, now: Optional[datetime] = None) -> None:
+    """Create upcoming partitions and drop expired history in one transaction."""
+    now = now or datetime.utcnow()
+    with engine.begin() as conn:
+        ensure_partitions(conn, now, months_ahead)
+        dropped = drop_expired(conn, now, retention_months) if retention_months > 0 else []
+    if dropped:
+        logger.info(f"Dropped expired alert history: {', '.join(dropped)}")
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from app import crud, schemas
+from app.correlation import Correlator
+from app.events import AlertBroadcaster, alert_payloads
+from app.journal import AlertJournal
+
+logger = logging.getLogger(__name__)
+
+class IngestQueueFull(Exception):
+    """Raised when accepting alerts would exceed the queue capacity."""
+
+class IngestQueue:
+    """Bounded write-behind queue between alert receipt and the database.
+
+    Handlers `submit` validated alerts (with their triage values) and return
+    immediately. A background task drains the queue in micro-batches of up
+    to `batch_size` alerts, waiting at most `flush_interval` seconds after
+    the first alert of a batch, and writes each batch with one upsert. A
+    failed write is retried with backoff while the queue fills up; once it
+    is full, `submit` raises IngestQueueFull so handlers can shed load.
+
+    A batch that still fails after `max_attempts` while the database answers
+    a probe query holds rows the database rejects. It is written in halves
+    to isolate them; each rejected alert is logged, kept in the journal's
+    dead-letter file and checkpointed past, so it cannot block the queue.
+
+    With a journal, `submit` returns only once the alerts are durable in it,
+    and they are checkpointed after their batch commits, so alerts accepted
+    before a crash are written on the next start.
+    """
+
+    def __init__(self, session_factory, maxsize: int = 10000, batch_size: int = 500,
+                 flush_interval: float = 0.05, journal: Optional[AlertJournal] = None,
+                 correlator: Optional[Correlator] = None, broadcaster: Optional[AlertBroadcaster] = None,
+                 max_attempts: int = 5):
+        self.session_factory = session_factory
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.journal = journal
+        self.correlator = correlator
+        self.broadcaster = broadcaster
+        self.stats = {"accepted": 0, "written": 0, "rejected": 0, "batches": 0, "failed_writes": 0,
+                      "dead_lettered": 0}
+        self.last_error: Optional[str] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending = 0
+
+    @property
+    def depth(self) -> int:
+        """Alerts accepted but not yet written, including the batch being written."""
+        return self._pending
+
+    async def submit(self, alerts: List[schemas.AlertIn], triage: List[Dict]) -> None:
+        """Queue alerts for writing; all or nothing. Raises IngestQueueFull when over capacity."""
+        if self._queue is None:
+            raise RuntimeError("Ingest queue is not running")
+        if self.depth + len(alerts) > self.maxsize:
+            self.stats["rejected"] += len(alerts)
+            raise IngestQueueFull(f"Ingest queue is full ({self.depth}/{self.maxsize})")
+
+        seqs: List[Optional[int]] = [None] * len(alerts)
+        if self.journal is not None:
+            seqs = self.journal.append([
+                {"alert": alert.model_dump(mode="json"), "triage": values}
+                for alert, values in zip(alerts, triage)
+            ])
+        for item in zip(seqs, alerts, triage):
+            self._queue.put_nowait(item)
+        self._pending += len(alerts)
+        self.stats["accepted"] += len(alerts)
+        if self.journal is not None and seqs:
+            # Concurrent submits share one fsync
+            await self.journal.sync_async(seqs[-1])
+
+    async def start(self) -> None:
+        """Queue anything left in the journal, then start the background writer."""
+        self._queue = asyncio.Queue()
+        if self.journal is not None and self.journal.pending:
+            # Replayed alerts go ahead of new ones so checkpoints stay in sequence order;
+            # until they are written, the queue may sit above capacity and shed new load
+            logger.info(f"Replaying {self.journal.pending} journaled alerts")
+            for seq, entry in self.journal.replay():
+                self._queue.put_nowait((seq, schemas.AlertIn(**entry["alert"]), entry["triage"]))
+                self._pending += 1
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Flush queued alerts (for at most `timeout` seconds) and stop the writer."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.drain(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping with {self.depth} alerts unwritten")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.journal is not None:
+            self.journal.close()
+
+    async def drain(self) -> None:
+        """Wait until every queued alert has been written."""
+        await self._queue.join()
+
+    def health(self) -> Dict[str, Any]:
+        depth = self.depth
+        return {
+            "queue_depth": depth,
+            "queue_capacity": self.maxsize,
+            # Above 80% full, senders should expect 503s soon
+            "backpressure": depth >= self.maxsize * 0.8,
+            "journal_pending": self.journal.pending if self.journal is not None else None,
+            "journal_segments": self.journal.segments if self.journal is not None else None,
+            "last_error": self.last_error,
+            **self.stats
+        }
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Keep retrying: dropping the batch would lose acknowledged alerts
+            attempt = 0
+            remaining = batch
+            while not await self._write(remaining):
+                attempt += 1
+                if attempt >= self.max_attempts and await self._database_reachable():
+                    remaining = await self._isolate(remaining)
+                    if not remaining:
+                        break
+                await asyncio.sleep(min(0.1 * 2 ** min(attempt - 1, 6), 5))
+            self._pending -= len(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _isolate(self, rows: List[Tuple[Optional[int], schemas.AlertIn, Dict]]
+                       ) -> List[Tuple[Optional[int], schemas.AlertIn, Dict]]:
+        """Write rows in halves, dead-lettering the single rows the database rejects.
+
+        Rows are handled in order, so checkpoints never pass an unwritten
+        one. Returns the rows left over if the database stopped answering
+        meanwhile; they go back to being retried as a batch.
+        """
+        if len(rows) == 1:
+            if await self._database_reachable():
+                await self._dead_letter(rows[0])
+                return []
+            return rows
+        middle = len(rows) // 2
+        for start, half in ((0, rows[:middle]), (middle, rows[middle:])):
+            if not await self._write(half):
+                remaining = await self._isolate(half)
+                if remaining:
+                    return remaining + rows[start + len(half):]
+        return []
+
+    async def _database_reachable(self) -> bool:
+        try:
+            async with self.session_factory() as db:
+                await db.execute(text("SELECT 1"))
+            return True
+        except Exception:
+            return False
+
+    async def _dead_letter(self, item: Tuple[Optional[int], schemas.AlertIn, Dict]) -> None:
+        seq, alert, values = item
+        entry = {"alert": alert.model_dump(mode="json"), "triage": values, "error": self.last_error}
+        self.stats["dead_lettered"] += 1
+        logger.error(f"Dead-lettering alert rejected by the database: {json.dumps(entry, default=str)}")
+        if self.journal is not None:
+            await asyncio.to_thread(self.journal.dead_letter, entry)
+            if seq is not None:
+                await asyncio.to_thread(self.journal.checkpoint, seq)
+
+    async def _write(self, batch: List[Tuple[Optional[int], schemas.AlertIn, Dict]]) -> bool:
+        alerts = [alert for _, alert, _ in batch]
+        async with self.session_factory() as db:
+            try:
+                ids = await crud.create_alerts_async(db, alerts, [values for _, _, values in batch])
+            except Exception as e:
+                await db.rollback()
+                self.stats["failed_writes"] += 1
+                self.last_error = f"{datetime.utcnow().isoformat()} {e}"
+                logger.error(f"Error writing batch of {len(batch)} alerts: {str(e)}")
+                return False
+            if self.correlator is not None:
+                try:
+                    await crud.correlate_alerts_async(db, self.correlator, ids, alerts)
+                except Exception as e:
+                    await db.rollback()
+                    logger.error(f"Error correlating alerts: {str(e)}")
+            states = None
+            if self.broadcaster is not None:
+                try:
+                    states = await crud.get_triage_states_async(db, ids)
+                except Exception as e:
+                    # The batch is committed; its events just fall back to the written triage values
+                    logger.error(f"Error reading triage states: {str(e)}")
+        if self.broadcaster is not None:
+            self.broadcaster.publish("alert", alert_payloads(ids, alerts, [values for _, _, values in batch], states))
+        seqs = [seq for seq, _, _ in batch if seq is not None]
+        if seqs and self.journal is not None:
+            await asyncio.to_thread(self.journal.checkpoint, max(seqs))
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+        return True
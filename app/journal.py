@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Record header: payload length, CRC32 of the payload, sequence number
+HEADER = struct.Struct(">IIQ")
+SEGMENT_SUFFIX = ".seg"
+DEAD_LETTER_FILE = "dead_letter.jsonl"
+
+class AlertJournal:
+    """Segmented append-only journal of accepted alerts.
+
+    Records are length-prefixed and checksummed JSON payloads with a
+    sequence number, appended to segment files named after their first
+    sequence number. A segment is closed once it exceeds `segment_bytes`.
+
+    `append` only writes to the OS buffers; `sync` makes everything up to a
+    sequence number durable with one fsync shared by all callers waiting at
+    that moment (group commit), so throughput is bounded by the disk's
+    fsync rate per batch rather than per alert. Once entries have reached
+    the database, `checkpoint` records the sequence number and deletes
+    segments that hold nothing newer. On open, a torn record at the end of
+    the last segment (a crash mid-append) is truncated away.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, fsync: bool = True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self.checkpoint_path = os.path.join(directory, "checkpoint")
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.committed = self._read_checkpoint()
+        self.last_seq = self.committed
+        self._segments = self._list_segments()
+        self._recover()
+        self.durable_seq = self.last_seq
+        if not self._segments:
+            self._segments.append(self.last_seq + 1)
+        self._file = open(self._segment_path(self._segments[-1]), "ab")
+
+    def append(self, entries: List[Dict]) -> List[int]:
+        """Append entries and return their sequence numbers; call `sync` to make them durable."""
+        with self._lock:
+            seqs = []
+            for entry in entries:
+                self.last_seq += 1
+                payload = json.dumps(entry, default=str).encode()
+                self._file.write(HEADER.pack(len(payload), zlib.crc32(payload), self.last_seq) + payload)
+                seqs.append(self.last_seq)
+            if self._file.tell() >= self.segment_bytes:
+                self._rotate()
+            return seqs
+
+    def sync(self, seq: int) -> None:
+        """Block until every entry up to `seq` is on disk."""
+        if self.durable_seq >= seq:
+            return
+        with self._sync_lock:
+            # Another caller's fsync may have covered us while we waited
+            if self.durable_seq >= seq:
+                return
+            with self._lock:
+                self._file.flush()
+                target = self.last_seq
+                fd = os.dup(self._file.fileno())
+            try:
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            self.durable_seq = target
+
+    async def sync_async(self, seq: int) -> None:
+        if self.durable_seq < seq:
+            await asyncio.to_thread(self.sync, seq)
+
+    def checkpoint(self, seq: int) -> None:
+        """Record that every entry up to `seq` has reached the database and drop covered segments."""
+        with self._lock:
+            if seq <= self.committed:
+                return
+            tmp_path = self.checkpoint_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(str(seq))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, self.checkpoint_path)
+            self.committed = seq
+            # A closed segment is obsolete once the next one starts at or before committed + 1
+            while len(self._segments) > 1 and self._segments[1] <= self.committed + 1:
+                os.remove(self._segment_path(self._segments.pop(0)))
+
+    def dead_letter(self, entry: Dict) -> None:
+        """Keep an entry the database rejected as a JSON line in dead_letter.jsonl, for inspection."""
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            with open(os.path.join(self.directory, DEAD_LETTER_FILE), "a") as f:
+                f.write(line)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+
+    def replay(self) -> Iterator[Tuple[int, Dict]]:
+        """Yield (seq, entry) pairs appended but not yet checkpointed, oldest first."""
+        with self._lock:
+            self._file.flush()
+            segments = list(self._segments)
+            committed = self.committed
+        for first_seq in segments:
+            for seq, payload, _ in self._read_segment(self._segment_path(first_seq)):
+                if seq > committed:
+                    yield seq, json.loads(payload)
+
+    @property
+    def pending(self) -> int:
+        return self.last_seq - self.committed
+
+    @property
+    def segments(self) -> int:
+        return len(self._segments)
+
+    def close(self) -> None:
+        self.sync(self.last_seq)
+        with self._lock:
+            self._file.close()
+
+    def _rotate(self) -> None:
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._segments.append(self.last_seq + 1)
+        self._file = open(self._segment_path(self._segments[-1]), "ab")
+
+    def _recover(self) -> None:
+        """Find the last sequence number and cut off a torn tail record."""
+        for index, first_seq in enumerate(self._segments):
+            path = self._segment_path(first_seq)
+            end = 0
+            for seq, _, end in self._read_segment(path):
+                self.last_seq = max(self.last_seq, seq)
+            if index == len(self._segments) - 1 and end < os.path.getsize(path):
+                logger.warning(f"Truncating torn journal record at {path}:{end}")
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+
+    def _read_segment(self, path: str) -> Iterator[Tuple[int, bytes, int]]:
+        """Yield (seq, payload, end offset) for each intact record in a segment."""
+        with open(path, "rb") as f:
+            offset = 0
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                length, crc, seq = HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                offset += HEADER.size + length
+                yield seq, payload, offset
+
+    def _list_segments(self) -> List[int]:
+        return sorted(
+            int(name[:-len(SEGMENT_SUFFIX)])
+            for name in os.listdir(self.directory) if name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, f"{first_seq:020d}{SEGMENT_SUFFIX}")
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(self.checkpoint_path) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
@@ -1,18 +1,30 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from typing import List
-from app import models, schemas, crud, grafana
-from app.database import engine, get_db
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app import models, schemas, crud, grafana, webhooks, rules, correlation, history, migrations
+from app.database import engine, async_engine, get_async_db, SessionLocal, AsyncSessionLocal, effective_settings
+from app.events import AlertBroadcaster, AlertFilter, alert_payloads, format_sse
+from app.ingest import IngestQueue, IngestQueueFull
+from app.journal import AlertJournal
+from app.autotriage import AutoTriageWorker
+import asyncio
 import logging
+import os
 from datetime import datetime
 import uvicorn
 
 models.Base.metadata.create_all(bind=engine)
+migrations.upgrade(engine)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Largest webhook body accepted, read incrementally so oversized bodies are rejected early
+WEBHOOK_MAX_BODY_BYTES = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", str(10 * 1024 * 1024)))
+
 app = FastAPI(
     title="Alert Triage Agent",
     description="An intelligent alert management system for Grafana",
@@ -25,39 +37,411 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
+
+# Compiled triage rules; other workers' changes are picked up by polling the version row
+rule_cache = rules.RuleCache(SessionLocal, poll_interval=float(os.getenv("RULES_POLL_INTERVAL", "5")))
+
+# Groups alerts that share labels or a title within a sliding window into incidents.
+# The grouping is kept per process and rebuilt from open incidents at startup.
+correlator = correlation.Correlator(
+    window_seconds=float(os.getenv("INCIDENT_WINDOW_SECONDS", "300")),
+    label_keys=[k.strip() for k in os.getenv("INCIDENT_LABELS", "instance,job,service").split(",") if k.strip()],
+    max_alerts=int(os.getenv("INCIDENT_MAX_ALERTS", "500")),
+    max_age_seconds=float(os.getenv("INCIDENT_MAX_AGE_SECONDS", str(4 * 3600)))
 )
 
+# Live feed of written alerts for /api/v1/alerts/stream subscribers
+broadcaster = AlertBroadcaster(buffer_size=int(os.getenv("STREAM_BUFFER_SIZE", "1000")))
+STREAM_KEEPALIVE_SECONDS = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+
+async def correlate(db: AsyncSession, ids: List[int], alerts: List[schemas.AlertIn]):
+    # Alerts are already stored; a correlation failure must not fail ingest
+    try:
+        await crud.correlate_alerts_async(db, correlator, ids, alerts)
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error correlating alerts: {str(e)}")
+
+# INGEST_MODE=queue acknowledges alerts with 202 and writes them in micro-batches.
+# With a journal, sync mode also falls back to the journaled queue when a direct write fails.
+WRITE_BEHIND = os.getenv("INGEST_MODE", "sync").lower() == "queue"
+INGEST_JOURNAL_DIR = os.getenv("INGEST_JOURNAL_DIR", "")
+ingest_queue: Optional[IngestQueue] = None
+if WRITE_BEHIND or INGEST_JOURNAL_DIR:
+    journal = None
+    if INGEST_JOURNAL_DIR:
+        journal = AlertJournal(
+            INGEST_JOURNAL_DIR,
+            segment_bytes=int(os.getenv("INGEST_JOURNAL_SEGMENT_MB", "64")) * 1024 * 1024,
+            fsync=os.getenv("INGEST_JOURNAL_FSYNC", "true").lower() == "true"
+        )
+    ingest_queue = IngestQueue(
+        AsyncSessionLocal,
+        maxsize=int(os.getenv("INGEST_QUEUE_SIZE", "10000")),
+        batch_size=int(os.getenv("INGEST_BATCH_SIZE", "500")),
+        flush_interval=float(os.getenv("INGEST_FLUSH_INTERVAL_MS", "50")) / 1000,
+        max_attempts=int(os.getenv("INGEST_MAX_WRITE_ATTEMPTS", "5")),
+        journal=journal,
+        correlator=correlator,
+        broadcaster=broadcaster
+    )
+
+async def enqueue(alerts: List[schemas.AlertIn], triage: List[dict]) -> JSONResponse:
+    try:
+        await ingest_queue.submit(alerts, triage)
+    except IngestQueueFull as e:
+        logger.warning(str(e))
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return JSONResponse(status_code=202, content={"status": "accepted", "count": len(alerts)})
+
+# LLM auto-triage of pending alerts, off the ingest path
+auto_triage: Optional[AutoTriageWorker] = None
+if os.getenv("AUTO_TRIAGE_ENABLED", "false").lower() == "true":
+    auto_triage = AutoTriageWorker(
+        AsyncSessionLocal,
+        model=os.getenv("AUTO_TRIAGE_MODEL") or None,
+        concurrency=int(os.getenv("AUTO_TRIAGE_WORKERS", "4")),
+        batch_size=int(os.getenv("AUTO_TRIAGE_BATCH_SIZE", "20")),
+        poll_interval=float(os.getenv("AUTO_TRIAGE_POLL_INTERVAL", "2")),
+        lease_seconds=float(os.getenv("AUTO_TRIAGE_LEASE_SECONDS", "300")),
+        aging_seconds=float(os.getenv("AUTO_TRIAGE_AGING_SECONDS", "60")),
+        provider_limits={
+            "openrouter": int(os.getenv("AUTO_TRIAGE_MAX_IN_FLIGHT_OPENROUTER", "4")),
+            "huggingface": int(os.getenv("AUTO_TRIAGE_MAX_IN_FLIGHT_HUGGINGFACE", "2"))
+        },
+        rule_cache=rule_cache,
+        broadcaster=broadcaster
+    )
+
+# Log analyzer behind the analysis endpoints, created on first use
+_log_analyzer = None
+
+def get_log_analyzer():
+    global _log_analyzer
+    if _log_analyzer is None:
+        from app.backend.log_analyzer import LogAnalyzer
+        _log_analyzer = LogAnalyzer()
+    return _log_analyzer
+
+@app.on_event("startup")
+async def log_database_settings():
+    with engine.connect() as conn:
+        logger.info(f"Database settings: {effective_settings(conn)}")
+    async with async_engine.connect() as conn:
+        logger.info(f"Async database settings: {await conn.run_sync(effective_settings)}")
+
+@app.on_event("startup")
+def start_rule_cache():
+    rule_cache.start()
+
+# Alert history retention; on Postgres whole monthly partitions are dropped
+HISTORY_RETENTION_MONTHS = int(os.getenv("HISTORY_RETENTION_MONTHS", "6"))
+HISTORY_MAINTENANCE_INTERVAL = float(os.getenv("HISTORY_MAINTENANCE_INTERVAL", "3600"))
+
+async def maintain_history():
+    while True:
+        await asyncio.sleep(HISTORY_MAINTENANCE_INTERVAL)
+        try:
+            await asyncio.to_thread(history.maintain, engine, HISTORY_RETENTION_MONTHS)
+        except Exception as e:
+            logger.error(f"Error maintaining alert history: {str(e)}")
+
+@app.on_event("startup")
+async def start_history_maintenance():
+    # Partitions must exist before the first history row is written
+    try:
+        await asyncio.to_thread(history.maintain, engine, HISTORY_RETENTION_MONTHS)
+    except Exception as e:
+        logger.error(f"Error maintaining alert history: {str(e)}")
+    app.state.history_task = asyncio.create_task(maintain_history())
+
+@app.on_event("startup")
+async def restore_incidents():
+    # Correlation state is per process: pick up incidents a previous run left open
+    try:
+        async with AsyncSessionLocal() as db:
+            restored = await crud.restore_incidents_async(db, correlator)
+        if restored:
+            logger.info(f"Restored {len(restored)} open incidents")
+    except Exception as e:
+        logger.error(f"Error restoring open incidents: {str(e)}")
+
+@app.on_event("startup")
+async def start_ingest_queue():
+    if ingest_queue is not None:
+        await ingest_queue.start()
+
+@app.on_event("startup")
+async def start_auto_triage():
+    if auto_triage is not None:
+        await auto_triage.start()
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    app.state.history_task.cancel()
+    if auto_triage is not None:
+        await auto_triage.stop()
+    if ingest_queue is not None:
+        await ingest_queue.stop()
+    rule_cache.stop()
+    await async_engine.dispose()
+
 @app.get("/")
 def root():
     return {"message": "Alert Triage Agent API"}
 
 @app.post("/api/v1/alerts", response_model=schemas.AlertOut)
-def receive_alert(alert: schemas.AlertIn, db: Session = Depends(get_db)):
+async def receive_alert(alert: schemas.AlertIn, db: AsyncSession = Depends(get_async_db)):
+    logger.info(f"Received alert: {alert.title}")
+    triage = rule_cache.engine.triage(alert)
     try:
-        logger.info(f"Received alert: {alert.title}")
-        db_alert = crud.create_alert(db, alert)
+        if WRITE_BEHIND:
+            return await enqueue([alert], [triage])
+        db_alert = await crud.create_alert_async(db, alert, triage)
+        await correlate(db, [db_alert.id], [alert])
+        await db.refresh(db_alert)
+        broadcaster.publish("alert", [schemas.AlertOut.model_validate(db_alert, from_attributes=True).model_dump(mode="json")])
         # Optionally acknowledge in Grafana
         # grafana.acknowledge_alert(alert_uid, message="Received by agent")
         return db_alert
+    except HTTPException:
+        raise
     except Exception as e:
+        await db.rollback()
+        if ingest_queue is not None:
+            logger.warning(f"Database write failed, journaling alert for retry: {str(e)}")
+            return await enqueue([alert], [triage])
         logger.error(f"Error processing alert: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/alerts:batch", response_model=schemas.AlertBatchOut)
+async def receive_alerts_batch(alerts: List[schemas.AlertIn], db: AsyncSession = Depends(get_async_db)):
+    logger.info(f"Received batch of {len(alerts)} alerts")
+    rule_engine = rule_cache.engine
+    triage = [rule_engine.triage(alert) for alert in alerts]
+    try:
+        if WRITE_BEHIND:
+            return await enqueue(alerts, triage)
+        ids = await crud.create_alerts_async(db, alerts, triage)
+        await correlate(db, ids, alerts)
+        states = await crud.get_triage_states_async(db, ids)
+        broadcaster.publish("alert", alert_payloads(ids, alerts, triage, states))
+        return {"count": len(ids), "ids": ids}
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        if ingest_queue is not None:
+            logger.warning(f"Database write failed, journaling {len(alerts)} alerts for retry: {str(e)}")
+            return await enqueue(alerts, triage)
+        logger.error(f"Error processing alert batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/webhooks/alertmanager", response_model=schemas.AlertBatchOut)
+async def receive_webhook(request: Request, source: str = "grafana", db: AsyncSession = Depends(get_async_db)):
+    """Accept a native Grafana/Alertmanager webhook payload and store all its alerts in one batch."""
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > WEBHOOK_MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Webhook payload too large")
+
+    try:
+        payload = webhooks.parse_webhook(bytes(body))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+    alerts = webhooks.to_alerts(payload, source=source)
+    logger.info(f"Received webhook from {payload.receiver or source} with {len(alerts)} alerts")
+    rule_engine = rule_cache.engine
+    triage = [rule_engine.triage(alert) for alert in alerts]
+    try:
+        if WRITE_BEHIND:
+            return await enqueue(alerts, triage)
+        ids = await crud.create_alerts_async(db, alerts, triage)
+        await correlate(db, ids, alerts)
+        states = await crud.get_triage_states_async(db, ids)
+        broadcaster.publish("alert", alert_payloads(ids, alerts, triage, states))
+        return {"count": len(ids), "ids": ids}
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        if ingest_queue is not None:
+            logger.warning(f"Database write failed, journaling {len(alerts)} alerts for retry: {str(e)}")
+            return await enqueue(alerts, triage)
+        logger.error(f"Error processing webhook: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def parse_label_selectors(selectors: List[str]) -> dict:
+    labels = {}
+    for selector in selectors:
+        key, sep, value = selector.partition("=")
+        if not sep or not key:
+            raise HTTPException(status_code=400, detail=f"Invalid label selector: {selector}")
+        labels[key] = value
+    return labels
+
+@app.get("/api/v1/alerts/stream")
+async def stream_alerts(
+    request: Request,
+    severity: Optional[str] = None,
+    status: Optional[str] = None,
+    source: Optional[str] = None,
+    triage_status: Optional[str] = None,
+    label: List[str] = Query([], description="Label selector as key=value; repeat to AND several"),
+    last_event_id: Optional[int] = None
+):
+    """Server-Sent Events feed of newly written alerts matching the filters.
+
+    Browsers resume automatically by sending the Last-Event-ID header on
+    reconnect; other clients can pass `last_event_id`. A "reset" event means
+    the requested position is no longer buffered and the client should reload
+    the list.
+    """
+    resume_from = request.headers.get("last-event-id") or last_event_id
+    try:
+        resume_from = int(resume_from) if resume_from is not None else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    alert_filter = AlertFilter(labels=parse_label_selectors(label), severity=severity, status=status,
+                               source=source, triage_status=triage_status)
+    subscription = broadcaster.subscribe(alert_filter, resume_from)
+
+    async def events():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                if subscription.lagged and subscription.queue.empty():
+                    # Dropped for falling behind; the client reconnects and resumes from its last ID
+                    break
+                try:
+                    item = await asyncio.wait_for(subscription.queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(*item)
+        finally:
+            broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/api/v1/analyze/stream")
+async def stream_analysis(request: schemas.LogAnalysisIn):
+    """Server-Sent Events of a log analysis as the model writes it.
+
+    "summary" and "issue" events arrive while an OpenRouter response is
+    generated; the stream always ends with a "result" event holding the
+    complete analysis, which supersedes everything sent before it.
+    """
+    analyzer = get_log_analyzer()
+
+    async def events():
+        event_id = 0
+        async for event in analyzer.analyze_logs_iter_async(request.log_text, model=request.model):
+            event_id += 1
+            yield format_sse(event_id, event["event"], event["data"])
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.get("/api/v1/alerts", response_model=List[schemas.AlertOut])
-def get_alerts(db: Session = Depends(get_db)):
-    return crud.get_alerts(db)
+async def get_alerts(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    severity: Optional[str] = None,
+    status: Optional[str] = None,
+    source: Optional[str] = None,
+    triage_status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    label: List[str] = Query([], description="Label selector as key=value; repeat to AND several"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """List alerts newest first. Pass the X-Next-Cursor response header back as `cursor` for the next page."""
+    labels = parse_label_selectors(label)
+    try:
+        alerts, next_cursor = await crud.get_alerts_async(
+            db, limit=limit, cursor=cursor, severity=severity, status=status, source=source,
+            triage_status=triage_status, since=since, until=until, labels=labels
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return alerts
+
+@app.get("/api/v1/alerts/{alert_id}/history", response_model=List[schemas.AlertHistoryOut])
+async def get_alert_history(alert_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Status and triage transitions of an alert, oldest first."""
+    return await crud.get_alert_history_async(db, alert_id)
+
+@app.get("/api/v1/incidents", response_model=List[schemas.IncidentOut])
+async def get_incidents(status: Optional[str] = None, limit: int = Query(100, ge=1, le=1000),
+                        db: AsyncSession = Depends(get_async_db)):
+    return await crud.get_incidents_async(db, status=status, limit=limit)
+
+@app.get("/api/v1/incidents/{incident_id}", response_model=schemas.IncidentDetailOut)
+async def get_incident(incident_id: int, db: AsyncSession = Depends(get_async_db)):
+    incident = await crud.get_incident_async(db, incident_id)
+    if incident is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    return incident
+
+@app.post("/api/v1/incidents/{incident_id}/close", response_model=schemas.IncidentOut)
+async def close_incident(incident_id: int, db: AsyncSession = Depends(get_async_db)):
+    incident = await crud.close_incident_async(db, correlator, incident_id)
+    if incident is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    return incident
 
 @app.get("/api/v1/health")
 def health_check():
-    return {"status": "healthy", "timestamp": datetime.utcnow()}
+    ingest = ingest_queue.health() if ingest_queue is not None else {}
+    ingest["mode"] = "queue" if WRITE_BEHIND else "sync"
+    status = "degraded" if ingest.get("backpressure") else "healthy"
+    stream = {"subscribers": broadcaster.subscribers, "last_event_id": broadcaster.last_id}
+    triage = auto_triage.health() if auto_triage is not None else None
+    return {"status": status, "timestamp": datetime.utcnow(), "ingest": ingest, "stream": stream, "auto_triage": triage}
+
+def check_rule_conditions(rule: schemas.TriageRuleIn):
+    # The engine skips rules it cannot compile, so reject them before they are stored
+    try:
+        rules.compile_conditions(rule.conditions)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @app.post("/api/v1/triage_rules", response_model=schemas.TriageRuleOut)
-def create_triage_rule(rule: schemas.TriageRuleIn, db: Session = Depends(get_db)):
-    return crud.create_triage_rule(db, rule)
+async def create_triage_rule(rule: schemas.TriageRuleIn, db: AsyncSession = Depends(get_async_db)):
+    check_rule_conditions(rule)
+    db_rule = await crud.create_triage_rule_async(db, rule)
+    await rule_cache.reload_async(db)
+    return db_rule
+
+@app.put("/api/v1/triage_rules/{rule_id}", response_model=schemas.TriageRuleOut)
+async def update_triage_rule(rule_id: int, rule: schemas.TriageRuleIn, db: AsyncSession = Depends(get_async_db)):
+    check_rule_conditions(rule)
+    db_rule = await crud.update_triage_rule_async(db, rule_id, rule)
+    if db_rule is None:
+        raise HTTPException(status_code=404, detail="Triage rule not found")
+    await rule_cache.reload_async(db)
+    return db_rule
+
+@app.delete("/api/v1/triage_rules/{rule_id}", status_code=204)
+async def delete_triage_rule(rule_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await crud.delete_triage_rule_async(db, rule_id):
+        raise HTTPException(status_code=404, detail="Triage rule not found")
+    await rule_cache.reload_async(db)
 
 @app.get("/api/v1/triage_rules", response_model=List[schemas.TriageRuleOut])
-def get_triage_rules(db: Session = Depends(get_db)):
-    return crud.get_triage_rules(db)
+async def get_triage_rules(db: AsyncSession = Depends(get_async_db)):
+    return await crud.get_triage_rules_async(db)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
@@ -0,0 +1,52 @@
+import logging
+from typing import List
+from sqlalchemy import inspect, literal, text
+from app import models
+
+logger = logging.getLogger(__name__)
+
+def column_ddl(column, dialect) -> str:
+    """Column definition for ALTER TABLE ... ADD COLUMN.
+
+    NOT NULL is only kept when the column has a scalar default to fill
+    existing rows with.
+    """
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default
+    if not column.nullable and default is not None and default.is_scalar:
+        value = literal(default.arg).compile(dialect=dialect, compile_kwargs={"literal_binds": True})
+        ddl += f" NOT NULL DEFAULT {value}"
+    for fk in column.foreign_keys:
+        ddl += f" REFERENCES {fk.column.table.name} ({fk.column.name})"
+    return ddl
+
+def add_missing_columns(conn) -> List[str]:
+    """Add model columns and indexes that existing tables lack.
+
+    create_all skips tables that already exist, so a database created by an
+    earlier version keeps its old columns. Only additive changes are made;
+    running this again is a no-op.
+    """
+    inspector = inspect(conn)
+    added = []
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            # Several workers may start at once; Postgres can skip a column another one added
+            guard = "IF NOT EXISTS " if conn.dialect.name == "postgresql" else ""
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {guard}{column_ddl(column, conn.dialect)}"))
+            added.append(f"{table.name}.{column.name}")
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    return added
+
+def upgrade(engine) -> None:
+    """Bring an existing database up to the current models in one transaction."""
+    with engine.begin() as conn:
+        added = add_missing_columns(conn)
+    if added:
+        logger.info(f"Added columns to existing tables: {', '.join(added)}")
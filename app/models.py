@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Boolean, create_engine
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Boolean, Index, create_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import relationship
+from sqlalchemy.schema import CreateTable
 from datetime import datetime
 
 Base = declarative_base()
@@ -18,9 +20,46 @@ class Alert(Base):
     labels = Column(JSON)
     triage_status = Column(String, default="pending")
     triage_notes = Column(String, nullable=True)
+    # Stable hash of title, source and labels; re-fired alerts update the existing row
+    fingerprint = Column(String(64), unique=True, index=True, nullable=True)
+    occurrence_count = Column(Integer, nullable=False, default=1)
+    last_seen = Column(DateTime, default=datetime.utcnow)
+    # When the alert last became "pending"; auto-triage ages queued alerts from here
+    pending_since = Column(DateTime, default=datetime.utcnow, nullable=True)
+    incident_id = Column(Integer, ForeignKey("incidents.id"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    history = relationship("AlertHistory", back_populates="alert")
+    # Loaded on access only; list queries never touch it, and callers that need
+    # history for many alerts should use selectinload to avoid N+1 queries
+    history = relationship("AlertHistory", back_populates="alert", lazy="select",
+                           order_by="AlertHistory.timestamp", passive_deletes=True)
+    incident = relationship("Incident", back_populates="alerts")
+
+    # Keyset pagination walks (timestamp, id); each filter gets a matching
+    # composite index so a filtered page is a single index range scan.
+    __table_args__ = (
+        Index("ix_alerts_timestamp_id", "timestamp", "id"),
+        Index("ix_alerts_severity_timestamp_id", "severity", "timestamp", "id"),
+        Index("ix_alerts_status_timestamp_id", "status", "timestamp", "id"),
+        Index("ix_alerts_source_timestamp_id", "source", "timestamp", "id"),
+        Index("ix_alerts_triage_status_timestamp_id", "triage_status", "timestamp", "id"),
+    )
+
+class Incident(Base):
+    """A group of correlated alerts that is triaged as one unit."""
+    __tablename__ = "incidents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    title = Column(String)
+    status = Column(String, default="open", index=True)
+    severity = Column(String)
+    labels = Column(JSON)
+    alert_count = Column(Integer, nullable=False, default=0)
+    first_seen = Column(DateTime, default=datetime.utcnow)
+    last_seen = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    alerts = relationship("Alert", back_populates="incident")
 
 class TriageRule(Base):
     __tablename__ = "triage_rules"
@@ -35,13 +74,38 @@ class TriageRule(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+class RuleSetVersion(Base):
+    """Single-row counter bumped on every triage rule change so workers can detect stale caches."""
+    __tablename__ = "rule_set_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class AlertHistory(Base):
+    """One status or triage transition of an alert.
+
+    On Postgres the table is range-partitioned by month on `timestamp` (see
+    app.history), so retention drops whole partitions.
+    """
     __tablename__ = "alert_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    alert_id = Column(Integer, ForeignKey("alerts.id"))
+    alert_id = Column(Integer, ForeignKey("alerts.id"), index=True)
+    event = Column(String)  # created, status_changed or triaged
     status = Column(String)
+    triage_status = Column(String, nullable=True)
     notes = Column(String, nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     
-    alert = relationship("Alert", back_populates="history") 
\ No newline at end of file
+    alert = relationship("Alert", back_populates="history")
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (timestamp)"}
+
+@compiles(CreateTable, "postgresql")
+def _create_table(create, compiler, **kw):
+    ddl = compiler.visit_create_table(create, **kw)
+    if create.element.name == AlertHistory.__tablename__:
+        # Unique constraints on a partitioned table must include the partition key
+        ddl = ddl.replace("PRIMARY KEY (id)", "PRIMARY KEY (id, timestamp)")
+    return ddl 
\ No newline at end of file
@@ -0,0 +1,308 @@
+import re
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from app import crud, schemas
+
+logger = logging.getLogger(__name__)
+
+# Condition keys understood by the engine
+EXACT_FIELDS = ("severity", "source", "status")
+TEXT_FIELDS = ("title", "message")
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher: one pass over the text finds every pattern it contains."""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Set[str]] = [set()]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(set())
+            state = nxt
+        self._out[state].add(pattern)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def search(self, text: str) -> Set[str]:
+        """Return the set of patterns occurring in text."""
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if self._out[state]:
+                found |= self._out[state]
+        return found
+
+
+def compile_conditions(conditions: Dict[str, Any]) -> Tuple[Dict[str, str], Dict[str, str],
+                                                             Dict[str, "re.Pattern"], Dict[str, str]]:
+    """Split rule conditions into exact, substring, regex and label conditions.
+
+    Raises ValueError for an unsupported condition key or an invalid regex,
+    so the API can reject a rule the engine would otherwise skip.
+    """
+    exact: Dict[str, str] = {}
+    contains: Dict[str, str] = {}
+    regexes: Dict[str, "re.Pattern"] = {}
+    labels: Dict[str, str] = {}
+    for key, value in (conditions or {}).items():
+        if key in EXACT_FIELDS:
+            exact[key] = str(value).lower()
+        elif key.endswith("_contains") and key[:-len("_contains")] in TEXT_FIELDS:
+            contains[key[:-len("_contains")]] = str(value).lower()
+        elif key.endswith("_regex") and key[:-len("_regex")] in TEXT_FIELDS:
+            if not isinstance(value, str):
+                raise ValueError(f"Condition {key!r} must be a string")
+            try:
+                regexes[key[:-len("_regex")]] = re.compile(value, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Invalid regex for {key!r}: {e}")
+        elif key == "labels" and isinstance(value, dict):
+            labels = {k: str(v) for k, v in value.items()}
+        else:
+            raise ValueError(f"Unsupported condition {key!r}")
+    return exact, contains, regexes, labels
+
+
+class CompiledRule:
+    """A triage rule with its conditions split by how they are matched."""
+
+    def __init__(self, rule):
+        self.id = rule.id
+        self.name = rule.name
+        self.priority = rule.priority if rule.priority is not None else 0
+        self.actions = rule.actions or {}
+        self.exact, self.contains, self.regexes, self.labels = compile_conditions(rule.conditions)
+
+
+class RuleEngine:
+    """Evaluate active triage rules against alerts with indexed lookups.
+
+    Substring conditions on title and message are compiled into one
+    Aho-Corasick automaton per field, scanned once per alert. Each rule is
+    indexed under one of its conditions, the most selective kind first: a
+    substring, a label, then an exact field (severity, source, status).
+    Only rules whose indexed condition holds for the alert are checked in
+    full, so the work per alert follows the rules it can match rather than
+    the size of the rule set. Rules with only regex conditions (or none)
+    are checked for every alert.
+
+    Lower `priority` values are more important, matching rules are
+    returned most important first.
+    """
+
+    def __init__(self, rules: Iterable = ()):
+        self.rules: List[CompiledRule] = []
+        for rule in rules:
+            if rule.is_active is False:
+                continue
+            try:
+                self.rules.append(CompiledRule(rule))
+            except ValueError as e:
+                logger.warning(f"Skipping triage rule {rule.name!r}: {e}")
+        self.rules.sort(key=lambda r: (r.priority, r.id or 0))
+
+        self._by_needle: Dict[str, Dict[str, List[int]]] = {f: defaultdict(list) for f in TEXT_FIELDS}
+        self._by_label: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        self._by_exact: Dict[str, Dict[str, List[int]]] = {f: defaultdict(list) for f in EXACT_FIELDS}
+        self._unindexed: List[int] = []
+        for index, rule in enumerate(self.rules):
+            if rule.contains:
+                # The longest needle is the least likely to occur by chance
+                field, needle = max(rule.contains.items(), key=lambda item: len(item[1]))
+                self._by_needle[field][needle].append(index)
+            elif rule.labels:
+                self._by_label[next(iter(rule.labels.items()))].append(index)
+            elif rule.exact:
+                field, value = next(iter(rule.exact.items()))
+                self._by_exact[field][value].append(index)
+            else:
+                self._unindexed.append(index)
+
+        needles = {field: {r.contains[field] for r in self.rules if field in r.contains} for field in TEXT_FIELDS}
+        self._automata = {field: AhoCorasick(needles[field]) for field in TEXT_FIELDS if needles[field]}
+
+    def _candidates(self, alert: schemas.AlertIn, found: Dict[str, Set[str]],
+                    exact: Dict[str, str]) -> Set[int]:
+        """Indexes of the rules whose indexed condition holds for the alert."""
+        candidates = set(self._unindexed)
+        for field, needles in found.items():
+            for needle in needles:
+                candidates.update(self._by_needle[field].get(needle, ()))
+        for key, value in (alert.labels or {}).items():
+            candidates.update(self._by_label.get((key, str(value)), ()))
+        for field, value in exact.items():
+            candidates.update(self._by_exact[field].get(value, ()))
+        return candidates
+
+    def match(self, alert: schemas.AlertIn) -> List[CompiledRule]:
+        """Return the rules matching an alert, most important first."""
+        if not self.rules:
+            return []
+
+        found = {
+            field: automaton.search(str(getattr(alert, field, "") or "").lower())
+            for field, automaton in self._automata.items()
+        }
+        exact = {field: str(getattr(alert, field, "") or "").lower() for field in EXACT_FIELDS}
+        labels = alert.labels or {}
+        matches = []
+        for index in sorted(self._candidates(alert, found, exact)):
+            rule = self.rules[index]
+            if (all(exact[field] == value for field, value in rule.exact.items())
+                    and all(needle in found[field] for field, needle in rule.contains.items())
+                    and all(regex.search(str(getattr(alert, field, "") or "")) for field, regex in rule.regexes.items())
+                    and all(str(labels.get(k)) == v for k, v in rule.labels.items())):
+                matches.append(rule)
+        return matches
+
+    def priority(self, alert: schemas.AlertIn) -> Optional[str]:
+        """Scheduling class named by the most important matching rule with a set_priority action.
+
+        Only this explicit action affects auto-triage order; a rule's own
+        `priority` just ranks it against other rules.
+        """
+        for rule in self.match(alert):
+            if rule.actions.get("set_priority"):
+                return str(rule.actions["set_priority"])
+        return None
+
+    def triage(self, alert: schemas.AlertIn) -> Dict[str, Any]:
+        """Resolve the actions of matching rules into alert column values.
+
+        When several rules set the same field, the most important rule wins.
+        Supported actions: acknowledge, set_triage_status, set_severity, note;
+        set_priority is read by `priority` instead.
+        """
+        matches = self.match(alert)
+        if not matches:
+            return {}
+
+        values: Dict[str, Any] = {}
+        notes = []
+        for rule in matches:
+            actions = rule.actions
+            if actions.get("set_triage_status"):
+                values.setdefault("triage_status", actions["set_triage_status"])
+            if actions.get("acknowledge"):
+                values.setdefault("triage_status", "acknowledged")
+            if actions.get("set_severity"):
+                values.setdefault("severity", actions["set_severity"])
+            if actions.get("note"):
+                notes.append(str(actions["note"]))
+            if actions.get("notify"):
+                logger.info(f"Rule {rule.name!r} requests notification for alert {alert.title!r}")
+
+        notes.insert(0, "Matched rules: " + ", ".join(rule.name for rule in matches))
+        values["triage_notes"] = "\n".join(notes)
+        return values
+
+
+class RuleCache:
+    """In-process snapshot of the compiled rule set, tagged with the rule set version.
+
+    Alert handling reads `engine`, which never touches the database. Writers
+    bump the version row in the same transaction as the rule change and
+    call `reload`; other processes notice the new version by polling it
+    (one primary-key read) and recompile. A reload builds the new engine
+    first and then swaps the (version, engine) tuple in one assignment, so
+    readers always see a consistent snapshot.
+    """
+
+    def __init__(self, session_factory, poll_interval: float = 5.0):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self._snapshot = (-1, RuleEngine())
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def engine(self) -> RuleEngine:
+        return self._snapshot[1]
+
+    @property
+    def version(self) -> int:
+        return self._snapshot[0]
+
+    def reload(self, db) -> None:
+        """Recompile the rule set from the database and swap it in."""
+        with self._lock:
+            version = crud.get_rule_version(db)
+            engine = RuleEngine(crud.get_triage_rules(db))
+            self._snapshot = (version, engine)
+        logger.info(f"Loaded {len(engine.rules)} active triage rules (version {version})")
+
+    async def reload_async(self, db) -> None:
+        """Async counterpart of reload for handlers holding an AsyncSession."""
+        version = await crud.get_rule_version_async(db)
+        engine = RuleEngine(await crud.get_triage_rules_async(db))
+        # Queries run outside the lock; never swap an older snapshot over a newer one
+        with self._lock:
+            if version >= self.version:
+                self._snapshot = (version, engine)
+        logger.info(f"Loaded {len(engine.rules)} active triage rules (version {version})")
+
+    def refresh_if_stale(self, db) -> bool:
+        """Reload if another worker changed the rule set; returns True if reloaded."""
+        if crud.get_rule_version(db) == self.version:
+            return False
+        self.reload(db)
+        return True
+
+    def start(self) -> None:
+        """Load the rules and start polling the version row in the background."""
+        self._poll_once(reload=True)
+        if self.poll_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll_loop, name="rule-cache-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def _poll_loop(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self._poll_once()
+
+    def _poll_once(self, reload: bool = False) -> None:
+        db = self.session_factory()
+        try:
+            if reload:
+                self.reload(db)
+            else:
+                self.refresh_if_stale(db)
+        except Exception as e:
+            logger.error(f"Error refreshing triage rules: {str(e)}")
+        finally:
+            db.close()
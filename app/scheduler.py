@@ -0,0 +1,128 @@
+import asyncio
+import heapq
+import itertools
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from app import models
+
+# Scheduling classes, most urgent first
+PRIORITY_CLASSES = ("critical", "high", "normal", "low")
+SEVERITY_CLASSES = {"critical": 0, "high": 1, "error": 1, "warning": 2, "medium": 2}
+LOWEST_CLASS = len(PRIORITY_CLASSES) - 1
+
+_EPOCH = datetime(1970, 1, 1)
+
+def priority_class(severity: Optional[str], rule_class: Optional[str] = None) -> int:
+    """Scheduling class of an alert: 0 (critical) to 3 (low).
+
+    The class follows the severity; `rule_class`, the class named by a
+    matched triage rule's set_priority action, lifts the alert into that
+    class when it is more urgent. Unknown class names are ignored.
+    """
+    cls = SEVERITY_CLASSES.get((severity or "").lower(), LOWEST_CLASS)
+    if rule_class is not None and rule_class.lower() in PRIORITY_CLASSES:
+        cls = min(cls, PRIORITY_CLASSES.index(rule_class.lower()))
+    return cls
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 3)
+
+class TriageScheduler:
+    """Priority queue of claimed alerts waiting for a triage worker, with aging.
+
+    A job is ordered by `waiting_since + class * aging_seconds`: a job of
+    class c overtakes a job of class c - 1 that arrived less than
+    `aging_seconds` earlier, so urgent alerts go first, but one that has
+    waited long enough is served before newer ones of any class and
+    nothing starves. Jobs are keyed by alert ID: putting an alert that is
+    already queued merges it (the newer snapshot and class replace the old
+    entry), and `discard` drops a job, e.g. once its alert has resolved.
+
+    Queue wait (from `waiting_since` to dispatch) is recorded per class
+    over the last `wait_window` dispatches. Must be used from the event loop.
+    """
+
+    def __init__(self, aging_seconds: float = 60.0, wait_window: int = 1000):
+        self.aging_seconds = aging_seconds
+        self._heap: List[Tuple[float, int, int]] = []
+        # alert ID -> (heap sequence number, alert, class, waiting since)
+        self._jobs: Dict[int, Tuple[int, models.Alert, int, datetime]] = {}
+        self._seq = itertools.count()
+        self._ready = asyncio.Event()
+        self._waits: List[Deque[float]] = [deque(maxlen=wait_window) for _ in PRIORITY_CLASSES]
+        self._dispatched = [0] * len(PRIORITY_CLASSES)
+        self._dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, alert_id: int) -> bool:
+        return alert_id in self._jobs
+
+    def ids(self) -> List[int]:
+        return list(self._jobs)
+
+    def put(self, alert: models.Alert, cls: int, waiting_since: Optional[datetime] = None) -> None:
+        """Queue an alert, or merge it into its queued job."""
+        previous = self._jobs.get(alert.id)
+        if previous is not None:
+            # Keep the original wait so a re-fired alert does not lose its place
+            waiting_since = previous[3]
+        waiting_since = waiting_since or datetime.utcnow()
+        seq = next(self._seq)
+        self._jobs[alert.id] = (seq, alert, cls, waiting_since)
+        key = (waiting_since - _EPOCH).total_seconds() + cls * self.aging_seconds
+        heapq.heappush(self._heap, (key, seq, alert.id))
+        self._ready.set()
+
+    def discard(self, alert_id: int) -> Optional[models.Alert]:
+        """Drop a queued job; returns its alert, or None if it was not queued."""
+        job = self._jobs.pop(alert_id, None)
+        if job is None:
+            return None
+        self._dropped += 1
+        return job[1]
+
+    def clear(self) -> List[models.Alert]:
+        """Remove and return every queued alert."""
+        alerts = [job[1] for job in self._jobs.values()]
+        self._jobs.clear()
+        self._heap.clear()
+        return alerts
+
+    async def get(self) -> models.Alert:
+        """Wait for and return the job due first."""
+        while True:
+            while self._heap:
+                _, seq, alert_id = heapq.heappop(self._heap)
+                job = self._jobs.get(alert_id)
+                # Entries replaced by a merge or dropped are skipped lazily
+                if job is None or job[0] != seq:
+                    continue
+                del self._jobs[alert_id]
+                _, alert, cls, waiting_since = job
+                self._waits[cls].append((datetime.utcnow() - waiting_since).total_seconds())
+                self._dispatched[cls] += 1
+                return alert
+            self._ready.clear()
+            await self._ready.wait()
+
+    def stats(self) -> Dict[str, Any]:
+        queued = [0] * len(PRIORITY_CLASSES)
+        for _, _, cls, _ in self._jobs.values():
+            queued[cls] += 1
+        classes = {}
+        for cls, name in enumerate(PRIORITY_CLASSES):
+            waits = list(self._waits[cls])
+            classes[name] = {
+                "queued": queued[cls],
+                "dispatched": self._dispatched[cls],
+                "wait_p50_seconds": _percentile(waits, 0.5),
+                "wait_p95_seconds": _percentile(waits, 0.95),
+                "wait_max_seconds": round(max(waits), 3) if waits else None,
+            }
+        return {"queued": len(self._jobs), "dropped": self._dropped, "classes": classes}
@@ -1,6 +1,12 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, Dict, List
-from datetime import datetime
+from datetime import datetime, timezone
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Convert an aware datetime to naive UTC, as stored in the database; naive values are taken as UTC."""
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 class AlertIn(BaseModel):
     title: str
@@ -11,13 +17,50 @@ class AlertIn(BaseModel):
     source: str
     labels: Optional[Dict] = None
 
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_to_naive_utc(cls, value: datetime) -> datetime:
+        return naive_utc(value)
+
 class AlertOut(AlertIn):
     id: int
     triage_status: str
     triage_notes: Optional[str] = None
+    fingerprint: Optional[str] = None
+    occurrence_count: int = 1
+    last_seen: Optional[datetime] = None
+    incident_id: Optional[int] = None
+    created_at: datetime
+    updated_at: datetime
+
+class AlertHistoryOut(BaseModel):
+    id: int
+    alert_id: int
+    event: Optional[str] = None
+    status: Optional[str] = None
+    triage_status: Optional[str] = None
+    notes: Optional[str] = None
+    timestamp: datetime
+
+class AlertBatchOut(BaseModel):
+    count: int
+    ids: List[int]
+
+class IncidentOut(BaseModel):
+    id: int
+    title: Optional[str] = None
+    status: str
+    severity: Optional[str] = None
+    labels: Optional[Dict] = None
+    alert_count: int
+    first_seen: datetime
+    last_seen: datetime
     created_at: datetime
     updated_at: datetime
 
+class IncidentDetailOut(IncidentOut):
+    alerts: List[AlertOut] = []
+
 class TriageRuleIn(BaseModel):
     name: str
     description: Optional[str] = None
@@ -29,4 +72,8 @@ class TriageRuleIn(BaseModel):
 class TriageRuleOut(TriageRuleIn):
     id: int
     created_at: datetime
-    updated_at: datetime 
\ No newline at end of file
+    updated_at: datetime 
+
+class LogAnalysisIn(BaseModel):
+    log_text: str
+    model: Optional[str] = None
@@ -0,0 +1,16 @@
+from datetime import datetime
+from app import schemas
+
+def make_alert(i=0, **overrides):
+    """A firing critical Grafana alert; `i` varies the title, timestamp and instance label."""
+    data = {
+        "title": f"High CPU Usage {i}",
+        "message": "CPU usage is above 90%",
+        "status": "firing",
+        "severity": "critical",
+        "timestamp": datetime(2024, 1, 1, 0, 0, i % 60),
+        "source": "grafana",
+        "labels": {"instance": f"server-{i % 3}", "job": "node_exporter"}
+    }
+    data.update(overrides)
+    return schemas.AlertIn(**data)
@@ -0,0 +1,141 @@
+import unittest
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, models
+from app.tests.factories import make_alert
+
+class TestAlertsCRUD(unittest.TestCase):
+    """Tests for app.crud against an in-memory SQLite database."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        models.Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_create_alerts_bulk(self):
+        """Test that a batch is inserted at once and IDs come back in order."""
+        ids = crud.create_alerts(self.db, [make_alert(i) for i in range(50)])
+        self.assertEqual(len(ids), 50)
+        self.assertEqual(ids, sorted(ids))
+        stored = {a.id: a for a in self.db.query(models.Alert).all()}
+        self.assertEqual(stored[ids[7]].title, "High CPU Usage 7")
+        self.assertEqual(stored[ids[7]].triage_status, "pending")
+
+    def test_create_alerts_empty(self):
+        """Test that an empty batch is a no-op."""
+        self.assertEqual(crud.create_alerts(self.db, []), [])
+
+    def test_refired_alert_is_deduplicated(self):
+        """Test that re-firing an alert bumps the existing row instead of inserting."""
+        first = crud.create_alert(self.db, make_alert(1))
+        again = crud.create_alert(self.db, make_alert(1, status="resolved", message="CPU back to normal"))
+        self.assertEqual(first.id, again.id)
+        self.assertEqual(again.occurrence_count, 2)
+        self.assertEqual(again.status, "resolved")
+        self.assertGreaterEqual(again.last_seen, first.created_at)
+        self.assertEqual(self.db.query(models.Alert).count(), 1)
+
+    def test_refire_after_resolve_restarts_triage(self):
+        """Test that a resolved alert firing again goes back to pending, or to its rule values."""
+        for upsert in (crud._upsert_statement, lambda dialect, now: None):
+            with self.subTest(upsert="generic" if upsert is not crud._upsert_statement else "on conflict"), \
+                 patch.object(crud, "_upsert_statement", upsert):
+                self.db.query(models.AlertHistory).delete()
+                self.db.query(models.Alert).delete()
+                alert_id = crud.create_alert(self.db, make_alert(1)).id
+                self.db.query(models.Alert).update({"triage_status": "triaged", "triage_notes": "AI triage"})
+                self.db.commit()
+
+                # Repeats while firing or resolving keep the triage
+                crud.create_alert(self.db, make_alert(1))
+                alert = crud.create_alert(self.db, make_alert(1, status="resolved"))
+                self.assertEqual((alert.triage_status, alert.triage_notes), ("triaged", "AI triage"))
+
+                alert = crud.create_alert(self.db, make_alert(1))
+                self.assertEqual((alert.id, alert.triage_status, alert.triage_notes), (alert_id, "pending", None))
+
+                crud.create_alert(self.db, make_alert(1, status="resolved"))
+                alert = crud.create_alert(self.db, make_alert(1), {"triage_status": "acknowledged",
+                                                                   "triage_notes": "Matched rules: CPU"})
+                self.assertEqual((alert.triage_status, alert.triage_notes), ("acknowledged", "Matched rules: CPU"))
+
+    def test_fingerprint_ignores_label_order(self):
+        """Test that label order does not change the fingerprint, but label values do."""
+        a = make_alert(1, labels={"instance": "server-1", "job": "node"})
+        b = make_alert(1, labels={"job": "node", "instance": "server-1"})
+        c = make_alert(1, labels={"job": "node", "instance": "server-2"})
+        self.assertEqual(crud.alert_fingerprint(a), crud.alert_fingerprint(b))
+        self.assertNotEqual(crud.alert_fingerprint(a), crud.alert_fingerprint(c))
+
+    def test_batch_with_duplicates(self):
+        """Test that duplicates within and across batches share one row."""
+        ids = crud.create_alerts(self.db, [make_alert(1), make_alert(2), make_alert(1)])
+        self.assertEqual(ids[0], ids[2])
+        self.assertNotEqual(ids[0], ids[1])
+        more = crud.create_alerts(self.db, [make_alert(2), make_alert(3)])
+        self.assertEqual(more[0], ids[1])
+        counts = {a.title: a.occurrence_count for a in self.db.query(models.Alert)}
+        self.assertEqual(counts, {"High CPU Usage 1": 2, "High CPU Usage 2": 2, "High CPU Usage 3": 1})
+
+    def test_get_alerts_keyset_pagination(self):
+        """Test that walking the cursor returns every alert once, newest first."""
+        crud.create_alerts(self.db, [make_alert(i) for i in range(25)])
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = crud.get_alerts(self.db, limit=10, cursor=cursor)
+            seen.extend(page)
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(len({a.id for a in seen}), 25)
+        keys = [(a.timestamp, a.id) for a in seen]
+        self.assertEqual(keys, sorted(keys, reverse=True))
+
+    def test_get_alerts_filters(self):
+        """Test severity, time range and label filters."""
+        crud.create_alerts(self.db, [make_alert(i) for i in range(9)])
+        crud.create_alerts(self.db, [make_alert(100, severity="warning")])
+
+        page, cursor = crud.get_alerts(self.db, severity="warning")
+        self.assertEqual([a.title for a in page], ["High CPU Usage 100"])
+        self.assertIsNone(cursor)
+
+        page, _ = crud.get_alerts(self.db, labels={"instance": "server-1"})
+        self.assertEqual(sorted(a.title for a in page), ["High CPU Usage 1", "High CPU Usage 100", "High CPU Usage 4", "High CPU Usage 7"])
+
+        page, _ = crud.get_alerts(self.db, since=datetime(2024, 1, 1, 0, 0, 3), until=datetime(2024, 1, 1, 0, 0, 5))
+        self.assertEqual(sorted(a.title for a in page), ["High CPU Usage 3", "High CPU Usage 4"])
+
+        # Aware bounds are compared in UTC
+        tz = timezone(timedelta(hours=-5))
+        page, _ = crud.get_alerts(self.db, since=datetime(2023, 12, 31, 19, 0, 3, tzinfo=tz),
+                                  until=datetime(2023, 12, 31, 19, 0, 5, tzinfo=tz))
+        self.assertEqual(sorted(a.title for a in page), ["High CPU Usage 3", "High CPU Usage 4"])
+
+    def test_aware_timestamp_stored_as_naive_utc(self):
+        """Test that an alert timestamp with a UTC offset is stored converted to naive UTC."""
+        alert = make_alert(0, timestamp="2024-01-01T01:00:00+01:00")
+        self.assertEqual(alert.timestamp, datetime(2024, 1, 1))
+        stored = self.db.get(models.Alert, crud.create_alerts(self.db, [alert])[0])
+        self.assertEqual(stored.timestamp, datetime(2024, 1, 1))
+
+    def test_get_alerts_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        with self.assertRaises(ValueError):
+            crud.get_alerts(self.db, cursor="not-a-cursor")
+
+if __name__ == '__main__':
+    unittest.main()
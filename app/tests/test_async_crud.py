@@ -0,0 +1,78 @@
+import unittest
+import sys
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, models, schemas
+from app.correlation import Correlator
+from app.database import to_async_url
+from app.tests.factories import make_alert
+
+class TestAsyncURL(unittest.TestCase):
+    def test_to_async_url(self):
+        """Test that sync URLs map to their asyncio drivers."""
+        self.assertEqual(to_async_url("sqlite:///./alert_triage.db"), "sqlite+aiosqlite:///./alert_triage.db")
+        self.assertEqual(to_async_url("postgresql://u:p@db/alerts"), "postgresql+asyncpg://u:p@db/alerts")
+        self.assertEqual(to_async_url("postgresql+psycopg2://u:p@db/alerts"), "postgresql+asyncpg://u:p@db/alerts")
+        with self.assertRaises(ValueError):
+            to_async_url("mssql+pyodbc://u:p@db/alerts")
+
+class TestAsyncCRUD(unittest.IsolatedAsyncioTestCase):
+    """Tests for the async CRUD functions against in-memory SQLite (aiosqlite)."""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        self.db = async_sessionmaker(self.engine, expire_on_commit=False)()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def test_create_alerts_dedupes(self):
+        """Test that the async upsert matches the sync one, including fingerprint dedup."""
+        ids = await crud.create_alerts_async(self.db, [make_alert(i) for i in range(5)])
+        self.assertEqual(ids, list(range(1, 6)))
+        again = await crud.create_alert_async(self.db, make_alert(2))
+        self.assertEqual(again.id, 3)
+        self.assertEqual(again.occurrence_count, 2)
+
+    async def test_get_alerts_pages(self):
+        """Test keyset pagination and filters through the async session."""
+        await crud.create_alerts_async(self.db, [make_alert(i) for i in range(7)])
+        page, cursor = await crud.get_alerts_async(self.db, limit=4)
+        self.assertEqual([a.id for a in page], [7, 6, 5, 4])
+        page, cursor = await crud.get_alerts_async(self.db, limit=4, cursor=cursor)
+        self.assertEqual([a.id for a in page], [3, 2, 1])
+        self.assertIsNone(cursor)
+        page, _ = await crud.get_alerts_async(self.db, labels={"instance": "server-0"})
+        self.assertEqual([a.id for a in page], [7, 4, 1])
+
+    async def test_incidents(self):
+        """Test correlation and incident reads with alerts eagerly loaded."""
+        alerts = [make_alert(0), make_alert(3)]
+        ids = await crud.create_alerts_async(self.db, alerts)
+        await crud.correlate_alerts_async(self.db, Correlator(), ids, alerts)
+        incidents = await crud.get_incidents_async(self.db, status="open")
+        self.assertEqual(len(incidents), 1)
+        incident = await crud.get_incident_async(self.db, incidents[0].id)
+        self.assertEqual(sorted(a.id for a in incident.alerts), ids)
+
+    async def test_triage_rules_bump_version(self):
+        """Test that async rule writes bump the rule set version."""
+        rule = schemas.TriageRuleIn(name="crit", description="", conditions={"severity": "critical"},
+                                    actions={"acknowledge": True}, priority=1)
+        db_rule = await crud.create_triage_rule_async(self.db, rule)
+        self.assertEqual(await crud.get_rule_version_async(self.db), 1)
+        await crud.update_triage_rule_async(self.db, db_rule.id, rule)
+        self.assertTrue(await crud.delete_triage_rule_async(self.db, db_rule.id))
+        self.assertEqual(await crud.get_rule_version_async(self.db), 3)
+        self.assertEqual(await crud.get_triage_rules_async(self.db), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,316 @@
+import asyncio
+import os
+import tempfile
+import unittest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, models
+from app.autotriage import AutoTriageWorker, build_prompt
+from app.backend.breaker import BreakerRegistry
+from app.backend.log_analyzer import LogAnalyzer
+from app.backend.router import ProviderRouter
+from app.events import AlertBroadcaster
+from app.tests.factories import make_alert
+
+class FakeAnalyzer:
+    """Stands in for LogAnalyzer; fails for prompts mentioning "broken", falls back locally for "offline"."""
+
+    model_configs = {"test-model": {"provider": "openrouter"}}
+    openrouter_model = "test-model"
+
+    def __init__(self):
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def analyze_logs_async(self, log_text, model=None, client=None, compress=None, prefiltered=False,
+                                 limits=None):
+        self.prompts.append(log_text)
+        async with limits.slot("openrouter"):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+        if "broken" in log_text:
+            return {"error": "API request failed: 503"}
+        if "offline" in log_text:
+            return {"summary": "All analysis models unavailable", "issues": [], "model": "local"}
+        return {
+            "summary": "CPU saturation on one node",
+            "issues": [{"severity": "High", "description": "CPU above 90%", "recommendation": "Check top processes"}]
+        }
+
+    def provider_status(self):
+        return {"breakers": {"openrouter": {"state": "closed"}}}
+
+class TestAutoTriage(unittest.IsolatedAsyncioTestCase):
+    """Tests for claiming pending alerts and the background triage workers."""
+
+    async def asyncSetUp(self):
+        # A file database, so concurrent workers get connections of their own as in production
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.engine = create_async_engine(f"sqlite+aiosqlite:///{self.tmpdir.name}/triage.db")
+        async with self.engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmpdir.cleanup()
+
+    async def add_alerts(self, alerts):
+        async with self.sessions() as db:
+            return await crud.create_alerts_async(db, alerts)
+
+    async def test_claims_are_exclusive(self):
+        """Test that concurrent claims never hand out the same alert twice."""
+        ids = await self.add_alerts([make_alert(i) for i in range(10)])
+
+        async def claim():
+            async with self.sessions() as db:
+                return [alert.id for alert in await crud.claim_pending_alerts_async(db, 4)]
+
+        claimed = []
+        while True:
+            claims = await asyncio.gather(claim(), claim(), claim(), claim())
+            batch = [alert_id for claim_ids in claims for alert_id in claim_ids]
+            if not batch:
+                break
+            claimed += batch
+        # Losers of a race get fewer (or no) alerts, but nothing is claimed twice
+        self.assertEqual(sorted(claimed), ids)
+
+    async def test_expired_claim_is_reclaimed(self):
+        """Test that alerts stuck in "triaging" past the lease are claimed again."""
+        ids = await self.add_alerts([make_alert(0)])
+        async with self.sessions() as db:
+            self.assertEqual(len(await crud.claim_pending_alerts_async(db, 10)), 1)
+            self.assertEqual(await crud.claim_pending_alerts_async(db, 10), [])
+            await db.execute(update(models.Alert).where(models.Alert.id == ids[0])
+                             .values(updated_at=datetime.utcnow() - timedelta(seconds=600)))
+            await db.commit()
+            self.assertEqual([a.id for a in await crud.claim_pending_alerts_async(db, 10, lease_seconds=300)], ids)
+
+    async def test_claims_most_urgent_first(self):
+        """Test that claims favor severe alerts but promote long-waiting ones."""
+        ids = await self.add_alerts([make_alert(i, severity="warning") for i in range(5)]
+                                    + [make_alert(5, severity="critical"), make_alert(6, severity="info")])
+        async with self.sessions() as db:
+            await db.execute(update(models.Alert).where(models.Alert.id == ids[6])
+                             .values(pending_since=datetime.utcnow() - timedelta(seconds=600)))
+            await db.commit()
+            claimed = [a.id for a in await crud.claim_pending_alerts_async(db, 3, aging_seconds=60)]
+        # Info alert promoted by its wait, then the critical one, then the oldest warning
+        self.assertEqual(sorted(claimed), sorted([ids[6], ids[5], ids[0]]))
+
+    async def test_refired_alert_ages_from_refire(self):
+        """Test that an alert re-fired long after creation waits from the re-fire, not from creation."""
+        old_id = (await self.add_alerts([make_alert(0, severity="info")]))[0]
+        async with self.sessions() as db:
+            weeks_ago = datetime.utcnow() - timedelta(weeks=3)
+            await db.execute(update(models.Alert).where(models.Alert.id == old_id)
+                             .values(created_at=weeks_ago, pending_since=weeks_ago, triage_status="triaged"))
+            await db.commit()
+        await self.add_alerts([make_alert(0, severity="info", status="resolved")])
+        await self.add_alerts([make_alert(0, severity="info")])
+        critical_id = (await self.add_alerts([make_alert(1, severity="critical")]))[0]
+        async with self.sessions() as db:
+            refired = await db.get(models.Alert, old_id)
+            self.assertEqual(refired.triage_status, "pending")
+            self.assertGreater(refired.pending_since, datetime.utcnow() - timedelta(minutes=1))
+            claimed = [a.id for a in await crud.claim_pending_alerts_async(db, 1, aging_seconds=60)]
+        self.assertEqual(claimed, [critical_id])
+
+    async def test_resolved_alerts_are_dropped(self):
+        """Test that queued alerts that resolve before analysis are not triaged."""
+        ids = await self.add_alerts([make_alert(0), make_alert(1)])
+        analyzer = FakeAnalyzer()
+        worker = AutoTriageWorker(self.sessions, analyzer=analyzer, concurrency=1, poll_interval=0.01)
+        async with self.sessions() as db:
+            for alert in await crud.claim_pending_alerts_async(db, 10):
+                worker._scheduler.put(alert, worker.classify(alert), alert.created_at)
+        await self.add_alerts([make_alert(1, status="resolved")])
+        await worker.start()
+        try:
+            for _ in range(200):
+                if worker.stats["triaged"] == 1 and worker.stats["dropped"] == 1:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+
+        self.assertEqual(worker.stats["triaged"], 1)
+        self.assertEqual(worker.stats["dropped"], 1)
+        async with self.sessions() as db:
+            resolved = await db.get(models.Alert, ids[1])
+            self.assertEqual(resolved.triage_status, "pending")
+            self.assertEqual(await crud.claim_pending_alerts_async(db, 10), [])
+
+    async def test_worker_writes_triage_notes(self):
+        """Test that workers fill triage notes, record history and publish events."""
+        ids = await self.add_alerts([make_alert(0), make_alert(1, title="broken exporter")])
+        analyzer = FakeAnalyzer()
+        broadcaster = AlertBroadcaster()
+        worker = AutoTriageWorker(self.sessions, analyzer=analyzer, concurrency=2, poll_interval=0.01,
+                                  broadcaster=broadcaster)
+        await worker.start()
+        try:
+            for _ in range(200):
+                if worker.stats["triaged"] + worker.stats["failed"] == 2:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+
+        async with self.sessions() as db:
+            ok = await db.get(models.Alert, ids[0])
+            failed = await db.get(models.Alert, ids[1])
+            self.assertEqual(ok.triage_status, "triaged")
+            self.assertIn("CPU saturation on one node", ok.triage_notes)
+            self.assertIn("- [High] CPU above 90% Recommendation: Check top processes", ok.triage_notes)
+            self.assertEqual(failed.triage_status, "triage_failed")
+            self.assertIn("503", failed.triage_notes)
+            history = await crud.get_alert_history_async(db, ids[0])
+            self.assertEqual([h.event for h in history], ["created", "triaged"])
+
+        self.assertEqual(worker.health()["claimed"], 2)
+        self.assertEqual(broadcaster.last_id, 2)
+        self.assertIn("Label instance=server-0", analyzer.prompts[0] + analyzer.prompts[1])
+
+    async def test_local_fallback_is_retried(self):
+        """Test that a local-classifier answer is not stored and the alert is claimed again after the lease."""
+        ids = await self.add_alerts([make_alert(0, title="exporter offline")])
+        worker = AutoTriageWorker(self.sessions, analyzer=FakeAnalyzer(), concurrency=1, poll_interval=0.01)
+        await worker.start()
+        try:
+            for _ in range(200):
+                if worker.stats["deferred"] == 1:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+
+        self.assertEqual((worker.stats["deferred"], worker.stats["triaged"]), (1, 0))
+        async with self.sessions() as db:
+            alert = await db.get(models.Alert, ids[0])
+            self.assertEqual(alert.triage_status, "triaging")
+            self.assertIsNone(alert.triage_notes)
+            await db.execute(update(models.Alert).where(models.Alert.id == ids[0])
+                             .values(updated_at=datetime.utcnow() - timedelta(seconds=600)))
+            await db.commit()
+            self.assertEqual([a.id for a in await crud.claim_pending_alerts_async(db, 10, lease_seconds=300)], ids)
+
+    async def test_provider_limit(self):
+        """Test that in-flight requests stay within the provider limit."""
+        await self.add_alerts([make_alert(i) for i in range(8)])
+        analyzer = FakeAnalyzer()
+        worker = AutoTriageWorker(self.sessions, analyzer=analyzer, concurrency=4, poll_interval=0.01,
+                                  provider_limits={"openrouter": 2})
+        await worker.start()
+        try:
+            for _ in range(300):
+                if worker.stats["triaged"] == 8:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+        self.assertEqual(worker.stats["triaged"], 8)
+        self.assertLessEqual(analyzer.max_in_flight, 2)
+
+    async def test_provider_limit_with_auto(self):
+        """Test that with model="auto" each provider's limit applies to the calls routed to it."""
+        await self.add_alerts([make_alert(i) for i in range(8)])
+        in_flight = {"openrouter": [0, 0], "huggingface": [0, 0]}
+
+        def provider_call(provider, delay):
+            async def call(*args):
+                counts = in_flight[provider]
+                counts[0] += 1
+                counts[1] = max(counts[1], counts[0])
+                try:
+                    await asyncio.sleep(delay)
+                finally:
+                    # Hedge losers are cancelled here
+                    counts[0] -= 1
+                return {"summary": provider, "issues": [], "timestamp": "t"}
+            return call
+
+        env = {"OPENROUTER_API_KEY": "key", "HUGGINGFACE_API_KEY": "key", "ANALYSIS_CACHE_ENABLED": "false",
+               "OPENROUTER_MAX_RPS": "0", "HUGGINGFACE_MAX_RPS": "0"}
+        with patch.dict(os.environ, env):
+            analyzer = LogAnalyzer()
+        analyzer.router = ProviderRouter(min_hedge_delay=0.005, max_hedge_delay=0.005)
+        analyzer.breakers = BreakerRegistry()
+        worker = AutoTriageWorker(self.sessions, analyzer=analyzer, model="auto", concurrency=6,
+                                  poll_interval=0.01, provider_limits={"openrouter": 2, "huggingface": 1})
+        with patch.object(analyzer, "_analyze_with_openrouter_async", side_effect=provider_call("openrouter", 0.03)), \
+             patch.object(analyzer, "_analyze_with_huggingface_async", side_effect=provider_call("huggingface", 0.01)):
+            await worker.start()
+            try:
+                for _ in range(300):
+                    if worker.stats["triaged"] == 8:
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                await worker.stop()
+
+        self.assertEqual(worker.stats["triaged"], 8)
+        self.assertEqual(in_flight["openrouter"][1], 2)
+        self.assertEqual(in_flight["huggingface"][1], 1)
+        self.assertEqual(worker.health()["in_flight"], {"openrouter": 0, "huggingface": 0})
+
+    async def test_stopped_results_are_not_saved_after_release(self):
+        """Test that released claims go back to pending and late results are discarded."""
+        ids = await self.add_alerts([make_alert(0)])
+        async with self.sessions() as db:
+            await crud.claim_pending_alerts_async(db, 10)
+            await crud.release_claims_async(db, ids)
+            saved = await crud.save_triage_results_async(db, [
+                {"id": ids[0], "status": "firing", "triage_status": "triaged", "triage_notes": "late"}
+            ])
+            alert = await db.get(models.Alert, ids[0], populate_existing=True)
+        self.assertEqual(saved, 0)
+        self.assertEqual(alert.triage_status, "pending")
+        self.assertIsNone(alert.triage_notes)
+
+    async def test_stop_releases_unfinished_claims(self):
+        """Test that stopping mid-analysis returns the alert to pending."""
+        ids = await self.add_alerts([make_alert(0)])
+        analyzer = FakeAnalyzer()
+        started = asyncio.Event()
+
+        async def hang(*args, **kwargs):
+            started.set()
+            await asyncio.sleep(60)
+
+        analyzer.analyze_logs_async = hang
+        worker = AutoTriageWorker(self.sessions, analyzer=analyzer, concurrency=1, poll_interval=0.01)
+        await worker.start()
+        await asyncio.wait_for(started.wait(), 5)
+        await worker.stop()
+
+        async with self.sessions() as db:
+            alert = await db.get(models.Alert, ids[0])
+        self.assertEqual(alert.triage_status, "pending")
+
+    def test_build_prompt(self):
+        """Test that the prompt carries the alert fields and labels."""
+        alert = models.Alert(title="Disk full", severity="warning", status="firing", source="grafana",
+                             message="95% used", timestamp=datetime(2024, 1, 1), labels={"instance": "db-1"},
+                             occurrence_count=1)
+        prompt = build_prompt(alert)
+        self.assertIn("Alert: Disk full", prompt)
+        self.assertIn("Label instance=db-1", prompt)
+        self.assertIn("Message: 95% used", prompt)
+        self.assertNotIn("Occurrences", prompt)
+
+if __name__ == "__main__":
+    unittest.main()
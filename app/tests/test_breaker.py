@@ -0,0 +1,178 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from backend import http_client
+from backend.breaker import CLOSED, HALF_OPEN, OPEN, BreakerRegistry, CircuitBreaker
+from backend.log_analyzer import LogAnalyzer
+
+OPENROUTER = "deepseek/deepseek-r1-0528:free"
+HUGGINGFACE = "mistralai/Mistral-7B-Instruct-v0.1"
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_response(status_code, headers=None, body=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = body or {}
+    return response
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30, clock=self.clock)
+
+    def test_opens_after_threshold_and_recovers(self):
+        """Test closed -> open -> half-open -> closed."""
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.clock.now += 30
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertTrue(self.breaker.allow())
+        # Only one trial call at a time
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.snapshot()["rejected"], 2)
+
+    def test_failed_probe_reopens(self):
+        """Test that a failure while half-open opens the breaker again."""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.snapshot()["retry_in"], 30)
+
+    def test_retry_after_opens_at_once(self):
+        """Test that a Retry-After opens the breaker for that long, never shortened."""
+        self.breaker.record_failure(retry_after=120)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.breaker.record_failure(retry_after=5)
+        self.clock.now += 60
+        self.assertEqual(self.breaker.state, OPEN)
+        self.clock.now += 60
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+    def test_release_frees_probe(self):
+        """Test that a trial call ending without an outcome gives its slot back."""
+        self.breaker.record_failure(retry_after=1)
+        self.clock.now += 1
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.available())
+        self.breaker.release()
+        self.assertTrue(self.breaker.available())
+
+class TestRetryAfter(unittest.TestCase):
+    def test_parse(self):
+        """Test delta-seconds and HTTP-date Retry-After values."""
+        self.assertEqual(http_client.retry_after_seconds(make_response(429, {"Retry-After": "12"})), 12.0)
+        self.assertEqual(http_client.retry_after_seconds(
+            make_response(503, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})), 0.0)
+        self.assertIsNone(http_client.retry_after_seconds(make_response(503, {"Retry-After": "soon"})))
+        self.assertIsNone(http_client.retry_after_seconds(make_response(503)))
+        self.assertIsNone(http_client.retry_after_seconds(None))
+
+    @patch('backend.http_client.time.sleep')
+    def test_long_retry_after_not_slept(self, mock_sleep):
+        """Test that a Retry-After beyond the backoff cap is returned to the caller instead of slept."""
+        session = MagicMock()
+        session.request.return_value = make_response(429, {"Retry-After": "3600"})
+        response = http_client.request_with_retry("POST", "http://example", session=session, max_retries=3)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(session.request.call_count, 1)
+        mock_sleep.assert_not_called()
+
+class TestFallbackChain(unittest.TestCase):
+    def setUp(self):
+        self.env_patcher = patch.dict(os.environ, {
+            'OPENROUTER_API_KEY': 'test_openrouter_key',
+            'HUGGINGFACE_API_KEY': 'test_huggingface_key',
+            'ANALYSIS_CACHE_ENABLED': 'false',
+            'OPENROUTER_MAX_RPS': '0',
+            'HUGGINGFACE_MAX_RPS': '0'
+        })
+        self.env_patcher.start()
+        self.analyzer = LogAnalyzer()
+        self.analyzer.breakers = BreakerRegistry(failure_threshold=2, recovery_timeout=60)
+
+    def tearDown(self):
+        self.env_patcher.stop()
+
+    @patch('backend.log_analyzer.async_request_with_retry')
+    def test_falls_back_and_skips_open_provider(self, mock_request):
+        """Test that a failing provider opens its breaker and is then skipped without a request."""
+        def respond(client, method, url, **kwargs):
+            if "openrouter" in url:
+                return make_response(503)
+            return make_response(200, body=[{"generated_text": '{"summary": "from hf", "issues": []}'}])
+        mock_request.side_effect = respond
+
+        for _ in range(2):
+            result = self.analyzer.analyze_logs("kernel: Out of memory", OPENROUTER, compress=False)
+            self.assertEqual((result["summary"], result["model"]), ("from hf", HUGGINGFACE))
+        self.assertEqual(self.analyzer.breakers.get("openrouter").state, OPEN)
+
+        mock_request.reset_mock()
+        result = self.analyzer.analyze_logs("kernel: Out of memory", OPENROUTER, compress=False)
+        self.assertEqual(result["model"], HUGGINGFACE)
+        self.assertEqual(result["errors"], [f"{OPENROUTER}: openrouter circuit open"])
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertIn("huggingface", mock_request.call_args.args[2])
+
+    @patch('backend.log_analyzer.async_request_with_retry')
+    def test_model_loading_opens_breaker(self, mock_request):
+        """Test that a HuggingFace 503 with estimated_time holds the provider off that long."""
+        mock_request.return_value = make_response(503, body={"error": "loading", "estimated_time": 90.0})
+        self.analyzer.fallback_models = []
+        self.analyzer.analyze_logs("kernel: Out of memory", HUGGINGFACE, compress=False)
+        snapshot = self.analyzer.breakers.snapshot()["huggingface"]
+        self.assertEqual(snapshot["state"], OPEN)
+        self.assertGreater(snapshot["retry_in"], 60)
+
+    def test_local_fallback(self):
+        """Test that the local classifier answers when every model fails."""
+        self.analyzer.breakers.get("openrouter").record_failure(retry_after=60)
+        self.analyzer.breakers.get("huggingface").record_failure(retry_after=60)
+        logs = "kernel: Out of memory\nkernel: Out of memory\nsshd: Failed password for root\ninfo: ok"
+        result = self.analyzer.analyze_logs(logs, compress=False)
+
+        self.assertEqual(result["model"], "local")
+        self.assertEqual(len(result["errors"]), 2)
+        # Most severe first, repeated lines counted once per group
+        self.assertEqual([issue["severity"] for issue in result["issues"]], ["High", "Medium"])
+        self.assertTrue(result["issues"][1]["description"].startswith("2 resource"))
+        self.assertIn("unavailable", result["summary"])
+
+    def test_async_auto_skips_open_provider(self):
+        """Test that model="auto" only routes to providers whose breaker lets calls through."""
+        self.analyzer.breakers.get("openrouter").record_failure(retry_after=60)
+
+        async def answer(*args):
+            return {"summary": "huggingface", "issues": [], "timestamp": "t"}
+
+        with patch.object(self.analyzer, '_analyze_with_openrouter_async') as openrouter, \
+             patch.object(self.analyzer, '_analyze_with_huggingface_async', side_effect=answer):
+            result = asyncio.run(self.analyzer.analyze_logs_async("kernel: Out of memory", "auto", compress=False))
+        openrouter.assert_not_called()
+        self.assertEqual(result["model"], HUGGINGFACE)
+
+if __name__ == '__main__':
+    unittest.main()
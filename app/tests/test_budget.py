@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from backend.budget import PromptBudgeter, count_tokens
+from backend.log_analyzer import LogAnalyzer
+
+def make_log(total=200, error_at=120):
+    lines = [f"Jan 1 00:00:00 host app: request {i} served in {i % 7} ms" for i in range(total)]
+    lines[error_at] = "Jan 1 00:00:00 host sshd: Failed password for root from 10.0.0.1"
+    return "\n".join(lines)
+
+class TestPromptBudgeter(unittest.TestCase):
+    def setUp(self):
+        self.budgeter = PromptBudgeter(context_lines=1)
+
+    def test_within_budget_is_unchanged(self):
+        """Test that small prompts pass through untouched."""
+        text = make_log(total=5, error_at=2)
+        kept, report = self.budgeter.fit(text, 10000)
+        self.assertEqual(kept, text)
+        self.assertEqual(report["dropped_lines"], 0)
+
+    def test_keeps_errors_and_context_first(self):
+        """Test that error lines and their neighbours survive truncation."""
+        text = make_log()
+        kept, report = self.budgeter.fit(text, 100)
+        self.assertLessEqual(count_tokens(kept), 100)
+        self.assertIn("Failed password for root", kept)
+        self.assertIn("request 119 served", kept)
+        self.assertIn("request 121 served", kept)
+        self.assertIn("lines omitted", kept)
+        self.assertGreater(report["dropped_lines"], 0)
+        self.assertEqual(report["kept_lines"] + report["dropped_lines"], 200)
+
+    def test_analyzer_reports_truncation(self):
+        """Test that analyze_logs reports dropped lines in the result."""
+        analyzer = LogAnalyzer()
+        analyzer.cache = None
+        analyzer.template_mining = False
+        analyzer.model_configs["deepseek/deepseek-r1-0528:free"]["max_prompt_tokens"] = 300
+        with patch.object(analyzer, '_analyze_with_openrouter_async', return_value={"summary": "s", "issues": []}) as mock_call:
+            result = analyzer.analyze_logs(make_log(), model="deepseek/deepseek-r1-0528:free")
+        self.assertIn("Failed password", mock_call.call_args[0][1])
+        self.assertGreater(result["truncation"]["dropped_lines"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
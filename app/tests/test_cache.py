@@ -0,0 +1,87 @@
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+import os
+import json
+import tempfile
+import time
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from backend.cache import AnalysisCache
+from backend.log_analyzer import LogAnalyzer
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        """Create a cache backed by a temporary SQLite file."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.db")
+        self.cache = AnalysisCache(self.path, max_memory_entries=2, max_disk_entries=3)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_depends_on_text_model_and_prompt_version(self):
+        """Test that every key component changes the key."""
+        base = AnalysisCache.make_key("log", "model-a", "1")
+        self.assertEqual(base, AnalysisCache.make_key("log", "model-a", "1"))
+        self.assertNotEqual(base, AnalysisCache.make_key("log2", "model-a", "1"))
+        self.assertNotEqual(base, AnalysisCache.make_key("log", "model-b", "1"))
+        self.assertNotEqual(base, AnalysisCache.make_key("log", "model-a", "2"))
+
+    def test_memory_and_disk_tiers(self):
+        """Test hits from memory, then from disk after memory eviction."""
+        self.assertIsNone(self.cache.get("a"))
+        for key in ("a", "b", "c"):
+            self.cache.set(key, {"summary": key, "issues": []})
+
+        self.assertEqual(self.cache.get("c")["summary"], "c")
+        self.assertEqual(self.cache.stats["memory_hits"], 1)
+        # "a" was evicted from memory but is still on disk
+        self.assertEqual(self.cache.get("a")["summary"], "a")
+        self.assertEqual(self.cache.stats["disk_hits"], 1)
+        self.assertEqual(self.cache.stats["misses"], 1)
+
+        # A fresh cache on the same file only has the disk tier
+        reopened = AnalysisCache(self.path)
+        self.assertEqual(reopened.get("b")["summary"], "b")
+
+    def test_disk_size_eviction(self):
+        """Test that the disk tier keeps at most max_disk_entries."""
+        for key in ("a", "b", "c", "d"):
+            self.cache.set(key, {"summary": key, "issues": []})
+            time.sleep(0.001)
+        count = self.cache._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        self.assertEqual(count, 3)
+
+    def test_path_under_home_is_created(self):
+        """Test that "~" is expanded and the cache directory created on first use."""
+        with patch.dict(os.environ, {'HOME': self.tmpdir.name}):
+            cache = AnalysisCache("~/cache/analysis.db")
+        cache.set("a", {"summary": "a", "issues": []})
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, "cache", "analysis.db")))
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are misses."""
+        cache = AnalysisCache(None, ttl=0)
+        cache.set("a", {"summary": "a", "issues": []})
+        time.sleep(0.01)
+        self.assertIsNone(cache.get("a"))
+
+    def test_analyzer_reuses_cached_result(self):
+        """Test that repeating an analysis skips the provider call."""
+        mock_content = json.dumps({"summary": "Cached", "issues": []})
+        with patch.dict(os.environ, {'ANALYSIS_CACHE_ENABLED': 'true', 'ANALYSIS_CACHE_PATH': self.path}), \
+                patch('httpx.AsyncClient.request', new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = MagicMock(status_code=200)
+            mock_post.return_value.json.return_value = {"choices": [{"message": {"content": mock_content}}]}
+            analyzer = LogAnalyzer()
+            first = analyzer.analyze_logs("  error: disk full\n\n")
+            second = LogAnalyzer().analyze_logs("error: disk full")
+
+        self.assertEqual(mock_post.call_count, 1)
+        self.assertEqual(first, second)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import patch
+import os
+import json
+import tempfile
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from backend.classifier import SeverityClassifier
+from backend.log_analyzer import LogAnalyzer
+
+class TestSeverityClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classifier = SeverityClassifier()
+
+    def test_classify_default_patterns(self):
+        """Test severity and category for common log lines."""
+        self.assertEqual(self.classifier.classify("sshd[1]: Failed password for root from 1.2.3.4"), ("high", "security"))
+        self.assertEqual(self.classifier.classify("kernel: Out of memory: Killed process 42"), ("medium", "resource"))
+        self.assertEqual(self.classifier.classify("Kernel panic - not syncing"), ("critical", "kernel"))
+        self.assertEqual(self.classifier.classify("systemd: Started Session 1 of user root."), ("low", "general"))
+
+    def test_most_severe_match_wins(self):
+        """Test that the most severe of several matches is used."""
+        line = "warning: error reading block, I/O error on dev sda"
+        self.assertEqual(self.classifier.classify(line), ("high", "storage"))
+
+    def test_filter_lines_threshold(self):
+        """Test that only lines at or above the threshold are kept."""
+        lines = ["all good", "warning: disk 80% full", "Failed password for admin"]
+        self.assertEqual(list(self.classifier.filter_lines(lines, "high")), ["Failed password for admin"])
+        self.assertEqual(len(list(self.classifier.filter_lines(lines, "medium"))), 2)
+
+    def test_load_patterns_from_file(self):
+        """Test loading a custom pattern table."""
+        patterns = [{"pattern": r"disk \d+% full", "severity": "critical", "category": "storage", "regex": True}]
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+            json.dump(patterns, f)
+        try:
+            classifier = SeverityClassifier.from_file(f.name)
+        finally:
+            os.unlink(f.name)
+        self.assertEqual(classifier.classify("disk 95% full"), ("critical", "storage"))
+        self.assertEqual(classifier.classify("Failed password for root"), ("low", "general"))
+
+    def test_invalid_severity(self):
+        """Test that unknown severities are rejected."""
+        with self.assertRaises(ValueError):
+            SeverityClassifier([{"pattern": "x", "severity": "urgent"}])
+
+    def test_analyzer_skips_llm_below_threshold(self):
+        """Test that analyze_logs only forwards lines at or above the threshold."""
+        with patch.dict(os.environ, {'LOG_SEVERITY_THRESHOLD': 'high', 'ANALYSIS_CACHE_ENABLED': 'false',
+                                     'LOG_TEMPLATE_MINING': 'false'}):
+            analyzer = LogAnalyzer()
+        with patch.object(analyzer, '_analyze_with_openrouter_async', return_value={"summary": "", "issues": []}) as mock_call:
+            result = analyzer.analyze_logs("systemd: Started cron\nwarning: low disk")
+            mock_call.assert_not_called()
+            self.assertEqual(result['issues'], [])
+
+            analyzer.analyze_logs("systemd: Started cron\nsshd: Failed password for root")
+            self.assertEqual(mock_call.call_args[0][1], "sshd: Failed password for root")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import unittest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, models, schemas
+from app.correlation import Correlator, title_key, max_severity
+
+def make_alert(title="Disk 91% full", severity="warning", **labels):
+    return schemas.AlertIn(
+        title=title,
+        message="",
+        status="firing",
+        severity=severity,
+        timestamp=datetime(2024, 1, 1),
+        source="grafana",
+        labels=labels
+    )
+
+class TestCorrelator(unittest.TestCase):
+    """Tests for the in-memory correlation index."""
+
+    def setUp(self):
+        self.correlator = Correlator(window_seconds=60, label_keys=("instance", "service"))
+        self.now = datetime(2024, 1, 1)
+
+    def test_title_key(self):
+        """Test that numbers are masked so similar titles share a key."""
+        self.assertEqual(title_key("Disk 91% full"), title_key("disk  95% FULL"))
+        self.assertNotEqual(title_key("Disk full"), title_key("CPU high"))
+
+    def test_max_severity(self):
+        """Test that the more severe value wins and None is ignored."""
+        self.assertEqual(max_severity("warning", "critical"), "critical")
+        self.assertEqual(max_severity(None, "warning"), "warning")
+
+    def test_groups_by_label_and_title(self):
+        """Test that shared labels or titles correlate and unrelated alerts do not."""
+        self.correlator.add(1, 10, make_alert(instance="db-1"), self.now)
+        self.assertEqual(self.correlator.find(make_alert("CPU high", instance="db-1"), self.now), 1)
+        self.assertEqual(self.correlator.find(make_alert("Disk 97% full", instance="web-2"), self.now), 1)
+        self.assertIsNone(self.correlator.find(make_alert("CPU high", instance="web-2"), self.now))
+
+    def test_matches_seed_keys_only(self):
+        """Test that alerts joining an incident do not widen what it matches."""
+        self.correlator.add(1, 10, make_alert("Disk 91% full", instance="db-1"), self.now)
+        # Joins through the title, but its instance is not one of the incident's keys
+        self.correlator.add(1, 11, make_alert("Disk 97% full", instance="web-2"), self.now)
+        self.assertIsNone(self.correlator.find(make_alert("CPU high", instance="web-2"), self.now))
+        self.assertEqual(self.correlator.find(make_alert("CPU high", instance="db-1"), self.now), 1)
+
+    def test_size_and_age_caps(self):
+        """Test that a full incident takes no more alerts and an old one is closed despite activity."""
+        correlator = Correlator(window_seconds=60, label_keys=("instance",), max_alerts=2, max_age_seconds=100)
+        correlator.add(1, 10, make_alert(instance="db-1"), self.now)
+        correlator.add(1, 11, make_alert(instance="db-1"), self.now)
+        self.assertIsNone(correlator.find(make_alert(instance="db-1"), self.now))
+
+        self.assertEqual(correlator.expire(self.now), [])
+
+        correlator = Correlator(window_seconds=60, label_keys=("instance",), max_alerts=0, max_age_seconds=100)
+        for seconds in range(0, 100, 30):
+            correlator.add(2, 20 + seconds, make_alert(instance="db-1"), self.now + timedelta(seconds=seconds))
+        self.assertEqual(correlator.find(make_alert(instance="db-1"), self.now + timedelta(seconds=100)), 2)
+        self.assertEqual(correlator.expire(self.now + timedelta(seconds=101)), [2])
+
+    def test_window_expiry(self):
+        """Test that idle incidents expire and stop absorbing alerts."""
+        self.correlator.add(1, 10, make_alert(instance="db-1"), self.now)
+        later = self.now + timedelta(seconds=45)
+        self.correlator.add(1, 11, make_alert(instance="db-1"), later)
+
+        # Activity at +45s keeps the incident open past the first alert's window
+        self.assertEqual(self.correlator.expire(self.now + timedelta(seconds=90)), [])
+        self.assertEqual(self.correlator.expire(self.now + timedelta(seconds=120)), [1])
+        self.assertEqual(self.correlator.open_incidents, 0)
+        self.assertIsNone(self.correlator.incident_for_alert(10))
+        self.assertIsNone(self.correlator.find(make_alert(instance="db-1"), self.now + timedelta(seconds=120)))
+
+class TestCorrelateAlerts(unittest.TestCase):
+    """Tests for persisting incidents via app.crud."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        models.Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+        self.correlator = Correlator(window_seconds=300)
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_correlate_alerts(self):
+        """Test that related alerts share one incident with rolled-up counters."""
+        alerts = [
+            make_alert("Disk 91% full", "warning", instance="db-1"),
+            make_alert("Replication lag", "critical", instance="db-1"),
+            make_alert("CPU high", "warning", instance="web-2"),
+        ]
+        ids = crud.create_alerts(self.db, alerts)
+        crud.correlate_alerts(self.db, self.correlator, ids, alerts)
+
+        incidents = {i.alert_count: i for i in crud.get_incidents(self.db)}
+        self.assertEqual(sorted(incidents), [1, 2])
+        self.assertEqual(incidents[2].severity, "critical")
+        self.assertEqual(incidents[2].labels, {"instance": "db-1"})
+        self.assertEqual(sorted(a.id for a in incidents[2].alerts), ids[:2])
+
+        # A re-fired alert is deduplicated upstream and not counted again
+        again = crud.create_alerts(self.db, alerts[:1])
+        crud.correlate_alerts(self.db, self.correlator, again, alerts[:1])
+        self.db.refresh(incidents[2])
+        self.assertEqual(incidents[2].alert_count, 2)
+
+    def test_restore_after_restart(self):
+        """Test that a new correlator picks up open incidents and closes expired ones."""
+        alerts = [make_alert("Disk 91% full", instance="db-1"), make_alert("CPU high", instance="web-2")]
+        ids = crud.create_alerts(self.db, alerts)
+        crud.correlate_alerts(self.db, self.correlator, ids, alerts)
+        incidents = {i.labels["instance"]: i for i in crud.get_incidents(self.db)}
+        incidents["web-2"].last_seen = datetime.utcnow() - timedelta(hours=1)
+        self.db.commit()
+
+        restarted = Correlator(window_seconds=300)
+        self.assertEqual(crud.restore_incidents(self.db, restarted), [incidents["db-1"].id])
+        self.assertEqual(restarted.incident_for_alert(ids[0]), incidents["db-1"].id)
+        self.db.refresh(incidents["web-2"])
+        self.assertEqual(incidents["web-2"].status, "closed")
+
+        # A related alert joins the restored incident instead of opening a new one
+        other = make_alert("Replication lag", instance="db-1")
+        other_ids = crud.create_alerts(self.db, [other])
+        crud.correlate_alerts(self.db, restarted, other_ids, [other])
+        self.assertEqual(len(crud.get_incidents(self.db, status="open")), 1)
+        self.db.refresh(incidents["db-1"])
+        self.assertEqual(incidents["db-1"].alert_count, 2)
+
+    def test_grouped_alert_not_regrouped_by_another_process(self):
+        """Test that an alert in an open incident is not attached to a second one."""
+        alert = make_alert(instance="db-1")
+        ids = crud.create_alerts(self.db, [alert])
+        crud.correlate_alerts(self.db, self.correlator, ids, [alert])
+
+        # Another worker that never saw the incident receives the re-fire
+        crud.correlate_alerts(self.db, Correlator(window_seconds=300), crud.create_alerts(self.db, [alert]), [alert])
+        self.assertEqual(len(crud.get_incidents(self.db)), 1)
+
+    def test_close_incident(self):
+        """Test that a closed incident no longer absorbs new alerts."""
+        alert = make_alert(instance="db-1")
+        ids = crud.create_alerts(self.db, [alert])
+        crud.correlate_alerts(self.db, self.correlator, ids, [alert])
+        incident = crud.get_incidents(self.db)[0]
+
+        closed = crud.close_incident(self.db, self.correlator, incident.id)
+        self.assertEqual(closed.status, "closed")
+
+        other = make_alert("Replication lag", instance="db-1")
+        ids = crud.create_alerts(self.db, [other])
+        crud.correlate_alerts(self.db, self.correlator, ids, [other])
+        self.assertEqual(len(crud.get_incidents(self.db, status="open")), 1)
+        self.assertIsNone(crud.close_incident(self.db, self.correlator, 999))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, models, schemas
+from app.database import apply_sqlite_pragmas, effective_settings, engine_options
+
+class TestDatabaseSettings(unittest.TestCase):
+    def test_engine_options_postgres(self):
+        """Test that Postgres gets pool settings and a statement timeout for either driver."""
+        options = engine_options("postgresql://u:p@db/alerts")
+        self.assertTrue(options["pool_pre_ping"])
+        self.assertIn("pool_size", options)
+        self.assertIn("statement_timeout", options["connect_args"]["options"])
+        options = engine_options("postgresql+asyncpg://u:p@db/alerts")
+        self.assertIn("statement_timeout", options["connect_args"]["server_settings"])
+
+    def test_engine_options_sqlite(self):
+        """Test that SQLite skips server pool settings."""
+        options = engine_options("sqlite:///./alert_triage.db")
+        self.assertNotIn("pool_size", options)
+        self.assertFalse(options["connect_args"]["check_same_thread"])
+
+    def test_sqlite_pragmas_and_concurrent_writers(self):
+        """Test WAL is enabled and concurrent writers wait instead of failing with "database is locked"."""
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{tmp}/alerts.db"
+            engine = create_engine(url, **engine_options(url))
+            apply_sqlite_pragmas(engine)
+            models.Base.metadata.create_all(bind=engine)
+            with engine.connect() as conn:
+                settings = effective_settings(conn)
+            self.assertEqual(settings["journal_mode"], "wal")
+            self.assertEqual(settings["synchronous"], 1)
+
+            Session = sessionmaker(bind=engine)
+            errors = []
+
+            def writer(n):
+                db = Session()
+                try:
+                    for i in range(20):
+                        crud.create_alert(db, schemas.AlertIn(
+                            title=f"Alert {n}-{i}", message="", status="firing", severity="warning",
+                            timestamp=datetime(2024, 1, 1), source="test", labels={}
+                        ))
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    db.close()
+
+            threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            with Session() as db:
+                self.assertEqual(db.query(models.Alert).count(), 160)
+            engine.dispose()
+
+if __name__ == '__main__':
+    unittest.main()
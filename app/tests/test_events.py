@@ -0,0 +1,55 @@
+import unittest
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app.events import AlertBroadcaster, AlertFilter, format_sse
+
+def payload(i, severity="critical", **labels):
+    return {"id": i, "title": f"Alert {i}", "severity": severity, "status": "firing", "labels": labels}
+
+def drain(subscription):
+    items = []
+    while not subscription.queue.empty():
+        items.append(subscription.queue.get_nowait())
+    return items
+
+class TestAlertBroadcaster(unittest.IsolatedAsyncioTestCase):
+    """Tests for the live alert event fan-out."""
+
+    async def test_filters(self):
+        """Test that subscribers only receive events matching their filters."""
+        broadcaster = AlertBroadcaster()
+        critical = broadcaster.subscribe(AlertFilter(severity="critical"))
+        db_only = broadcaster.subscribe(AlertFilter(labels={"instance": "db-1"}))
+        broadcaster.publish("alert", [payload(1), payload(2, "warning", instance="db-1")])
+        self.assertEqual([item[2]["id"] for item in drain(critical)], [1])
+        self.assertEqual([item[2]["id"] for item in drain(db_only)], [2])
+
+    async def test_resume_from_last_event_id(self):
+        """Test that a reconnecting subscriber gets the buffered events it missed."""
+        broadcaster = AlertBroadcaster(buffer_size=5)
+        broadcaster.publish("alert", [payload(i) for i in range(4)])
+        resumed = broadcaster.subscribe(AlertFilter(), last_event_id=2)
+        self.assertEqual([item[0] for item in drain(resumed)], [3, 4])
+
+        broadcaster.publish("alert", [payload(i) for i in range(4, 10)])
+        too_old = broadcaster.subscribe(AlertFilter(), last_event_id=2)
+        self.assertEqual([item[1] for item in drain(too_old)], ["reset"])
+
+    async def test_slow_subscriber_is_dropped(self):
+        """Test that a subscriber whose queue overflows is dropped instead of blocking publish."""
+        broadcaster = AlertBroadcaster(subscriber_queue_size=2)
+        slow = broadcaster.subscribe(AlertFilter())
+        broadcaster.publish("alert", [payload(i) for i in range(3)])
+        self.assertTrue(slow.lagged)
+        self.assertEqual(broadcaster.subscribers, 0)
+        self.assertEqual(len(drain(slow)), 2)
+
+    def test_format_sse(self):
+        """Test the event-stream wire format."""
+        self.assertEqual(format_sse(7, "alert", {"id": 1}), 'id: 7\nevent: alert\ndata: {"id": 1}\n\n')
+
+if __name__ == '__main__':
+    unittest.main()
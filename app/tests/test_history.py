@@ -0,0 +1,99 @@
+import unittest
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateTable
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, history, models, schemas
+
+def make_alert(status="firing"):
+    return schemas.AlertIn(title="Disk full", message="", status=status, severity="warning",
+                           timestamp=datetime(2024, 1, 1), source="test", labels={"instance": "db-1"})
+
+class RecordingConnection:
+    """Stand-in for a Postgres connection that records the SQL it is given."""
+
+    def __init__(self, partitions=(), relkind="p"):
+        self.dialect = SimpleNamespace(name="postgresql")
+        self.statements = []
+        self.partitions = list(partitions)
+        self.relkind = relkind
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        return SimpleNamespace(scalars=lambda: iter(self.partitions), scalar=lambda: self.relkind, rowcount=3)
+
+class TestAlertHistory(unittest.TestCase):
+    """Tests for alert history writes and time-bucketed retention."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        models.Base.metadata.create_all(bind=self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def test_transitions_recorded(self):
+        """Test that creation and status changes are recorded, but plain re-fires are not."""
+        alert_id = crud.create_alerts(self.db, [make_alert()], [{"triage_status": "acknowledged"}])[0]
+        crud.create_alerts(self.db, [make_alert()])
+        crud.create_alerts(self.db, [make_alert("resolved")])
+        entries = crud.get_alert_history(self.db, alert_id)
+        self.assertEqual([(e.event, e.status, e.triage_status) for e in entries], [
+            ("created", "firing", "acknowledged"),
+            ("status_changed", "resolved", "acknowledged"),
+        ])
+        self.assertEqual([e.id for e in self.db.get(models.Alert, alert_id).history], [e.id for e in entries])
+
+    def test_month_start(self):
+        """Test month arithmetic across year boundaries."""
+        self.assertEqual(history.month_start(datetime(2024, 11, 15), 2), datetime(2025, 1, 1))
+        self.assertEqual(history.month_start(datetime(2024, 1, 31), -1), datetime(2023, 12, 1))
+
+    def test_drop_expired_sqlite(self):
+        """Test that databases without partitions fall back to a range delete."""
+        alert_id = crud.create_alerts(self.db, [make_alert()])[0]
+        self.db.add(models.AlertHistory(alert_id=alert_id, event="created", status="firing",
+                                        timestamp=datetime(2023, 1, 5)))
+        self.db.commit()
+        history.maintain(self.engine, retention_months=6, now=datetime(2024, 1, 10))
+        self.assertEqual([e.event for e in crud.get_alert_history(self.db, alert_id)], ["created"])
+        self.assertTrue(all(e.timestamp >= datetime(2023, 7, 1) for e in crud.get_alert_history(self.db, alert_id)))
+
+    def test_postgres_partitions(self):
+        """Test partitioned DDL, partition creation and dropping whole expired partitions."""
+        ddl = str(CreateTable(models.AlertHistory.__table__).compile(dialect=postgresql.dialect()))
+        self.assertIn("PARTITION BY RANGE (timestamp)", ddl)
+        self.assertIn("PRIMARY KEY (id, timestamp)", ddl)
+
+        conn = RecordingConnection()
+        created = history.ensure_partitions(conn, datetime(2024, 12, 20), months_ahead=1)
+        self.assertEqual(created, ["alert_history_2024_12", "alert_history_2025_01"])
+        self.assertIn("FROM ('2024-12-01T00:00:00') TO ('2025-01-01T00:00:00')", conn.statements[1])
+
+        conn = RecordingConnection(["alert_history_2023_06", "alert_history_2023_07", "alert_history_2024_01"])
+        dropped = history.drop_expired(conn, datetime(2024, 1, 10), retention_months=6)
+        self.assertEqual(dropped, ["alert_history_2023_06"])
+        self.assertIn("DROP TABLE alert_history_2023_06", conn.statements)
+
+    def test_postgres_plain_table_falls_back_to_delete(self):
+        """Test that a non-partitioned table left by an earlier version is not given partitions."""
+        conn = RecordingConnection(relkind="r")
+        self.assertEqual(history.ensure_partitions(conn, datetime(2024, 12, 20)), [])
+        self.assertFalse(any("PARTITION OF" in statement for statement in conn.statements))
+
+        conn = RecordingConnection(["alert_history_2023_06"], relkind="r")
+        self.assertEqual(history.drop_expired(conn, datetime(2024, 1, 10), retention_months=6), ["3 rows"])
+        self.assertTrue(conn.statements[-1].startswith("DELETE FROM alert_history"))
+
+if __name__ == '__main__':
+    unittest.main()
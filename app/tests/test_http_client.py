@@ -0,0 +1,89 @@
+import asyncio
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+import sys
+from pathlib import Path
+
+import httpx
+import requests
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from backend import http_client
+
+def make_response(status_code):
+    response = MagicMock()
+    response.status_code = status_code
+    return response
+
+class TestHttpClient(unittest.TestCase):
+    def test_shared_session(self):
+        """Test that every caller gets the same pooled session."""
+        self.assertIs(http_client.get_session(), http_client.get_session())
+
+    @patch('backend.http_client.time.sleep')
+    def test_retries_transient_status(self, mock_sleep):
+        """Test that 503s are retried with backoff until success."""
+        session = MagicMock()
+        responses = [make_response(503), make_response(503), make_response(200)]
+        session.request.side_effect = responses
+        response = http_client.request_with_retry("POST", "http://example", session=session, max_retries=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(session.request.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+        # Retried responses give their connection back; the returned one stays open
+        self.assertEqual([r.close.call_count for r in responses], [1, 1, 0])
+        # A default timeout is always applied
+        self.assertIn("timeout", session.request.call_args.kwargs)
+
+    @patch('backend.http_client.time.sleep')
+    def test_no_retry_on_client_error(self, mock_sleep):
+        """Test that non-retryable statuses are returned immediately."""
+        session = MagicMock()
+        session.request.return_value = make_response(400)
+        response = http_client.request_with_retry("POST", "http://example", session=session)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(session.request.call_count, 1)
+        mock_sleep.assert_not_called()
+
+    @patch('backend.http_client.time.sleep')
+    def test_connection_errors_raise_after_retries(self, mock_sleep):
+        """Test that connection errors are re-raised once retries are exhausted."""
+        session = MagicMock()
+        session.request.side_effect = requests.ConnectionError("refused")
+        with self.assertRaises(requests.ConnectionError):
+            http_client.request_with_retry("GET", "http://example", session=session, max_retries=2)
+        self.assertEqual(session.request.call_count, 3)
+
+    @patch('backend.http_client.time.sleep')
+    def test_read_timeouts_are_not_retried(self, mock_sleep):
+        """Test that a read timeout is raised without sending the request again."""
+        session = MagicMock()
+        session.request.side_effect = requests.ReadTimeout("slow")
+        with self.assertRaises(requests.ReadTimeout):
+            http_client.request_with_retry("POST", "http://example", session=session, max_retries=2)
+        self.assertEqual(session.request.call_count, 1)
+
+    @patch('backend.http_client.asyncio.sleep')
+    def test_async_retries_only_connect_errors(self, mock_sleep):
+        """Test that async calls retry connect failures but not read timeouts."""
+        client = MagicMock()
+        client.request = AsyncMock(side_effect=[httpx.ConnectError("refused"), make_response(200)])
+        response = asyncio.run(http_client.async_request_with_retry(client, "POST", "http://example"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.request.call_count, 2)
+
+        client.request = AsyncMock(side_effect=httpx.ReadTimeout("slow"))
+        with self.assertRaises(httpx.ReadTimeout):
+            asyncio.run(http_client.async_request_with_retry(client, "POST", "http://example", max_retries=3))
+        self.assertEqual(client.request.call_count, 1)
+
+    def test_backoff_is_jittered_and_capped(self):
+        """Test that backoff delays stay within the exponential cap."""
+        for attempt in range(10):
+            delay = http_client.backoff_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(http_client.BACKOFF_MAX, http_client.BACKOFF_FACTOR * 2 ** attempt))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import unittest
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, models, schemas
+from app.events import AlertBroadcaster, AlertFilter
+from app.ingest import IngestQueue, IngestQueueFull
+from app.journal import AlertJournal
+
+def make_alert(i=0):
+    return schemas.AlertIn(
+        title=f"Alert {i}", message="", status="firing", severity="warning",
+        timestamp=datetime(2024, 1, 1), source="test", labels={"instance": f"server-{i}"}
+    )
+
+class TestIngestQueue(unittest.IsolatedAsyncioTestCase):
+    """Tests for the write-behind ingest queue and its journal."""
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal_dir = str(Path(self.tmp.name) / "journal")
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.tmp.cleanup()
+
+    async def count_alerts(self):
+        async with self.sessions() as db:
+            return await db.scalar(select(func.count(models.Alert.id)))
+
+    async def test_micro_batches(self):
+        """Test that submitted alerts are written in batches of at most batch_size."""
+        queue = IngestQueue(self.sessions, batch_size=4, flush_interval=0.01)
+        await queue.start()
+        await queue.submit([make_alert(i) for i in range(10)], [{}] * 10)
+        await queue.drain()
+        self.assertEqual(await self.count_alerts(), 10)
+        self.assertEqual(queue.stats["batches"], 3)
+        self.assertEqual(queue.depth, 0)
+        await queue.stop()
+
+    async def test_backpressure(self):
+        """Test that a submit over capacity is rejected as a whole."""
+        queue = IngestQueue(self.sessions, maxsize=5)
+        await queue.start()
+        await queue.submit([make_alert(i) for i in range(3)], [{}] * 3)
+        with self.assertRaises(IngestQueueFull):
+            await queue.submit([make_alert(i) for i in range(3)], [{}] * 3)
+        self.assertEqual(queue.health()["rejected"], 3)
+        await queue.stop()
+        self.assertEqual(await self.count_alerts(), 3)
+
+    async def test_failed_write_is_retried(self):
+        """Test that a failed batch is kept and retried rather than dropped."""
+        queue = IngestQueue(self.sessions, flush_interval=0.01)
+        await queue.start()
+        original = crud.create_alerts_async
+        calls = []
+
+        async def flaky(db, alerts, triage=None):
+            calls.append(len(alerts))
+            if len(calls) == 1:
+                raise RuntimeError("database unavailable")
+            return await original(db, alerts, triage)
+
+        with patch.object(crud, "create_alerts_async", flaky):
+            await queue.submit([make_alert(1)], [{}])
+            await asyncio.wait_for(queue.drain(), 5)
+        self.assertEqual(len(calls), 2)
+        self.assertIn("database unavailable", queue.health()["last_error"])
+        self.assertEqual(await self.count_alerts(), 1)
+        await queue.stop()
+
+    async def test_rejected_alert_is_dead_lettered(self):
+        """Test that a row the database keeps rejecting is isolated and skipped, not retried forever."""
+        journal = AlertJournal(self.journal_dir, fsync=False)
+        queue = IngestQueue(self.sessions, journal=journal, flush_interval=0.05, max_attempts=2)
+        await queue.start()
+        original = crud.create_alerts_async
+
+        async def reject_poison(db, alerts, triage=None):
+            if any(alert.title == "Alert 3" for alert in alerts):
+                raise RuntimeError("value too long")
+            return await original(db, alerts, triage)
+
+        with patch.object(crud, "create_alerts_async", reject_poison):
+            await queue.submit([make_alert(i) for i in range(6)], [{}] * 6)
+            await asyncio.wait_for(queue.drain(), 5)
+        self.assertEqual(await self.count_alerts(), 5)
+        self.assertEqual(queue.stats["dead_lettered"], 1)
+        self.assertEqual(journal.pending, 0)
+        with open(Path(self.journal_dir) / "dead_letter.jsonl") as f:
+            entries = [json.loads(line) for line in f]
+        self.assertEqual([e["alert"]["title"] for e in entries], ["Alert 3"])
+        self.assertIn("value too long", entries[0]["error"])
+        await queue.stop()
+
+    async def test_unreachable_database_is_not_dead_lettered(self):
+        """Test that while the database is down, failing batches are kept however often they fail."""
+        queue = IngestQueue(self.sessions, flush_interval=0.01, max_attempts=1)
+        await queue.start()
+        original = crud.create_alerts_async
+        calls = []
+
+        async def down(db, alerts, triage=None):
+            calls.append(len(alerts))
+            if len(calls) <= 3:
+                raise RuntimeError("database unavailable")
+            return await original(db, alerts, triage)
+
+        with patch.object(crud, "create_alerts_async", down), \
+             patch.object(queue, "_database_reachable", return_value=False):
+            await queue.submit([make_alert(i) for i in range(4)], [{}] * 4)
+            await asyncio.wait_for(queue.drain(), 5)
+        self.assertEqual(calls, [4, 4, 4, 4])
+        self.assertEqual(queue.stats["dead_lettered"], 0)
+        self.assertEqual(await self.count_alerts(), 4)
+        await queue.stop()
+
+    async def test_refire_event_carries_stored_triage(self):
+        """Test that the event for a re-fired alert reports its stored triage, not "pending"."""
+        broadcaster = AlertBroadcaster()
+        subscription = broadcaster.subscribe(AlertFilter())
+        queue = IngestQueue(self.sessions, flush_interval=0.01, broadcaster=broadcaster)
+        await queue.start()
+        await queue.submit([make_alert(1)], [{}])
+        await queue.drain()
+        async with self.sessions() as db:
+            await db.execute(update(models.Alert).values(triage_status="triaged", triage_notes="AI triage"))
+            await db.commit()
+        await queue.submit([make_alert(1), make_alert(2)], [{}, {}])
+        await queue.drain()
+        await queue.stop()
+
+        events = [subscription.queue.get_nowait()[2] for _ in range(3)]
+        self.assertEqual([(e["id"], e["triage_status"], e["triage_notes"]) for e in events],
+                         [(1, "pending", None), (1, "triaged", "AI triage"), (2, "pending", None)])
+
+    async def test_journal_replay(self):
+        """Test that journaled alerts that never reached the database are written on start."""
+        journal = AlertJournal(self.journal_dir)
+        journal.append([{"alert": make_alert(i).model_dump(mode="json"), "triage": {}} for i in range(3)])
+        journal.checkpoint(1)
+        journal.close()
+
+        journal = AlertJournal(self.journal_dir)
+        self.assertEqual(journal.pending, 2)
+        queue = IngestQueue(self.sessions, journal=journal, flush_interval=0.01)
+        await queue.start()
+        await queue.submit([make_alert(3)], [{}])
+        await queue.drain()
+        self.assertEqual(await self.count_alerts(), 3)
+        self.assertEqual(journal.pending, 0)
+        await queue.stop()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import unittest
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app.journal import AlertJournal
+
+class TestAlertJournal(unittest.TestCase):
+    """Tests for the segmented alert journal."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_replay(self):
+        """Test that entries after the checkpoint are replayed in order after reopening."""
+        journal = AlertJournal(self.dir)
+        self.assertEqual(journal.append([{"n": i} for i in range(5)]), [1, 2, 3, 4, 5])
+        journal.checkpoint(2)
+        journal.close()
+
+        journal = AlertJournal(self.dir)
+        self.assertEqual(list(journal.replay()), [(3, {"n": 2}), (4, {"n": 3}), (5, {"n": 4})])
+        self.assertEqual(journal.append([{"n": 5}]), [6])
+        journal.close()
+
+    def test_rotation_and_checkpoint_cleanup(self):
+        """Test that segments rotate by size and checkpointed ones are deleted."""
+        journal = AlertJournal(self.dir, segment_bytes=200)
+        for i in range(20):
+            journal.append([{"n": i, "pad": "x" * 40}])
+        self.assertGreater(journal.segments, 3)
+        self.assertEqual([seq for seq, _ in journal.replay()], list(range(1, 21)))
+
+        journal.checkpoint(20)
+        self.assertEqual(journal.segments, 1)
+        self.assertEqual(list(journal.replay()), [])
+        journal.close()
+
+    def test_torn_tail_is_truncated(self):
+        """Test that a partially written last record is dropped on open."""
+        journal = AlertJournal(self.dir)
+        journal.append([{"n": 1}, {"n": 2}])
+        journal.close()
+        segment = os.path.join(self.dir, sorted(n for n in os.listdir(self.dir) if n.endswith(".seg"))[-1])
+        with open(segment, "r+b") as f:
+            f.truncate(os.path.getsize(segment) - 3)
+
+        journal = AlertJournal(self.dir)
+        self.assertEqual(list(journal.replay()), [(1, {"n": 1})])
+        self.assertEqual(journal.append([{"n": 3}]), [2])
+        self.assertEqual([seq for seq, _ in journal.replay()], [1, 2])
+        journal.close()
+
+    def test_concurrent_writers(self):
+        """Test that concurrent appends get unique sequence numbers and all become durable."""
+        journal = AlertJournal(self.dir)
+
+        def writer():
+            for i in range(50):
+                journal.sync(journal.append([{"n": i}])[-1])
+
+        threads = [threading.Thread(target=writer) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(journal.durable_seq, 400)
+        self.assertEqual([seq for seq, _ in journal.replay()], list(range(1, 401)))
+        journal.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import unittest
-from unittest.mock import patch, MagicMock
+import asyncio
+from unittest.mock import patch, AsyncMock, MagicMock
 import os
 import json
 from datetime import datetime
@@ -8,6 +9,7 @@ from pathlib import Path
 
 # Add the app directory to the Python path
 sys.path.append(str(Path(__file__).parent.parent))
+from backend.breaker import BreakerRegistry
 from backend.log_analyzer import LogAnalyzer
 
 class TestLogAnalyzer(unittest.TestCase):
@@ -18,12 +20,14 @@ class TestLogAnalyzer(unittest.TestCase):
             'OPENROUTER_API_KEY': 'test_openrouter_key',
             'HUGGINGFACE_API_KEY': 'test_huggingface_key',
             'OPENROUTER_MODEL': 'deepseek/deepseek-r1-0528:free',
-            'HUGGINGFACE_MODEL': 'mistralai/Mistral-7B-Instruct-v0.1'
+            'HUGGINGFACE_MODEL': 'mistralai/Mistral-7B-Instruct-v0.1',
+            'ANALYSIS_CACHE_ENABLED': 'false'
         })
         self.env_patcher.start()
         
-        # Create LogAnalyzer instance
+        # Create LogAnalyzer instance, with breakers of its own
         self.analyzer = LogAnalyzer()
+        self.analyzer.breakers = BreakerRegistry()
 
     def tearDown(self):
         """Clean up after each test."""
@@ -57,9 +61,9 @@ class TestLogAnalyzer(unittest.TestCase):
             }]
         }
         
-        with patch('requests.post') as mock_post:
+        with patch('httpx.AsyncClient.request', new_callable=AsyncMock) as mock_post:
+            mock_post.return_value = MagicMock(status_code=200)
             mock_post.return_value.json.return_value = mock_response
-            mock_post.return_value.status_code = 200
             
             analyzer = LogAnalyzer()
             result = analyzer.analyze_logs("Test log message", model="deepseek/deepseek-r1-0528:free")
@@ -90,7 +94,7 @@ class TestLogAnalyzer(unittest.TestCase):
             })
         }]
         
-        with patch('requests.post', return_value=mock_response):
+        with patch('httpx.AsyncClient.request', new_callable=AsyncMock, return_value=mock_response):
             result = self.analyzer.analyze_logs(test_log, model=test_model)
             
             self.assertIn('summary', result)
@@ -103,7 +107,12 @@ class TestLogAnalyzer(unittest.TestCase):
         self.analyzer.huggingface_api_key = None
         
         result = self.analyzer.analyze_logs("Test log")
-        self.assertIn('error', result)
+        self.assertNotIn('error', result)
+        self.assertEqual(result['model'], 'local')
+        self.assertEqual(len(result['errors']), 1)
+
+        self.analyzer.local_fallback = False
+        self.assertIn('error', self.analyzer.analyze_logs("Test log"))
 
     def test_parse_analysis(self):
         """Test parsing of analysis results."""
@@ -131,5 +140,95 @@ class TestLogAnalyzer(unittest.TestCase):
         result = self.analyzer._parse_analysis(test_analysis)
         self.assertIn('error', result)
 
+    def test_iter_chunks_respects_budget(self):
+        """Test that chunks are cut on line boundaries within the token budget."""
+        lines = [f"Jan 1 00:00:{i:02d} host sshd[{i}]: message number {i}\n" for i in range(50)]
+        chunks = list(self.analyzer.iter_chunks(iter(lines), max_tokens=60))
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(self.analyzer._estimate_tokens(chunk), 60 + len(chunk.split('\n')))
+        rejoined = '\n'.join(chunks).split('\n')
+        self.assertEqual(rejoined, [line.strip() for line in lines])
+
+    def test_analyze_stream_merges_issues(self):
+        """Test that per-chunk issues are merged into one result."""
+        chunk_results = [
+            {"summary": "Chunk one", "issues": [{"description": "Disk full", "severity": "High"}], "timestamp": "t"},
+            {"summary": "Chunk two", "issues": [{"description": "disk full", "severity": "High"},
+                                                {"description": "OOM", "severity": "Medium"}], "timestamp": "t"},
+            {"error": "API error: 500"}
+        ]
+        lines = ["line %d" % i for i in range(15)]
+        self.analyzer.template_mining = False
+        with patch.object(self.analyzer, 'analyze_logs', side_effect=chunk_results) as mock_analyze:
+            result = self.analyzer.analyze_stream(lines, max_tokens=10, concurrency=1)
+
+        self.assertEqual(mock_analyze.call_count, 3)
+        self.assertEqual(result['summary'], "Chunk one Chunk two")
+        self.assertEqual([i['description'] for i in result['issues']], ["Disk full", "OOM"])
+        self.assertEqual(result['errors'], ["API error: 500"])
+
+    def test_analyze_stream_marks_local_fallback(self):
+        """Test that merged results keep fallback markers and summarize local chunks once."""
+        local = {"summary": "LLM analysis unavailable; the local classifier flagged 1 of 5 lines",
+                 "issues": [], "timestamp": "t", "model": "local", "errors": ["test-model: API error: 503"]}
+        chunk_results = [
+            dict(local),
+            {"summary": "Chunk two", "issues": [], "timestamp": "t",
+             "truncation": {"kept_lines": 4, "dropped_lines": 1, "budget_tokens": 10}},
+            dict(local),
+        ]
+        self.analyzer.template_mining = False
+        with patch.object(self.analyzer, 'analyze_logs', side_effect=chunk_results):
+            result = self.analyzer.analyze_stream(["line %d" % i for i in range(15)], max_tokens=10, concurrency=1)
+
+        self.assertEqual(result['summary'], "Chunk two LLM analysis unavailable for 2 of 3 chunks; "
+                                            "their lines were rated by the local classifier.")
+        self.assertTrue(result['degraded'])
+        self.assertEqual(result['local_chunks'], 2)
+        self.assertNotIn('model', result)
+        self.assertEqual(result['errors'], ["test-model: API error: 503"])
+        self.assertEqual(result['truncation'], {"chunks": 1, "kept_lines": 4, "dropped_lines": 1})
+
+        # With every chunk on the local classifier the merged result names it, like a single result
+        with patch.object(self.analyzer, 'analyze_logs', side_effect=[dict(local)] * 3):
+            result = self.analyzer.analyze_stream(["line %d" % i for i in range(15)], max_tokens=10, concurrency=1)
+        self.assertEqual(result['model'], "local")
+        self.assertEqual(result['summary'].count("LLM analysis unavailable"), 1)
+
+    def test_analyze_stream_inside_event_loop(self):
+        """Test that analyze_stream falls back to sequential analysis inside a running event loop."""
+        self.analyzer.template_mining = False
+        result = {"summary": "Chunk", "issues": [], "timestamp": "t"}
+
+        async def handler():
+            return self.analyzer.analyze_stream(["line %d" % i for i in range(15)], max_tokens=10, concurrency=4)
+
+        with patch.object(self.analyzer, 'analyze_logs', return_value=result) as mock_analyze:
+            merged = asyncio.run(handler())
+
+        self.assertEqual(mock_analyze.call_count, 3)
+        self.assertEqual(merged['summary'], "Chunk")
+
+    def test_analyze_chunks_async_preserves_order(self):
+        """Test concurrent chunk analysis is bounded and reassembled in order."""
+        in_flight = {"current": 0, "max": 0}
+
+        async def fake_analyze(client, log_text):
+            in_flight["current"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["current"])
+            # Later chunks finish first
+            await asyncio.sleep(0.01 * (10 - int(log_text)))
+            in_flight["current"] -= 1
+            return {"summary": log_text, "issues": [], "timestamp": "t"}
+
+        self.analyzer.provider_rate_limits["openrouter"] = 0
+        chunks = (str(i) for i in range(10))
+        with patch.object(self.analyzer, '_analyze_with_openrouter_async', side_effect=fake_analyze):
+            results = asyncio.run(self.analyzer.analyze_chunks_async(chunks, concurrency=3, compress=False))
+
+        self.assertEqual([r['summary'] for r in results], [str(i) for i in range(10)])
+        self.assertLessEqual(in_flight["max"], 3)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,64 @@
+import unittest
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, migrations, models
+from app.tests.factories import make_alert
+
+# Tables as the first release created them
+BASELINE_SCHEMA = [
+    """CREATE TABLE alerts (
+        id INTEGER PRIMARY KEY, title VARCHAR, message VARCHAR, status VARCHAR, severity VARCHAR,
+        timestamp DATETIME, source VARCHAR, labels JSON, triage_status VARCHAR, triage_notes VARCHAR,
+        created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE alert_history (
+        id INTEGER PRIMARY KEY, alert_id INTEGER REFERENCES alerts (id), status VARCHAR,
+        notes VARCHAR, timestamp DATETIME)""",
+    "INSERT INTO alerts (id, title, status, severity, triage_status) VALUES (1, 'Old alert', 'firing', 'warning', 'pending')",
+]
+
+class TestMigrations(unittest.TestCase):
+    """Tests for upgrading databases created by earlier versions."""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        with self.engine.begin() as conn:
+            for statement in BASELINE_SCHEMA:
+                conn.execute(text(statement))
+        models.Base.metadata.create_all(bind=self.engine)
+
+    def tearDown(self):
+        self.engine.dispose()
+
+    def test_upgrade_adds_missing_columns_and_indexes(self):
+        """Test that new columns and indexes are added once and old rows get defaults."""
+        migrations.upgrade(self.engine)
+        migrations.upgrade(self.engine)
+        inspector = inspect(self.engine)
+        columns = {c["name"] for c in inspector.get_columns("alerts")}
+        self.assertTrue({"fingerprint", "occurrence_count", "last_seen", "incident_id"} <= columns)
+        self.assertTrue({"event", "triage_status"} <= {c["name"] for c in inspector.get_columns("alert_history")})
+        self.assertIn("ix_alerts_fingerprint", {i["name"] for i in inspector.get_indexes("alerts")})
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT occurrence_count FROM alerts WHERE id = 1")).scalar(), 1)
+
+    def test_ingest_works_after_upgrade(self):
+        """Test that alerts can be written and deduplicated on an upgraded database."""
+        migrations.upgrade(self.engine)
+        db = sessionmaker(bind=self.engine)()
+        try:
+            first = crud.create_alert(db, make_alert(timestamp=datetime(2024, 1, 1)))
+            second = crud.create_alert(db, make_alert(timestamp=datetime(2024, 1, 1, 0, 5)))
+            self.assertEqual(first.id, second.id)
+            self.assertEqual(second.occurrence_count, 2)
+        finally:
+            db.close()
+
+if __name__ == '__main__':
+    unittest.main()
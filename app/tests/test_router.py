@@ -0,0 +1,153 @@
+import unittest
+from unittest.mock import patch
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from backend.breaker import BreakerRegistry
+from backend.log_analyzer import LogAnalyzer
+from backend.router import LatencyStats, ProviderRouter
+
+OPENROUTER = "deepseek/deepseek-r1-0528:free"
+HUGGINGFACE = "mistralai/Mistral-7B-Instruct-v0.1"
+
+def answer(summary, delay=0.0, error=None):
+    async def call(*args):
+        await asyncio.sleep(delay)
+        if error:
+            return {"error": error}
+        return {"summary": summary, "issues": [], "timestamp": "t"}
+    return call
+
+class TestProviderRouter(unittest.TestCase):
+    def test_latency_stats_window(self):
+        """Test percentiles, error rate and expiry of old samples."""
+        stats = LatencyStats(window_size=10, window_seconds=60)
+        for i in range(1, 11):
+            stats.record(float(i), ok=i != 10, now=100.0)
+        snapshot = stats.snapshot(now=100.0)
+        self.assertEqual(snapshot["samples"], 10)
+        self.assertEqual(snapshot["p50"], 5.0)
+        self.assertEqual(snapshot["p95"], 9.0)
+        self.assertAlmostEqual(snapshot["error_rate"], 0.1)
+        self.assertEqual(stats.snapshot(now=200.0)["samples"], 0)
+
+    def test_rank(self):
+        """Test that unmeasured models go first, then by p50, with unhealthy models last."""
+        router = ProviderRouter(min_samples=2)
+        for _ in range(3):
+            router.record("slow", 5.0, True)
+            router.record("fast", 1.0, True)
+            router.record("broken", 0.1, False)
+        self.assertEqual(router.rank(["slow", "broken", "fast", "new"]), ["new", "fast", "slow", "broken"])
+
+    def test_hedge_delay_clamped(self):
+        """Test that the hedge delay follows p95 within its bounds."""
+        router = ProviderRouter(min_hedge_delay=1, max_hedge_delay=10)
+        self.assertEqual(router.hedge_delay("unknown"), 10)
+        router.record("m", 0.2, True)
+        self.assertEqual(router.hedge_delay("m"), 1)
+        router.record("m", 4.0, True)
+        self.assertEqual(router.hedge_delay("m"), 4.0)
+
+    def test_censored_sample(self):
+        """Test that an abandoned request is only recorded once it ran past the model's p95."""
+        router = ProviderRouter()
+        self.assertFalse(router.record_censored("m", 0.1))
+        for _ in range(5):
+            router.record("m", 1.0, True)
+        # Cancelled early: recording 0.1s as a success would make the model look faster than it is
+        self.assertFalse(router.record_censored("m", 0.1))
+        self.assertEqual(router.snapshot("m")["samples"], 5)
+        self.assertTrue(router.record_censored("m", 3.0))
+        self.assertEqual(router.snapshot("m")["samples"], 6)
+
+    def test_hedged_backup_wins(self):
+        """Test that a slow primary is hedged and the faster backup answer is used."""
+        router = ProviderRouter(min_hedge_delay=0.01, max_hedge_delay=0.01)
+        calls = {"a": answer("a", delay=1.0), "b": answer("b", delay=0.01)}
+        model, result = asyncio.run(router.run(["a", "b"], lambda m: calls[m]()))
+        self.assertEqual((model, result["summary"]), ("b", "b"))
+        self.assertEqual(router.hedges, {"sent": 1, "won": 1})
+
+    def test_fast_primary_not_hedged(self):
+        """Test that no backup is sent when the primary answers before the hedge delay."""
+        router = ProviderRouter(min_hedge_delay=0.5, max_hedge_delay=0.5)
+        called = []
+
+        def call(model):
+            called.append(model)
+            return answer(model)()
+
+        model, _ = asyncio.run(router.run(["a", "b"], call))
+        self.assertEqual((model, called), ("a", ["a"]))
+        self.assertEqual(router.hedges["sent"], 0)
+
+    def test_failed_primary_falls_back(self):
+        """Test that a primary failing before the hedge delay sends the backup at once."""
+        router = ProviderRouter(min_hedge_delay=5, max_hedge_delay=5)
+        calls = {"a": answer("a", error="API error: 503"), "b": answer("b")}
+        model, result = asyncio.run(asyncio.wait_for(router.run(["a", "b"], lambda m: calls[m]()), 1))
+        self.assertEqual((model, result["summary"]), ("b", "b"))
+
+        calls["b"] = answer("b", error="API error: 500")
+        model, result = asyncio.run(router.run(["a", "b"], lambda m: calls[m]()))
+        self.assertIn("error", result)
+
+class TestAutoRouting(unittest.TestCase):
+    def setUp(self):
+        self.env_patcher = patch.dict(os.environ, {
+            'OPENROUTER_API_KEY': 'test_openrouter_key',
+            'HUGGINGFACE_API_KEY': 'test_huggingface_key',
+            'ANALYSIS_CACHE_ENABLED': 'false',
+            'OPENROUTER_MAX_RPS': '0',
+            'HUGGINGFACE_MAX_RPS': '0'
+        })
+        self.env_patcher.start()
+        self.analyzer = LogAnalyzer()
+        self.analyzer.router = ProviderRouter(min_hedge_delay=0.02, max_hedge_delay=0.02)
+        self.analyzer.breakers = BreakerRegistry()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+
+    def test_auto_hedges_to_faster_provider(self):
+        """Test that model="auto" answers from the faster provider and records both latencies."""
+        with patch.object(self.analyzer, '_analyze_with_openrouter_async', side_effect=answer("openrouter", 1.0)), \
+             patch.object(self.analyzer, '_analyze_with_huggingface_async', side_effect=answer("huggingface", 0.01)):
+            result = asyncio.run(self.analyzer.analyze_logs_async("kernel: Out of memory", "auto", compress=False))
+
+        self.assertEqual(result["summary"], "huggingface")
+        self.assertEqual(result["model"], HUGGINGFACE)
+        stats = self.analyzer.router.stats()["models"]
+        self.assertEqual(stats[HUGGINGFACE]["samples"], 1)
+        # The cancelled OpenRouter request has no p95 to compare against, so it left no sample
+        self.assertNotIn(OPENROUTER, stats)
+
+    def test_cancelled_loser_beyond_p95_recorded(self):
+        """Test that a hedge loser already slower than its model's p95 counts against it."""
+        self.analyzer.router.record(OPENROUTER, 0.005, True)
+        self.analyzer.router.record(HUGGINGFACE, 0.01, True)
+        with patch.object(self.analyzer, '_analyze_with_openrouter_async', side_effect=answer("openrouter", 1.0)), \
+             patch.object(self.analyzer, '_analyze_with_huggingface_async', side_effect=answer("huggingface", 0.01)):
+            asyncio.run(self.analyzer.analyze_logs_async("kernel: Out of memory", "auto", compress=False))
+
+        self.assertEqual(self.analyzer.router.hedges, {"sent": 1, "won": 1})
+        self.assertEqual(self.analyzer.router.snapshot(OPENROUTER)["samples"], 2)
+        self.assertEqual(self.analyzer.router.rank([OPENROUTER, HUGGINGFACE]), [HUGGINGFACE, OPENROUTER])
+
+    def test_auto_skips_unconfigured_provider(self):
+        """Test that providers without an API key are not routed to."""
+        self.analyzer.huggingface_api_key = None
+        self.assertEqual(self.analyzer.routable_models(), [OPENROUTER])
+        self.analyzer.openrouter_api_key = ""
+        # With no provider left, the local classifier answers
+        result = self.analyzer.analyze_logs("kernel: Out of memory", "auto")
+        self.assertEqual(result["model"], "local")
+        self.assertEqual(result["errors"], ["No model available"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import unittest
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import crud, models, schemas
+from app.rules import AhoCorasick, RuleCache, RuleEngine, compile_conditions
+
+def make_rule(id, name, conditions, actions, priority=0, is_active=True):
+    return SimpleNamespace(id=id, name=name, conditions=conditions, actions=actions,
+                           priority=priority, is_active=is_active)
+
+def make_alert(**overrides):
+    data = {
+        "title": "High CPU Usage",
+        "message": "CPU usage is above 90% on server-1",
+        "status": "firing",
+        "severity": "critical",
+        "timestamp": datetime(2024, 1, 1),
+        "source": "grafana",
+        "labels": {"instance": "server-1", "job": "node_exporter"}
+    }
+    data.update(overrides)
+    return schemas.AlertIn(**data)
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_finds_all_overlapping_patterns(self):
+        """Test that every contained pattern is reported, including overlaps."""
+        automaton = AhoCorasick(["he", "she", "his", "hers", "cpu"])
+        self.assertEqual(automaton.search("ushers"), {"he", "she", "hers"})
+        self.assertEqual(automaton.search("nothing"), set())
+
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = RuleEngine([
+            make_rule(1, "Critical CPU Rule", {"severity": "critical", "title_contains": "CPU"},
+                      {"acknowledge": True, "notify": True}, priority=1),
+            make_rule(2, "Memory Warning Rule", {"severity": "warning", "title_contains": "Memory"},
+                      {"notify": True}, priority=2),
+            make_rule(3, "Server-1 catch-all", {"labels": {"instance": "server-1"}},
+                      {"set_triage_status": "escalated", "note": "Owned by team A"}, priority=5),
+            make_rule(4, "Regex rule", {"message_regex": r"above \d+%"}, {"set_severity": "high"}, priority=3),
+            make_rule(5, "Inactive", {}, {"acknowledge": True}, priority=0, is_active=False),
+            make_rule(6, "Broken", {"unknown_field": 1}, {}, priority=0),
+        ])
+
+    def test_skips_inactive_and_invalid_rules(self):
+        """Test that only active, valid rules are compiled."""
+        self.assertEqual([r.name for r in self.engine.rules],
+                         ["Critical CPU Rule", "Memory Warning Rule", "Regex rule", "Server-1 catch-all"])
+
+    def test_compile_conditions_rejects_invalid_rules(self):
+        """Test that unsupported keys and bad regexes raise ValueError for the API to report."""
+        exact, contains, regexes, labels = compile_conditions(
+            {"severity": "Critical", "title_contains": "CPU", "message_regex": "disk", "labels": {"job": "node"}})
+        self.assertEqual((exact, contains, labels), ({"severity": "critical"}, {"title": "cpu"}, {"job": "node"}))
+        self.assertIn("message", regexes)
+        for conditions in ({"bogus": 1}, {"title_regex": "("}, {"title_regex": 1}, {"labels": "job=node"}):
+            with self.assertRaises(ValueError):
+                compile_conditions(conditions)
+
+    def test_match_orders_by_priority(self):
+        """Test that all matching rules come back most important first."""
+        names = [r.name for r in self.engine.match(make_alert())]
+        self.assertEqual(names, ["Critical CPU Rule", "Regex rule", "Server-1 catch-all"])
+
+    def test_exact_and_substring_conditions(self):
+        """Test that exact and substring conditions must all hold."""
+        names = [r.name for r in self.engine.match(make_alert(severity="warning", title="Memory Warning",
+                                                              message="ok", labels={}))]
+        self.assertEqual(names, ["Memory Warning Rule"])
+        self.assertEqual(self.engine.match(make_alert(severity="info", message="ok", labels={})), [])
+
+    def test_candidates_follow_indexed_conditions(self):
+        """Test that only rules whose indexed condition holds for an alert are checked in full."""
+        rules = [make_rule(i, f"Service {i}", {"severity": "critical", "title_contains": f"svc-{i:04d} down"}, {})
+                 for i in range(1000)]
+        rules.append(make_rule(1000, "Server-1", {"labels": {"instance": "server-1"}}, {}))
+        rules.append(make_rule(1001, "Warnings", {"severity": "warning"}, {}))
+        engine = RuleEngine(rules)
+        alert = make_alert(title="svc-0042 down")
+        found = {field: automaton.search(getattr(alert, field).lower())
+                 for field, automaton in engine._automata.items()}
+        exact = {"severity": "critical", "source": "grafana", "status": "firing"}
+
+        self.assertEqual(len(engine._candidates(alert, found, exact)), 2)
+        self.assertEqual([r.name for r in engine.match(alert)], ["Service 42", "Server-1"])
+        self.assertEqual([r.name for r in engine.match(make_alert(title="svc-0042 down", severity="warning"))],
+                         ["Server-1", "Warnings"])
+
+    def test_priority_needs_explicit_action(self):
+        """Test that only a set_priority action names a scheduling class, not the rule's own priority."""
+        self.assertIsNone(self.engine.priority(make_alert()))
+        engine = RuleEngine([
+            make_rule(1, "Ordered first", {"severity": "warning"}, {"note": "x"}, priority=0),
+            make_rule(2, "Database", {"title_contains": "postgres"}, {"set_priority": "critical"}, priority=5),
+        ])
+        self.assertIsNone(engine.priority(make_alert(severity="warning", title="Disk full")))
+        self.assertEqual(engine.priority(make_alert(severity="warning", title="postgres down")), "critical")
+
+    def test_triage_resolves_actions(self):
+        """Test that the most important rule wins conflicting actions."""
+        triage = self.engine.triage(make_alert())
+        self.assertEqual(triage["triage_status"], "acknowledged")
+        self.assertEqual(triage["severity"], "high")
+        self.assertIn("Owned by team A", triage["triage_notes"])
+        self.assertTrue(triage["triage_notes"].startswith("Matched rules: Critical CPU Rule"))
+
+class TestRuleCache(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        models.Base.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(bind=self.engine)
+        self.db = self.Session()
+        self.cache = RuleCache(self.Session, poll_interval=0)
+        self.cache.start()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+
+    def rule_in(self, name, **overrides):
+        data = {"name": name, "conditions": {"severity": "critical"}, "actions": {"acknowledge": True}, "priority": 1}
+        data.update(overrides)
+        return schemas.TriageRuleIn(**data)
+
+    def test_rule_changes_bump_version(self):
+        """Test that create, update and delete each bump the version."""
+        self.assertEqual(crud.get_rule_version(self.db), 0)
+        rule = crud.create_triage_rule(self.db, self.rule_in("a"))
+        self.assertEqual(crud.get_rule_version(self.db), 1)
+        crud.update_triage_rule(self.db, rule.id, self.rule_in("a", is_active=False))
+        self.assertEqual(crud.get_rule_version(self.db), 2)
+        crud.delete_triage_rule(self.db, rule.id)
+        self.assertEqual(crud.get_rule_version(self.db), 3)
+
+    def test_refresh_only_when_version_changes(self):
+        """Test that a stale snapshot is detected and swapped, and a fresh one is kept."""
+        old_engine = self.cache.engine
+        self.assertFalse(self.cache.refresh_if_stale(self.db))
+        self.assertIs(self.cache.engine, old_engine)
+
+        # Another worker adds a rule
+        crud.create_triage_rule(self.db, self.rule_in("Critical"))
+        self.assertTrue(self.cache.refresh_if_stale(self.db))
+        self.assertEqual(self.cache.version, 1)
+        self.assertEqual(self.cache.engine.triage(make_alert())["triage_status"], "acknowledged")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import asyncio
+import unittest
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import models
+from app.scheduler import TriageScheduler, priority_class
+
+def make_alert(alert_id, severity="warning"):
+    return models.Alert(id=alert_id, title=f"Alert {alert_id}", severity=severity, status="firing")
+
+class TestPriorityClass(unittest.TestCase):
+    def test_severity_and_rule_priority(self):
+        """Test that classes follow severity and rules can only make an alert more urgent."""
+        self.assertEqual(priority_class("critical"), 0)
+        self.assertEqual(priority_class("High"), 1)
+        self.assertEqual(priority_class("warning"), 2)
+        self.assertEqual(priority_class("info"), 3)
+        self.assertEqual(priority_class(None), 3)
+        self.assertEqual(priority_class("warning", rule_class="high"), 1)
+        self.assertEqual(priority_class("critical", rule_class="low"), 0)
+        self.assertEqual(priority_class("warning", rule_class="urgent"), 2)
+
+class TestTriageScheduler(unittest.IsolatedAsyncioTestCase):
+    async def test_urgent_jobs_first(self):
+        """Test that a critical alert is served before earlier warnings."""
+        scheduler = TriageScheduler(aging_seconds=60)
+        now = datetime.utcnow()
+        for i in range(5):
+            scheduler.put(make_alert(i), 2, now - timedelta(seconds=5))
+        scheduler.put(make_alert(99, "critical"), 0, now)
+        self.assertEqual((await scheduler.get()).id, 99)
+        self.assertEqual([(await scheduler.get()).id for _ in range(5)], [0, 1, 2, 3, 4])
+
+    async def test_aging_prevents_starvation(self):
+        """Test that a job waiting longer than the aging step overtakes a more urgent class."""
+        scheduler = TriageScheduler(aging_seconds=60)
+        now = datetime.utcnow()
+        scheduler.put(make_alert(1, "info"), 3, now - timedelta(seconds=200))
+        scheduler.put(make_alert(2, "critical"), 0, now)
+        self.assertEqual((await scheduler.get()).id, 1)
+
+    async def test_merge_and_discard(self):
+        """Test that re-queued alerts merge and keep their wait, and discarded ones are skipped."""
+        scheduler = TriageScheduler(aging_seconds=60)
+        now = datetime.utcnow()
+        scheduler.put(make_alert(1), 2, now - timedelta(seconds=30))
+        scheduler.put(make_alert(2), 2, now - timedelta(seconds=20))
+        scheduler.put(make_alert(3), 2, now - timedelta(seconds=10))
+        updated = make_alert(2, "critical")
+        scheduler.put(updated, 0)
+        self.assertEqual(len(scheduler), 3)
+        self.assertEqual(scheduler.discard(1).id, 1)
+        self.assertIsNone(scheduler.discard(1))
+
+        self.assertIs(await scheduler.get(), updated)
+        self.assertEqual((await scheduler.get()).id, 3)
+        stats = scheduler.stats()
+        self.assertEqual(stats["dropped"], 1)
+        self.assertEqual(stats["classes"]["critical"]["dispatched"], 1)
+        # The merged job kept its original arrival time
+        self.assertGreaterEqual(stats["classes"]["critical"]["wait_max_seconds"], 20)
+        self.assertEqual(stats["classes"]["normal"]["dispatched"], 1)
+
+    async def test_get_waits_for_put(self):
+        """Test that an idle worker wakes up when a job arrives."""
+        scheduler = TriageScheduler()
+        waiter = asyncio.create_task(scheduler.get())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+        scheduler.put(make_alert(7), 1)
+        self.assertEqual((await asyncio.wait_for(waiter, 1)).id, 7)
+        self.assertEqual(scheduler.stats()["classes"]["high"]["queued"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
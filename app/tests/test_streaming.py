@@ -0,0 +1,148 @@
+import unittest
+from unittest.mock import patch, AsyncMock, MagicMock
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from backend.breaker import BreakerRegistry
+from backend.log_analyzer import LogAnalyzer
+from backend.streaming import IssueStreamParser, SSEDecoder, iter_sse_data, openrouter_delta
+
+OPENROUTER = "deepseek/deepseek-r1-0528:free"
+HUGGINGFACE = "mistralai/Mistral-7B-Instruct-v0.1"
+
+ANALYSIS = {
+    "summary": "Memory pressure on db-1",
+    "issues": [
+        {"description": "OOM killer ended postgres {pid 42}", "severity": "Critical",
+         "recommendation": "Raise memory limits", "command": "free -m", "security_implication": ""},
+        {"description": "Swap \"full\"", "severity": "High", "recommendation": "Add swap",
+         "command": "swapon -s", "security_implication": "None"}
+    ]
+}
+
+def sse_lines(text, piece=7):
+    """OpenRouter-style SSE lines delivering `text` in small content deltas."""
+    lines = [": OPENROUTER PROCESSING", ""]
+    for start in range(0, len(text), piece):
+        chunk = {"choices": [{"delta": {"content": text[start:start + piece]}}]}
+        lines += [f"data: {json.dumps(chunk)}", ""]
+    return lines + ["data: [DONE]", ""]
+
+def make_stream_response(lines, status_code=200):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {}
+
+    async def aiter_lines():
+        for line in lines:
+            yield line
+    response.aiter_lines = aiter_lines
+    response.aread = AsyncMock()
+    response.aclose = AsyncMock()
+    return response
+
+class TestStreamParsing(unittest.TestCase):
+    def test_sse_data(self):
+        """Test that comments are skipped, multi-line data joined and [DONE] ends the stream."""
+        lines = [": keepalive", "", "data: a", "data: b", "", "event: x", "data: c", "", "data: [DONE]", "", "data: d", ""]
+        self.assertEqual(list(iter_sse_data(lines)), ["a\nb", "c"])
+
+    def test_sse_decoder_incremental(self):
+        """Test that the decoder returns an event's data only once its blank line arrives."""
+        decoder = SSEDecoder()
+        self.assertIsNone(decoder.feed(b"data: a"))
+        self.assertEqual(decoder.feed(b""), "a")
+        self.assertIsNone(decoder.feed("data: [DONE]"))
+        self.assertIsNone(decoder.feed(""))
+        self.assertTrue(decoder.done)
+
+    def test_openrouter_delta(self):
+        """Test that content deltas are extracted and a mid-stream error is raised."""
+        self.assertEqual(openrouter_delta('{"choices": [{"delta": {"role": "assistant"}}]}'), "")
+        self.assertEqual(openrouter_delta('{"choices": [{"delta": {"content": "x"}}]}'), "x")
+        with self.assertRaises(RuntimeError):
+            openrouter_delta('{"error": {"message": "Provider returned error"}}')
+
+    def test_issues_emitted_as_completed(self):
+        """Test that each issue is emitted once its object closes, whatever the chunking."""
+        text = "Sure, here is the analysis:\n```json\n" + json.dumps(ANALYSIS, indent=2) + "\n```"
+        for piece in (1, 5, len(text)):
+            parser = IssueStreamParser()
+            events = []
+            for start in range(0, len(text), piece):
+                events += parser.feed(text[start:start + piece])
+            self.assertEqual(events, [("summary", ANALYSIS["summary"])] + [("issue", i) for i in ANALYSIS["issues"]])
+            self.assertTrue(parser.done)
+
+    def test_first_issue_before_document_ends(self):
+        """Test that an issue is available while later ones are still being generated."""
+        text = json.dumps(ANALYSIS)
+        cut = text.index('{"description": "Swap')
+        parser = IssueStreamParser()
+        events = parser.feed(text[:cut])
+        self.assertEqual([event for event, _ in events], ["summary", "issue"])
+        self.assertFalse(parser.done)
+
+class TestAnalyzeLogsIter(unittest.TestCase):
+    def setUp(self):
+        self.env_patcher = patch.dict(os.environ, {
+            'OPENROUTER_API_KEY': 'test_openrouter_key',
+            'HUGGINGFACE_API_KEY': 'test_huggingface_key',
+            'ANALYSIS_CACHE_ENABLED': 'false'
+        })
+        self.env_patcher.start()
+        self.analyzer = LogAnalyzer()
+        self.analyzer.breakers = BreakerRegistry()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+
+    @patch('backend.log_analyzer.async_request_with_retry')
+    def test_streams_issues_then_result(self, mock_request):
+        """Test that summary and issues are yielded as they arrive, then the complete result."""
+        mock_request.return_value = make_stream_response(sse_lines(json.dumps(ANALYSIS)))
+        events = list(self.analyzer.analyze_logs_iter("kernel: Out of memory", OPENROUTER, compress=False))
+
+        self.assertEqual([e["event"] for e in events], ["summary", "issue", "issue", "result"])
+        self.assertEqual(events[1]["data"], ANALYSIS["issues"][0])
+        result = events[-1]["data"]
+        self.assertEqual(result["summary"], ANALYSIS["summary"])
+        self.assertEqual(result["issues"], ANALYSIS["issues"])
+        self.assertTrue(mock_request.call_args.kwargs["stream"])
+        self.assertTrue(mock_request.call_args.kwargs["json"]["stream"])
+
+    @patch('backend.log_analyzer.async_request_with_retry')
+    def test_broken_stream_falls_back(self, mock_request):
+        """Test that a stream cut off part way is replaced by the fallback chain's result."""
+        text = json.dumps(ANALYSIS)
+        broken = sse_lines(text[:text.index('{"description": "Swap')])[:-2]
+        broken += ['data: {"error": {"message": "upstream disconnected"}}', ""]
+
+        def respond(client, method, url, **kwargs):
+            if "openrouter" in url:
+                return make_stream_response(broken)
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = [{"generated_text": '{"summary": "from hf", "issues": []}'}]
+            return response
+        mock_request.side_effect = respond
+
+        events = list(self.analyzer.analyze_logs_iter("kernel: Out of memory", OPENROUTER, compress=False))
+        self.assertEqual([e["event"] for e in events], ["summary", "issue", "result"])
+        result = events[-1]["data"]
+        self.assertEqual((result["summary"], result["model"]), ("from hf", HUGGINGFACE))
+        self.assertIn("upstream disconnected", result["errors"][0])
+
+    def test_non_streaming_model(self):
+        """Test that models without streaming support yield only the final result."""
+        result = {"summary": "hf", "issues": [], "timestamp": "t"}
+        with patch.object(self.analyzer, '_analyze_with_huggingface_async', new_callable=AsyncMock, return_value=result):
+            events = list(self.analyzer.analyze_logs_iter("kernel: Out of memory", HUGGINGFACE, compress=False))
+        self.assertEqual(events, [{"event": "result", "data": result}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+# Add the app directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+from backend.templates import TemplateMiner, WILDCARD
+from backend.log_analyzer import LogAnalyzer
+
+SSH_LINES = [
+    f"Jan  1 00:00:{i:02d} web01 sshd[{1000 + i}]: Failed password for root from 10.0.0.{i} port {40000 + i} ssh2"
+    for i in range(50)
+]
+OOM_LINES = [
+    f"2024-01-01T00:01:{i:02d}Z web01 kernel: Out of memory: Killed process {i} (java)"
+    for i in range(20)
+]
+
+class TestTemplateMiner(unittest.TestCase):
+    def test_collapses_repeated_lines(self):
+        """Test that lines differing only in variables share one template."""
+        miner = TemplateMiner().add_lines(SSH_LINES + OOM_LINES)
+        self.assertEqual(len(miner.templates), 2)
+
+        ssh, oom = miner.templates
+        self.assertEqual(ssh.count, 50)
+        self.assertEqual(ssh.template, f"web01 sshd[{WILDCARD}]: Failed password for root from {WILDCARD} port {WILDCARD} ssh2")
+        self.assertEqual(ssh.first_seen, "Jan  1 00:00:00")
+        self.assertEqual(ssh.last_seen, "Jan  1 00:00:49")
+        self.assertEqual(ssh.samples[0], ("10.0.0.0", "40000"))
+        self.assertEqual(len(ssh.samples), 3)
+        self.assertEqual(oom.count, 20)
+        self.assertEqual(oom.first_seen, "2024-01-01T00:01:00Z")
+
+    def test_distinct_messages_stay_separate(self):
+        """Test that unrelated messages of the same length are not merged."""
+        miner = TemplateMiner().add_lines([
+            "web01 systemd: Started Daily apt upgrade job",
+            "web01 nginx: bind() failed address already in use",
+        ])
+        self.assertEqual(len(miner.templates), 2)
+
+    def test_render_is_much_smaller(self):
+        """Test that the rendered form is far smaller than the input."""
+        lines = SSH_LINES * 20 + OOM_LINES * 20
+        rendered = TemplateMiner().add_lines(lines).render()
+        self.assertLess(len(rendered) * 10, len("\n".join(lines)))
+        self.assertIn("1000x", rendered)
+
+    def test_analyzer_sends_compressed_logs(self):
+        """Test that analyze_logs sends templates instead of raw lines."""
+        analyzer = LogAnalyzer()
+        analyzer.cache = None
+        analyzer.template_mining = True
+        with patch.object(analyzer, '_analyze_with_openrouter_async', return_value={"summary": "", "issues": []}) as mock_call:
+            analyzer.analyze_logs("\n".join(SSH_LINES), model="deepseek/deepseek-r1-0528:free")
+        sent = mock_call.call_args[0][1]
+        self.assertEqual(len(sent.split("\n")), 2)
+        self.assertIn("50x", sent)
+
+if __name__ == '__main__':
+    unittest.main()
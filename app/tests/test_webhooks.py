@@ -0,0 +1,82 @@
+import unittest
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import ValidationError
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+from app import webhooks
+
+PAYLOAD = {
+    "receiver": "alert-triage",
+    "status": "firing",
+    "alerts": [
+        {
+            "status": "firing",
+            "labels": {"alertname": "HighCPU", "instance": "server-1"},
+            "annotations": {"description": "CPU usage is above 90%"},
+            "startsAt": "2024-01-01T00:00:00Z",
+            "endsAt": "0001-01-01T00:00:00Z",
+            "fingerprint": "a1b2c3",
+            "values": {"A": 97.5}
+        },
+        {
+            "status": "resolved",
+            "labels": {"alertname": "HighCPU", "instance": "server-2", "severity": "warning"},
+            "annotations": {},
+            "startsAt": "2024-01-01T00:00:00Z",
+            "endsAt": "2024-01-01T00:10:00Z",
+            "fingerprint": "d4e5f6"
+        }
+    ],
+    "groupLabels": {"alertname": "HighCPU"},
+    "commonLabels": {"alertname": "HighCPU", "job": "node_exporter", "severity": "critical"},
+    "commonAnnotations": {"summary": "CPU is high"},
+    "externalURL": "http://grafana:3000",
+    "version": "1",
+    "groupKey": "{}:{alertname=\"HighCPU\"}"
+}
+
+class TestWebhooks(unittest.TestCase):
+    def test_parse_grouped_payload(self):
+        """Test that each alert in the group becomes an AlertIn."""
+        payload = webhooks.parse_webhook(json.dumps(PAYLOAD).encode())
+        alerts = webhooks.to_alerts(payload, source="alertmanager")
+        self.assertEqual(len(alerts), 2)
+
+        firing, resolved = alerts
+        self.assertEqual(firing.title, "HighCPU")
+        self.assertEqual(firing.message, "CPU usage is above 90%")
+        self.assertEqual(firing.severity, "critical")
+        self.assertEqual(firing.source, "alertmanager")
+        self.assertEqual(firing.labels["job"], "node_exporter")
+        self.assertEqual(firing.labels["fingerprint"], "a1b2c3")
+
+        # Per-alert labels override common labels; resolved alerts use endsAt
+        self.assertEqual(resolved.severity, "warning")
+        self.assertEqual(resolved.message, "CPU is high")
+        self.assertEqual(resolved.timestamp.minute, 10)
+
+    def test_timestamps_normalized_to_naive_utc(self):
+        """Test that "Z" and offset timestamps become naive UTC, like every stored timestamp."""
+        payload = json.loads(json.dumps(PAYLOAD))
+        payload["alerts"][0]["startsAt"] = "2024-01-01T02:30:00+02:00"
+        firing, resolved = webhooks.to_alerts(webhooks.parse_webhook(json.dumps(payload).encode()))
+        self.assertEqual(firing.timestamp, datetime(2024, 1, 1, 0, 30))
+        self.assertEqual(resolved.timestamp, datetime(2024, 1, 1, 0, 10))
+        self.assertIsNone(firing.timestamp.tzinfo)
+        # Comparable with naive datetimes such as datetime.utcnow()
+        self.assertLess(firing.timestamp, datetime.utcnow())
+
+    def test_invalid_payload(self):
+        """Test that malformed payloads fail validation."""
+        with self.assertRaises(ValidationError):
+            webhooks.parse_webhook(b'{"alerts": "not a list"}')
+        with self.assertRaises(ValidationError):
+            webhooks.parse_webhook(b'not json')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from typing import Optional, Dict, List
+from datetime import datetime
+from app import schemas
+
+# Grafana and Alertmanager share the Alertmanager webhook format; Grafana
+# adds a few fields (values, dashboardURL, ...) that are ignored here.
+
+class WebhookAlert(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    status: str = "firing"
+    labels: Dict[str, str] = Field(default_factory=dict)
+    annotations: Dict[str, str] = Field(default_factory=dict)
+    startsAt: Optional[datetime] = None
+    endsAt: Optional[datetime] = None
+    generatorURL: Optional[str] = None
+    fingerprint: Optional[str] = None
+    valueString: Optional[str] = None
+
+    @field_validator("startsAt", "endsAt")
+    @classmethod
+    def to_naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        # Grafana sends "...Z" timestamps; comparisons and storage use naive UTC
+        return schemas.naive_utc(value)
+
+class WebhookPayload(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    receiver: Optional[str] = None
+    status: Optional[str] = None
+    alerts: List[WebhookAlert] = Field(default_factory=list)
+    groupLabels: Dict[str, str] = Field(default_factory=dict)
+    commonLabels: Dict[str, str] = Field(default_factory=dict)
+    commonAnnotations: Dict[str, str] = Field(default_factory=dict)
+    externalURL: Optional[str] = None
+    groupKey: Optional[str] = None
+    truncatedAlerts: int = 0
+
+def parse_webhook(body: bytes) -> WebhookPayload:
+    """Validate a raw webhook body in one pass, without building an intermediate dict."""
+    return WebhookPayload.model_validate_json(body)
+
+def to_alerts(payload: WebhookPayload, source: str = "grafana") -> List[schemas.AlertIn]:
+    """Convert a grouped webhook payload into AlertIn records.
+
+    Per-alert labels and annotations win over the group's common ones. The
+    upstream fingerprint is kept in the labels so alerts can be traced back.
+    """
+    alerts = []
+    for alert in payload.alerts:
+        labels = {**payload.commonLabels, **alert.labels}
+        annotations = {**payload.commonAnnotations, **alert.annotations}
+        if alert.fingerprint:
+            labels["fingerprint"] = alert.fingerprint
+
+        title = labels.get("alertname") or annotations.get("summary") or "Unnamed alert"
+        message = (annotations.get("description") or annotations.get("summary")
+                   or alert.valueString or "")
+        timestamp = alert.startsAt or datetime.utcnow()
+        if alert.status == "resolved" and alert.endsAt and alert.endsAt.year > 1:
+            timestamp = alert.endsAt
+
+        alerts.append(schemas.AlertIn(
+            title=title,
+            message=message,
+            status=alert.status,
+            severity=labels.get("severity", "unknown"),
+            timestamp=timestamp,
+            source=source,
+            labels=labels
+        ))
+    return alerts
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { fetchAlerts, fetchTriageRules } from './api';
+import { fetchAlerts, fetchTriageRules, subscribeAlerts } from './api';
 
 function App() {
   const [alerts, setAlerts] = useState([]);
@@ -25,6 +25,18 @@ function App() {
     loadData();
   }, []);
 
+  useEffect(() => {
+    // New alerts are pushed by the server instead of polling the list
+    const unsubscribe = subscribeAlerts(
+      {},
+      alert => setAlerts(prev => [alert, ...prev.filter(a => a.id !== alert.id)]),
+      () => fetchAlerts().then(setAlerts).catch(err => setError(err.message)),
+      // Triage results update the alert in place
+      update => setAlerts(prev => prev.map(a => (a.id === update.id ? { ...a, ...update } : a)))
+    );
+    return () => unsubscribe && unsubscribe();
+  }, []);
+
   if (loading) return <div>Loading...</div>;
   if (error) return <div style={{color: 'red'}}>Error: {error}</div>;
 
@@ -38,6 +50,7 @@ function App() {
           <li key={alert.id}>
             <strong>{alert.title}</strong> [{alert.severity}] - {alert.status}<br/>
             <small>{alert.message}</small>
+            {alert.triage_notes && <pre style={{ whiteSpace: 'pre-wrap' }}>{alert.triage_notes}</pre>}
           </li>
         ))}
       </ul>
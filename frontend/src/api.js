@@ -10,4 +10,25 @@ export async function fetchTriageRules() {
   const res = await fetch(`${API_URL}/triage_rules`);
   if (!res.ok) throw new Error('Failed to fetch triage rules');
   return res.json();
-} 
\ No newline at end of file
+} 
+// Subscribe to newly ingested alerts over Server-Sent Events. The browser
+// reconnects on its own and resumes after the last event it received.
+// `filters` accepts severity, status, source, triage_status and labels ({key: value}).
+// `onTriaged` gets the id, triage_status and triage_notes (plus a few alert
+// fields) of alerts the auto-triage workers finished. Returns a function that
+// closes the stream.
+export function subscribeAlerts(filters, onAlert, onReset, onTriaged) {
+  const params = new URLSearchParams();
+  const { labels = {}, ...fields } = filters || {};
+  Object.entries(fields).forEach(([key, value]) => {
+    if (value) params.append(key, value);
+  });
+  Object.entries(labels).forEach(([key, value]) => params.append('label', `${key}=${value}`));
+
+  const source = new EventSource(`${API_URL}/alerts/stream?${params}`);
+  source.addEventListener('alert', event => onAlert(JSON.parse(event.data)));
+  source.addEventListener('triaged', event => onTriaged && onTriaged(JSON.parse(event.data)));
+  // The server no longer buffers our position: reload the list
+  source.addEventListener('reset', () => onReset && onReset());
+  return () => source.close();
+}
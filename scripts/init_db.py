@@ -4,10 +4,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import engine
 from app.models import Base
+from app.migrations import upgrade
 
 def init_db():
     print("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    upgrade(engine)
     print("Database tables created successfully!")
 
 if __name__ == "__main__":